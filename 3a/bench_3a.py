@@ -0,0 +1,481 @@
+"""
+Benchmarks de los ejercicios del apartado 3a.
+
+Uso:
+    python bench_3a.py            # ejecuta todos los benchmarks
+    python bench_3a.py pool ...   # ejecuta solo los indicados
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import ej3a1
+import ej3a2
+import ej3a3
+import filas
+import pandas as pd
+from ej3a1_async import BibliotecaAsync
+from instrumentacion import instrumentar
+
+
+def _medir(funcion, repeticiones):
+    """Ejecuta funcion() repeticiones veces y devuelve las operaciones por segundo"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return repeticiones / (time.perf_counter() - inicio)
+
+
+def bench_pool(repeticiones=2000):
+    """Conexiones/segundo abriendo una conexión nueva frente a tomarla del pool"""
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'bench.db')
+        conn = sqlite3.connect(ruta)
+        ej3a1.crear_tablas(conn)
+        conn.close()
+
+        def sin_pool():
+            conn = sqlite3.connect(ruta)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("SELECT COUNT(*) FROM libros").fetchone()
+            conn.close()
+
+        pool = ej3a1.PoolConexiones(ruta)
+
+        def con_pool():
+            with pool.conexion() as conn:
+                conn.execute("SELECT COUNT(*) FROM libros").fetchone()
+
+        resultados = {
+            'sin_pool': _medir(sin_pool, repeticiones),
+            'con_pool': _medir(con_pool, repeticiones),
+        }
+        pool.cerrar()
+
+    print(f"[pool] sin pool: {resultados['sin_pool']:,.0f} conexiones/s")
+    print(f"[pool] con pool: {resultados['con_pool']:,.0f} conexiones/s")
+    return resultados
+
+
+def _generar_libros(filas, autores):
+    """Genera filas (titulo, anio, autor_id) sintéticas sin materializarlas"""
+    palabras = ['sombra', 'viento', 'ciudad', 'memoria', 'noche', 'jardín', 'río',
+                'espejo', 'laberinto', 'silencio', 'tiempo', 'mar', 'fuego', 'casa']
+    for i in range(filas):
+        titulo = " ".join(palabras[(i * k) % len(palabras)] for k in (1, 3, 7)) + f" {i}"
+        yield (titulo, 1900 + i % 120, i % autores + 1)
+
+
+def bench_fts(filas=1_000_000, consultas=20):
+    """Tiempo por consulta de buscar_libros (FTS5) frente a LIKE '%x%'"""
+    conn = sqlite3.connect(':memory:')
+    ej3a1.crear_tablas(conn)
+    ej3a1.insertar_autores(conn, [(f"Autor {i}",) for i in range(1000)])
+    ej3a1.insertar_libros(conn, _generar_libros(filas, 1000))
+
+    termino = 'laberinto'
+
+    def con_like():
+        conn.execute("""
+            SELECT libros.id, libros.titulo, libros.anio, autores.nombre
+            FROM libros JOIN autores ON libros.autor_id = autores.id
+            WHERE libros.titulo LIKE ? OR autores.nombre LIKE ?
+            LIMIT 10
+            """, (f'%{termino} 9999%', f'%{termino} 9999%')).fetchall()
+
+    def con_fts():
+        ej3a1.buscar_libros(conn, f'{termino} 9999')
+
+    resultados = {
+        'like': 1000 / _medir(con_like, consultas),
+        'fts': 1000 / _medir(con_fts, consultas),
+    }
+    conn.close()
+
+    print(f"[fts] {filas:,} libros - LIKE: {resultados['like']:.2f} ms/consulta")
+    print(f"[fts] {filas:,} libros - FTS5: {resultados['fts']:.2f} ms/consulta")
+    return resultados
+
+
+def bench_carga_masiva(filas=1_000_000):
+    """Filas/segundo de insertar_libros frente a carga_masiva en un fichero"""
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        for modo in ('insertar_libros', 'carga_masiva'):
+            conn = sqlite3.connect(os.path.join(directorio, f'{modo}.db'))
+            ej3a1.crear_tablas(conn)
+            ej3a1.insertar_autores(conn, [(f"Autor {i}",) for i in range(1000)])
+
+            inicio = time.perf_counter()
+            if modo == 'insertar_libros':
+                ej3a1.insertar_libros(conn, list(_generar_libros(filas, 1000)))
+            else:
+                ej3a1.carga_masiva(conn, libros=_generar_libros(filas, 1000))
+            resultados[modo] = filas / (time.perf_counter() - inicio)
+            conn.close()
+
+    for modo, filas_segundo in resultados.items():
+        print(f"[carga_masiva] {modo}: {filas_segundo:,.0f} filas/s")
+    return resultados
+
+
+def bench_instrumentacion(repeticiones=20000):
+    """Sobrecoste de la instrumentación según la tasa de muestreo"""
+    conn = sqlite3.connect(':memory:')
+    ej3a1.crear_tablas(conn)
+    ej3a1.carga_masiva(conn, [(f"Autor {i}",) for i in range(1000)], _generar_libros(100_000, 1000))
+
+    def medir(conexion):
+        return _medir(lambda: ej3a1.buscar_libros_por_autor(conexion, "Autor 7"), repeticiones)
+
+    medir(conn)  # calentamiento: caché de páginas y de sentencias
+    resultados = {'sin_instrumentar': medir(conn)}
+    for muestreo in (1.0, 0.1, 0.01):
+        resultados[f'muestreo_{muestreo}'] = medir(instrumentar(conn, muestreo=muestreo))
+    conn.close()
+
+    base = resultados['sin_instrumentar']
+    for modo, consultas_segundo in resultados.items():
+        print(f"[instrumentacion] {modo}: {consultas_segundo:,.0f} consultas/s "
+              f"({(base / consultas_segundo - 1) * 100:+.1f}%)")
+    return resultados
+
+
+def bench_async(corrutinas=64, consultas=50, filas=200_000):
+    """Consultas/segundo de muchas corrutinas leyendo según el número de hilos lectores"""
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'async.db')
+        conn = sqlite3.connect(ruta)
+        ej3a1.crear_tablas(conn)
+        ej3a1.carga_masiva(conn, [(f"Autor {i}",) for i in range(1000)],
+                           _generar_libros(filas, 1000))
+        conn.close()
+
+        async def cliente(biblioteca, indice):
+            for consulta in range(consultas):
+                await biblioteca.buscar_libros_por_autor(f"Autor {(indice * consultas + consulta) % 1000}")
+
+        async def escenario(lectores):
+            async with BibliotecaAsync(ruta, lectores=lectores) as biblioteca:
+                inicio = time.perf_counter()
+                await asyncio.gather(*[cliente(biblioteca, i) for i in range(corrutinas)])
+                return corrutinas * consultas / (time.perf_counter() - inicio)
+
+        for lectores in (1, 2, 4, 8):
+            resultados[lectores] = asyncio.run(escenario(lectores))
+
+    for lectores, consultas_segundo in resultados.items():
+        print(f"[async] {corrutinas} corrutinas, {lectores} lectores: {consultas_segundo:,.0f} consultas/s")
+    return resultados
+
+
+def _escribir_script_sql(ruta, filas):
+    """Escribe un script SQL con el esquema de test.sql y filas INSERT de libros"""
+    with open(ej3a2.SQL_FILE_PATH, 'r') as sql_file:
+        esquema = sql_file.read()
+    with open(ruta, 'w') as script:
+        script.write(esquema)
+        for titulo, anio, autor_id in _generar_libros(filas, 3):
+            script.write(f"INSERT INTO libros (titulo, anio, autor_id) VALUES ('{titulo}', {anio}, {autor_id});\n")
+
+
+def bench_plantilla(filas=20_000):
+    """Segundos de crear_bd_desde_sql construyendo la BD frente a copiar la plantilla"""
+    originales = (ej3a2.SQL_FILE_PATH, ej3a2.DB_PATH, ej3a2.PLANTILLAS_DIR)
+    with tempfile.TemporaryDirectory() as directorio:
+        _escribir_script_sql(os.path.join(directorio, 'script.sql'), filas)
+        ej3a2.SQL_FILE_PATH = os.path.join(directorio, 'script.sql')
+        ej3a2.DB_PATH = os.path.join(directorio, 'biblioteca.db')
+        ej3a2.PLANTILLAS_DIR = os.path.join(directorio, 'plantillas')
+        try:
+            resultados = {}
+            for modo in ('construir', 'copiar'):
+                inicio = time.perf_counter()
+                ej3a2.crear_bd_desde_sql().close()
+                resultados[modo] = time.perf_counter() - inicio
+        finally:
+            ej3a2.SQL_FILE_PATH, ej3a2.DB_PATH, ej3a2.PLANTILLAS_DIR = originales
+
+    print(f"[plantilla] {filas:,} INSERT - construyendo: {resultados['construir']:.3f} s")
+    print(f"[plantilla] {filas:,} INSERT - desde plantilla: {resultados['copiar']:.3f} s")
+    return resultados
+
+
+def bench_script_sql(filas=20_000):
+    """Sentencias/segundo de executescript frente a cargar_script_sql"""
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_sql = os.path.join(directorio, 'script.sql')
+        _escribir_script_sql(ruta_sql, filas)
+
+        conn = sqlite3.connect(os.path.join(directorio, 'executescript.db'))
+        inicio = time.perf_counter()
+        with open(ruta_sql, 'r') as sql_file:
+            conn.executescript(sql_file.read())
+        resultados['executescript'] = filas / (time.perf_counter() - inicio)
+        conn.close()
+
+        for agrupar in (False, True):
+            modo = 'cargar_script_sql' + (' (agrupando INSERT)' if agrupar else '')
+            conn = sqlite3.connect(os.path.join(directorio, f'cargar_{agrupar}.db'))
+            resultados[modo] = ej3a2.cargar_script_sql(
+                conn, ruta_sql, agrupar_inserts=agrupar)['sentencias_por_segundo']
+            conn.close()
+
+    for modo, sentencias_segundo in resultados.items():
+        print(f"[script_sql] {modo}: {sentencias_segundo:,.0f} sentencias/s")
+    return resultados
+
+
+def bench_lectura_paralela(filas=1_000_000, repeticiones=3):
+    """Filas/segundo de obtener_libros frente a obtener_libros_paralelo según los trabajadores"""
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'paralelo.db')
+        conn = sqlite3.connect(ruta)
+        ej3a1.crear_tablas(conn)
+        ej3a1.carga_masiva(conn, [(f"Autor {i}",) for i in range(1000)],
+                           _generar_libros(filas, 1000))
+
+        # La versión sin caché: la caché solo mediría la primera lectura
+        obtener_libros = ej3a2.obtener_libros.__wrapped__
+        resultados['secuencial'] = filas * _medir(lambda: obtener_libros(conn), repeticiones)
+        conn.close()
+
+        for procesos in (False, True):
+            for trabajadores in (1, 2, 4, 8):
+                modo = f"{'procesos' if procesos else 'hilos'} x{trabajadores}"
+                resultados[modo] = filas * _medir(
+                    lambda: ej3a2.obtener_libros_paralelo(ruta, trabajadores, procesos=procesos),
+                    repeticiones)
+
+    print(f"[lectura_paralela] {os.cpu_count()} CPU")
+    for modo, filas_segundo in resultados.items():
+        print(f"[lectura_paralela] {modo}: {filas_segundo:,.0f} filas/s")
+    return resultados
+
+
+def bench_filas(filas_libros=1_000_000):
+    """Bytes por fila y filas/segundo de obtener_libros en cada formato de filas"""
+    conn = sqlite3.connect(':memory:')
+    ej3a1.crear_tablas(conn)
+    ej3a1.carga_masiva(conn, [(f"Autor {i}",) for i in range(1000)],
+                       _generar_libros(filas_libros, 1000))
+    obtener_libros = ej3a2.obtener_libros.__wrapped__
+
+    resultados = {}
+    for formato in filas.FORMATOS:
+        inicio = time.perf_counter()
+        libros = obtener_libros(conn, formato)
+        segundos = time.perf_counter() - inicio
+        resultados[formato] = {
+            'bytes_por_fila': filas.bytes_por_fila(libros),
+            'filas_por_segundo': filas_libros / segundos,
+        }
+        del libros
+    conn.close()
+
+    for formato, medidas in resultados.items():
+        print(f"[filas] {formato}: {medidas['bytes_por_fila']:.1f} bytes/fila, "
+              f"{medidas['filas_por_segundo']:,.0f} filas/s")
+    return resultados
+
+
+def _generar_ventas(ruta, ventas):
+    """Copia ventas_comerciales.db en ruta y le añade ventas sintéticas"""
+    shutil.copyfile(ej3a3.DB_PATH, ruta)
+    conn = sqlite3.connect(ruta)
+    productos = conn.execute("SELECT COUNT(*) FROM productos").fetchone()[0]
+    vendedores = conn.execute("SELECT COUNT(*) FROM vendedores").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO ventas (fecha, vendedor_id, producto_id, cantidad) VALUES (?, ?, ?, ?)",
+        ((f"2023-{i % 12 + 1:02d}-{i % 28 + 1:02d}", i % vendedores + 1, i % productos + 1, i % 10 + 1)
+         for i in range(ventas)))
+    conn.commit()
+    return conn
+
+
+def bench_json_columnar(ventas=200_000):
+    """Tamaño y tiempo de serialización de convertir_a_json por filas frente a por columnas"""
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        conn = _generar_ventas(os.path.join(directorio, 'ventas.db'), ventas)
+        for modo, argumentos in (('filas', {}),
+                                 ('columnas', {'formato': 'columnas'}),
+                                 ('columnas + diccionario', {'formato': 'columnas', 'diccionario': True})):
+            inicio = time.perf_counter()
+            datos = ej3a3.convertir_a_json(conn, **argumentos)
+            convertir = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            carga = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+            resultados[modo] = {
+                'bytes': len(carga),
+                'segundos_conversion': convertir,
+                'segundos_serializacion': time.perf_counter() - inicio,
+            }
+        conn.close()
+
+    for modo, medidas in resultados.items():
+        print(f"[json_columnar] {modo}: {medidas['bytes'] / 1e6:.1f} MB, "
+              f"conversión {medidas['segundos_conversion']:.3f} s, "
+              f"json.dumps {medidas['segundos_serializacion']:.3f} s")
+    return resultados
+
+
+def _dataframes_con_joins(conn):
+    """convertir_a_dataframes con una consulta JOIN por tabla combinada (versión anterior)"""
+    dataframes = {tabla: pd.read_sql_query(f"SELECT * FROM {tabla}", conn)
+                  for tabla in ej3a3.listar_tablas(conn)}
+    dataframes['ventas_productos'] = pd.read_sql_query("""
+        SELECT v.*, p.nombre as producto_nombre, p.categoria, p.precio_unitario
+        FROM ventas v JOIN productos p ON v.producto_id = p.id""", conn)
+    dataframes['ventas_vendedores'] = pd.read_sql_query("""
+        SELECT v.*, vd.nombre as vendedor_nombre
+        FROM ventas v JOIN vendedores vd ON v.vendedor_id = vd.id""", conn)
+    dataframes['vendedores_regiones'] = pd.read_sql_query("""
+        SELECT v.*, r.nombre as region_nombre, r.pais
+        FROM vendedores v JOIN regiones r ON v.region_id = r.id""", conn)
+    dataframes['ventas_completas'] = pd.read_sql_query("""
+        SELECT v.*, p.nombre as producto_nombre, p.categoria, p.precio_unitario,
+               vd.nombre as vendedor_nombre, r.nombre as region_nombre, r.pais
+        FROM ventas v
+        JOIN productos p ON v.producto_id = p.id
+        JOIN vendedores vd ON v.vendedor_id = vd.id
+        JOIN regiones r ON vd.region_id = r.id""", conn)
+    return dataframes
+
+
+def bench_dataframes(ventas=1_000_000):
+    """Segundos de convertir_a_dataframes: JOIN en SQLite frente a merges perezosos"""
+    with tempfile.TemporaryDirectory() as directorio:
+        conn = _generar_ventas(os.path.join(directorio, 'ventas.db'), ventas)
+
+        def perezoso(combinadas):
+            dataframes = ej3a3.convertir_a_dataframes(conn)
+            for nombre in combinadas:
+                dataframes[nombre]
+
+        resultados = {
+            'joins_sqlite': 1 / _medir(lambda: _dataframes_con_joins(conn), 1),
+            'merges_todas': 1 / _medir(lambda: perezoso(ej3a3.COMBINACIONES), 1),
+            'merges_una': 1 / _medir(lambda: perezoso(['ventas_completas']), 1),
+            'merges_ninguna': 1 / _medir(lambda: perezoso([]), 1),
+        }
+        conn.close()
+
+    for modo, segundos in resultados.items():
+        print(f"[dataframes] {ventas:,} ventas - {modo}: {segundos:.3f} s")
+    return resultados
+
+
+def bench_dataframes_tipos(ventas=10_000_000):
+    """Memoria de cada tabla cargada con los tipos de pandas frente a TIPOS_COLUMNAS"""
+    with tempfile.TemporaryDirectory() as directorio:
+        conn = _generar_ventas(os.path.join(directorio, 'ventas.db'), ventas)
+        tablas = ej3a3.listar_tablas(conn)
+
+        resultados = {}
+        for tipado in (False, True):
+            inicio = time.perf_counter()
+            dataframes = ej3a3.convertir_a_dataframes(conn, tipado=tipado)
+            resultados['segundos_con_tipos' if tipado else 'segundos_sin_tipos'] = time.perf_counter() - inicio
+            # Solo las tablas base: las combinadas sin tipos no caben en memoria con 10M ventas
+            resultados['con_tipos' if tipado else 'sin_tipos'] = {tabla: dataframes[tabla] for tabla in tablas}
+            del dataframes
+        conn.close()
+
+    informe = ej3a3.informe_memoria(resultados.pop('sin_tipos'), resultados.pop('con_tipos'))
+    print(f"[dataframes_tipos] {ventas:,} ventas - lectura sin tipos: {resultados['segundos_sin_tipos']:.1f} s, "
+          f"con tipos: {resultados['segundos_con_tipos']:.1f} s")
+    for tabla, medidas in informe.items():
+        print(f"[dataframes_tipos] {tabla}: {medidas['bytes_sin_tipos'] / 1e6:,.1f} MB -> "
+              f"{medidas['bytes_con_tipos'] / 1e6:,.1f} MB ({medidas['porcentaje_ahorrado']:.0f}% menos)")
+    resultados['informe'] = informe
+    return resultados
+
+
+def bench_cache_dataframes(ventas=1_000_000):
+    """Segundos de convertir_a_dataframes_cacheado sin caché (frío) y con ella (caliente)"""
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        conn = _generar_ventas(os.path.join(directorio, 'ventas.db'), ventas)
+        cache = os.path.join(directorio, 'cache')
+        for tipado in (False, True):
+            modo = 'con_tipos' if tipado else 'sin_tipos'
+            resultados[f'{modo}_extraccion'] = 1 / _medir(
+                lambda: ej3a3.convertir_a_dataframes(conn, tipado), 1)
+            resultados[f'{modo}_frio'] = 1 / _medir(
+                lambda: ej3a3.convertir_a_dataframes_cacheado(conn, tipado, cache), 1)
+            resultados[f'{modo}_caliente'] = 1 / _medir(
+                lambda: ej3a3.convertir_a_dataframes_cacheado(conn, tipado, cache), 1)
+        conn.close()
+
+    for modo, segundos in resultados.items():
+        print(f"[cache_dataframes] {ventas:,} ventas - {modo}: {segundos:.3f} s")
+    return resultados
+
+
+def bench_resumenes(ventas=1_000_000, consultas=20, altas=10_000):
+    """Consultas/segundo de consultar_resumen frente a agrupar la unión, y coste de los triggers"""
+    with tempfile.TemporaryDirectory() as directorio:
+        conn = _generar_ventas(os.path.join(directorio, 'ventas.db'), ventas)
+
+        def insertar_altas():
+            conn.executemany(
+                "INSERT INTO ventas (fecha, vendedor_id, producto_id, cantidad) VALUES ('2024-01-15', ?, ?, 1)",
+                ((i % 8 + 1, i % 10 + 1) for i in range(altas)))
+            conn.commit()
+
+        def agrupar_union():
+            conn.execute("""
+                SELECT r.id, r.nombre, substr(v.fecha, 1, 7),
+                       SUM(v.cantidad * p.precio_unitario), SUM(v.cantidad), COUNT(*)
+                FROM ventas v
+                JOIN productos p ON v.producto_id = p.id
+                JOIN vendedores vd ON v.vendedor_id = vd.id
+                JOIN regiones r ON vd.region_id = r.id
+                GROUP BY r.id, substr(v.fecha, 1, 7)""").fetchall()
+
+        resultados = {'altas_sin_triggers': altas * _medir(insertar_altas, 1)}
+        resultados['agrupar_union'] = _medir(agrupar_union, consultas)
+        ej3a3.instalar_resumenes(conn)
+        resultados['consultar_resumen'] = _medir(
+            lambda: ej3a3.consultar_resumen(conn, ['region', 'mes']), consultas)
+        resultados['altas_con_triggers'] = altas * _medir(insertar_altas, 1)
+        conn.close()
+
+    print(f"[resumenes] {ventas:,} ventas - JOIN + GROUP BY: {resultados['agrupar_union']:,.1f} consultas/s")
+    print(f"[resumenes] {ventas:,} ventas - consultar_resumen: {resultados['consultar_resumen']:,.1f} consultas/s")
+    print(f"[resumenes] altas sin triggers: {resultados['altas_sin_triggers']:,.0f} filas/s, "
+          f"con triggers: {resultados['altas_con_triggers']:,.0f} filas/s")
+    return resultados
+
+
+BENCHMARKS = {
+    'pool': bench_pool,
+    'fts': bench_fts,
+    'carga_masiva': bench_carga_masiva,
+    'instrumentacion': bench_instrumentacion,
+    'async': bench_async,
+    'plantilla': bench_plantilla,
+    'script_sql': bench_script_sql,
+    'lectura_paralela': bench_lectura_paralela,
+    'filas': bench_filas,
+    'json_columnar': bench_json_columnar,
+    'dataframes': bench_dataframes,
+    'dataframes_tipos': bench_dataframes_tipos,
+    'cache_dataframes': bench_cache_dataframes,
+    'resumenes': bench_resumenes,
+}
+
+if __name__ == "__main__":
+    nombres = sys.argv[1:] or list(BENCHMARKS)
+    for nombre in nombres:
+        BENCHMARKS[nombre]()
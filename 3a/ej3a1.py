@@ -15,19 +15,392 @@ Este ejercicio se enfoca en las operaciones básicas de SQL desde Python sin uti
 
 import sqlite3
 import os
+import itertools
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 
 # Ruta de la base de datos (en memoria para este ejemplo)
 # Para una base de datos en archivo, usar: 'biblioteca.db'
 DB_PATH = ':memory:'
 
+# Tamaño máximo del pool y tiempo de espera (segundos) por defecto
+POOL_MAX_CONEXIONES = 5
+POOL_TIMEOUT = 5.0
+
+def configurar_conexion(conexion, timeout=POOL_TIMEOUT):
+    """
+    Aplica a una conexión nueva el modo WAL y el tiempo de espera por bloqueo
+    """
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+    return conexion
+
+class ConexionPool(sqlite3.Connection):
+    """
+    Conexión SQLite que pertenece a un pool: close() la devuelve al pool
+    en lugar de cerrarla
+    """
+    _pool = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.devolver(self)
+        else:
+            super().close()
+
+class _Prestamo:
+    """
+    Conexión prestada a un hilo, guardada en su threading.local
+
+    Si el hilo termina sin devolverla, el threading.local se vacía y el
+    finalizador devuelve la conexión al pool.
+    """
+    __slots__ = ('conexion', 'prestamos', 'finalizador', '__weakref__')
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.prestamos = 1
+        self.finalizador = None
+
+class PoolConexiones:
+    """
+    Pool de conexiones SQLite con afinidad por hilo
+
+    Cada hilo tiene como mucho una conexión prestada a la vez; pedirla de nuevo
+    desde el mismo hilo devuelve la misma conexión (préstamo reentrante). Al
+    devolverla vuelve a la lista de conexiones libres y se reutiliza, dando
+    preferencia al hilo que la usó por última vez. Los PRAGMA (WAL y
+    busy_timeout) se aplican una única vez, al crear cada conexión. Si un hilo
+    termina sin devolver su conexión, esta vuelve al pool automáticamente.
+
+    Nota: con ':memory:' cada conexión es una base de datos distinta, así que
+    los datos se conservan mientras la conexión siga en el pool; por eso
+    crear_conexion no usa el pool en ese caso.
+    """
+
+    def __init__(self, db_path=None, max_conexiones=POOL_MAX_CONEXIONES, timeout=POOL_TIMEOUT):
+        self.db_path = db_path if db_path is not None else DB_PATH
+        self.max_conexiones = max_conexiones
+        self.timeout = timeout
+        self._condicion = threading.Condition()
+        self._libres = []
+        self._total = 0
+        self._local = threading.local()
+        self._cerrado = False
+
+    def _abrir(self):
+        conexion = sqlite3.connect(self.db_path, factory=ConexionPool,
+                                   check_same_thread=False, timeout=self.timeout)
+        configurar_conexion(conexion, self.timeout)
+        conexion._pool = self
+        return conexion
+
+    def obtener(self):
+        """
+        Presta una conexión al hilo actual (la misma si ya tiene una prestada)
+        """
+        prestamo = getattr(self._local, 'prestamo', None)
+        if prestamo is not None:
+            prestamo.prestamos += 1
+            return prestamo.conexion
+
+        with self._condicion:
+            if self._cerrado:
+                raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+
+            ultima = getattr(self._local, 'ultima', None)
+            if not self._libres and self._total >= self.max_conexiones:
+                if not self._condicion.wait_for(
+                        lambda: self._libres or self._total < self.max_conexiones or self._cerrado,
+                        timeout=self.timeout):
+                    raise sqlite3.OperationalError("No hay conexiones disponibles en el pool")
+                if self._cerrado:
+                    raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+
+            if ultima is not None and ultima in self._libres:
+                self._libres.remove(ultima)
+                conexion = ultima
+            elif self._libres:
+                conexion = self._libres.pop()
+            else:
+                conexion = None
+                self._total += 1
+
+        if conexion is None:
+            try:
+                conexion = self._abrir()
+            except sqlite3.Error:
+                with self._condicion:
+                    self._total -= 1
+                    self._condicion.notify()
+                raise
+
+        prestamo = _Prestamo(conexion)
+        # Se ejecuta si el hilo termina con la conexión prestada
+        prestamo.finalizador = weakref.finalize(prestamo, self._recuperar, conexion)
+        prestamo.finalizador.atexit = False
+        self._local.prestamo = prestamo
+        self._local.ultima = conexion
+        return conexion
+
+    def devolver(self, conexion):
+        """
+        Devuelve al pool una conexión prestada al hilo actual
+        """
+        prestamo = getattr(self._local, 'prestamo', None)
+        if prestamo is None or prestamo.conexion is not conexion:
+            raise sqlite3.ProgrammingError("La conexión no está prestada a este hilo")
+
+        prestamo.prestamos -= 1
+        if prestamo.prestamos > 0:
+            return
+
+        prestamo.finalizador.detach()
+        self._local.prestamo = None
+        self._recuperar(conexion)
+
+    def _recuperar(self, conexion):
+        """
+        Vuelve a poner en el pool una conexión que ya no está prestada
+        """
+        # Una conexión devuelta nunca debe arrastrar una transacción a medias
+        if conexion.in_transaction:
+            conexion.rollback()
+
+        with self._condicion:
+            if self._cerrado:
+                sqlite3.Connection.close(conexion)
+                self._total -= 1
+            else:
+                self._libres.append(conexion)
+            self._condicion.notify()
+
+    @contextmanager
+    def conexion(self):
+        """
+        Context manager que presta una conexión y la devuelve al terminar
+        """
+        conexion = self.obtener()
+        try:
+            yield conexion
+        finally:
+            self.devolver(conexion)
+
+    def cerrar(self):
+        """
+        Cierra las conexiones libres; las prestadas se cierran al devolverse
+        """
+        with self._condicion:
+            self._cerrado = True
+            for conexion in self._libres:
+                sqlite3.Connection.close(conexion)
+            self._total -= len(self._libres)
+            self._libres.clear()
+            self._condicion.notify_all()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def obtener_pool():
+    """
+    Devuelve el pool de conexiones del módulo, creándolo la primera vez
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._cerrado or _pool.db_path != DB_PATH:
+            if _pool is not None:
+                # Las conexiones prestadas del pool anterior se cierran al devolverse
+                _pool.cerrar()
+            _pool = PoolConexiones(DB_PATH)
+        return _pool
+
 def crear_conexion():
     """
     Crea y devuelve una conexión a la base de datos SQLite
+
+    Con una base de datos en archivo, la conexión se toma del pool del módulo y
+    llamar a close() la devuelve al pool. Con ':memory:' cada conexión es una
+    base de datos distinta, así que se crea una nueva cada vez (sin pool ni
+    WAL, que no se aplica en memoria) y close() la cierra de verdad.
     """
     # Implementa la creación de la conexión y retorna el objeto conexión
-    conexion = sqlite3.connect(DB_PATH)
+    if DB_PATH == ':memory:':
+        return sqlite3.connect(DB_PATH)
+    conexion = obtener_pool().obtener()
     return conexion
 
+SQL_INDICES = {
+    'idx_autores_nombre': "CREATE UNIQUE INDEX IF NOT EXISTS idx_autores_nombre ON autores (nombre)",
+    'idx_libros_autor': "CREATE INDEX IF NOT EXISTS idx_libros_autor ON libros (autor_id, titulo, anio)",
+}
+
+SQL_LIBROS = """
+    SELECT libros.titulo, libros.anio, autores.nombre
+    FROM libros
+    JOIN autores ON libros.autor_id = autores.id
+    """
+
+SQL_PAGINA_LIBROS = """
+    SELECT libros.id, libros.titulo, libros.anio, autores.nombre
+    FROM libros
+    JOIN autores ON libros.autor_id = autores.id
+    WHERE libros.id > ?
+    ORDER BY libros.id
+    LIMIT ?
+    """
+
+SQL_LIBROS_POR_AUTOR = """
+    SELECT libros.titulo, libros.anio
+    FROM libros
+    JOIN autores ON libros.autor_id = autores.id
+    WHERE autores.nombre = ?
+    """
+
+SQL_ACTUALIZAR_LIBRO = "UPDATE libros SET {columnas} WHERE id = ?"
+
+SQL_ELIMINAR_LIBRO = "DELETE FROM libros WHERE id = ?"
+
+# Índice de texto completo sobre títulos y autores. El tokenizador trigram
+# permite buscar subcadenas de al menos 3 caracteres (sin distinguir mayúsculas)
+SQL_CREAR_FTS = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS libros_fts
+    USING fts5(titulo, autor, tokenize='trigram')
+    """
+
+# Triggers que mantienen libros_fts sincronizada con libros y autores
+SQL_TRIGGERS_FTS = {
+    'libros_fts_insert': """CREATE TRIGGER IF NOT EXISTS libros_fts_insert AFTER INSERT ON libros BEGIN
+        INSERT INTO libros_fts (rowid, titulo, autor)
+        VALUES (new.id, new.titulo, (SELECT nombre FROM autores WHERE id = new.autor_id));
+    END""",
+    'libros_fts_delete': """CREATE TRIGGER IF NOT EXISTS libros_fts_delete AFTER DELETE ON libros BEGIN
+        DELETE FROM libros_fts WHERE rowid = old.id;
+    END""",
+    'libros_fts_update': """CREATE TRIGGER IF NOT EXISTS libros_fts_update
+    AFTER UPDATE OF id, titulo, autor_id ON libros BEGIN
+        DELETE FROM libros_fts WHERE rowid = old.id;
+        INSERT INTO libros_fts (rowid, titulo, autor)
+        VALUES (new.id, new.titulo, (SELECT nombre FROM autores WHERE id = new.autor_id));
+    END""",
+    'autores_fts_update': """CREATE TRIGGER IF NOT EXISTS autores_fts_update AFTER UPDATE OF nombre ON autores BEGIN
+        UPDATE libros_fts SET autor = new.nombre
+        WHERE rowid IN (SELECT id FROM libros WHERE autor_id = new.id);
+    END""",
+}
+
+SQL_BUSCAR_LIBROS = """
+    SELECT libros.id, libros.titulo, libros.anio, autores.nombre
+    FROM libros_fts
+    JOIN libros ON libros.id = libros_fts.rowid
+    JOIN autores ON libros.autor_id = autores.id
+    WHERE libros_fts MATCH ?
+    ORDER BY bm25(libros_fts)
+    LIMIT ?
+    """
+
+# Consultas que deben resolverse con índices (SQL_LIBROS recorre la tabla entera
+# a propósito). Los parámetros solo sirven para poder pedir el plan.
+CONSULTAS_INDEXADAS = {
+    'paginar_libros': (SQL_PAGINA_LIBROS, (0, 1)),
+    'buscar_libros_por_autor': (SQL_LIBROS_POR_AUTOR, ('',)),
+    'actualizar_libro': (SQL_ACTUALIZAR_LIBRO.format(columnas='titulo = ?, anio = ?'), ('', 0, 0)),
+    'eliminar_libro': (SQL_ELIMINAR_LIBRO, (0,)),
+}
+
+def plan_consulta(conexion, sql, parametros=()):
+    """
+    Devuelve el plan de ejecución (EXPLAIN QUERY PLAN) de una consulta
+    como una lista con el detalle de cada paso
+    """
+    # Un EXPLAIN no comprueba la versión del esquema al ejecutarse, así que
+    # sqlite3_prepare_v2 no lo vuelve a preparar tras un DROP INDEX, y el módulo
+    # sqlite3 reutilizaría el plan antiguo de su caché de sentencias. Con la
+    # versión del esquema en el texto solo hay una sentencia nueva por cambio
+    # de esquema, no una por llamada.
+    esquema = conexion.execute("PRAGMA schema_version").fetchone()[0]
+    cursor = conexion.execute(f"EXPLAIN QUERY PLAN {sql} /* esquema {esquema} */", parametros)
+    return [fila[3] for fila in cursor.fetchall()]
+
+def verificar_planes_consulta(conexion, consultas=None):
+    """
+    Comprueba que ninguna consulta indexada del módulo recorre una tabla completa
+
+    Retorna un diccionario {nombre: plan}; lanza RuntimeError si algún plan
+    contiene un SCAN
+    """
+    consultas = consultas if consultas is not None else CONSULTAS_INDEXADAS
+    planes = {}
+    regresiones = []
+
+    for nombre, (sql, parametros) in consultas.items():
+        planes[nombre] = plan_consulta(conexion, sql, parametros)
+        for paso in planes[nombre]:
+            if paso.startswith('SCAN'):
+                regresiones.append(f"{nombre}: {paso}")
+
+    if regresiones:
+        raise RuntimeError("Consultas que recorren tablas completas: " + "; ".join(regresiones))
+    return planes
+
+# Nivel de anidamiento de las unidades de trabajo abiertas, por id de conexión
+_unidades_activas = {}
+
+@contextmanager
+def unidad_de_trabajo(conexion):
+    """
+    Agrupa varias escrituras en una única transacción
+
+    Mientras está abierta, las funciones de escritura del módulo no hacen commit:
+    se confirma todo junto al salir del bloque, o se deshace si hay una excepción.
+    Las unidades anidadas usan SAVEPOINT, de modo que un error dentro de una de
+    ellas solo deshace sus propios cambios.
+    """
+    clave = id(conexion)
+    nivel = _unidades_activas.get(clave, 0)
+
+    if nivel == 0:
+        # Si ya hay una transacción implícita abierta, se incorpora a la unidad
+        if not conexion.in_transaction:
+            conexion.execute("BEGIN")
+    else:
+        conexion.execute(f"SAVEPOINT unidad_{nivel}")
+    _unidades_activas[clave] = nivel + 1
+
+    try:
+        yield conexion
+    except BaseException:
+        if nivel == 0:
+            conexion.rollback()
+        else:
+            conexion.execute(f"ROLLBACK TO SAVEPOINT unidad_{nivel}")
+            conexion.execute(f"RELEASE SAVEPOINT unidad_{nivel}")
+        raise
+    else:
+        if nivel == 0:
+            conexion.commit()
+        else:
+            conexion.execute(f"RELEASE SAVEPOINT unidad_{nivel}")
+    finally:
+        if nivel == 0:
+            del _unidades_activas[clave]
+        else:
+            _unidades_activas[clave] = nivel
+
+def en_unidad_de_trabajo(conexion):
+    """
+    Indica si la conexión tiene una unidad de trabajo abierta
+    """
+    return id(conexion) in _unidades_activas
+
+def _confirmar(conexion):
+    """
+    Hace commit salvo que la conexión esté dentro de una unidad de trabajo
+    """
+    if not en_unidad_de_trabajo(conexion):
+        conexion.commit()
+
 def crear_tablas(conexion):
     """
     Crea las tablas necesarias para la biblioteca:
@@ -52,9 +425,66 @@ def crear_tablas(conexion):
             autor_id INTEGER NOT NULL,
             FOREIGN KEY (autor_id) REFERENCES autores(id)
                    )""")
+
+    # Índices para las búsquedas por autor: el de autores es único (un nombre,
+    # un autor) y el de libros incluye titulo y anio para que la proyección
+    # (titulo, anio) se resuelva solo con el índice
+    for sentencia in SQL_INDICES.values():
+        cursor.execute(sentencia)
+
+    crear_indice_busqueda(conexion)
     
     # Usa conexion.cursor() para crear un cursor y ejecutar comandos SQL
-    conexion.commit()
+    _confirmar(conexion)
+
+def crear_indice_busqueda(conexion):
+    """
+    Crea la tabla FTS5 libros_fts y sus triggers de sincronización
+    Si ya hay libros en la base de datos, se indexan al crear la tabla
+    """
+    cursor = conexion.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'libros_fts'")
+    existia = cursor.fetchone() is not None
+
+    cursor.execute(SQL_CREAR_FTS)
+    # Los triggers creados con otra definición (versiones anteriores) se sustituyen
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+    existentes = dict(cursor.fetchall())
+    for nombre, sentencia in SQL_TRIGGERS_FTS.items():
+        if nombre in existentes and existentes[nombre] != sentencia.replace(' IF NOT EXISTS', '', 1):
+            cursor.execute(f"DROP TRIGGER {nombre}")
+        cursor.execute(sentencia)
+
+    if not existia:
+        cursor.execute("""
+            INSERT INTO libros_fts (rowid, titulo, autor)
+            SELECT libros.id, libros.titulo, autores.nombre
+            FROM libros
+            LEFT JOIN autores ON libros.autor_id = autores.id
+            """)
+    _confirmar(conexion)
+
+def _consulta_fts(texto):
+    """
+    Convierte un texto libre en una consulta FTS5: cada palabra se busca como
+    subcadena literal y todas deben aparecer. Se ignoran las palabras de menos
+    de 3 caracteres, que el tokenizador trigram no puede indexar.
+    """
+    terminos = [palabra for palabra in texto.split() if len(palabra) >= 3]
+    return " ".join('"' + termino.replace('"', '""') + '"' for termino in terminos)
+
+def buscar_libros(conexion, texto, limite=10):
+    """
+    Busca libros cuyo título o autor contenga las palabras de texto
+    Retorna una lista de tuplas (id, titulo, anio, autor) ordenada por relevancia (bm25)
+    """
+    consulta = _consulta_fts(texto)
+    if not consulta:
+        return []
+
+    cursor = conexion.cursor()
+    cursor.execute(SQL_BUSCAR_LIBROS, (consulta, limite))
+    return cursor.fetchall()
 
 def insertar_autores(conexion, autores):
     """
@@ -64,7 +494,44 @@ def insertar_autores(conexion, autores):
     # Implementa la inserción de autores usando SQL INSERT
     cursor = conexion.cursor()
     cursor.executemany('INSERT INTO autores (nombre) VALUES (?)', autores)
-    conexion.commit()
+    _confirmar(conexion)
+
+# Nombres por sentencia INSERT en upsert_autores (lejos del límite de variables de SQLite)
+TAMANO_LOTE_UPSERT = 500
+
+def upsert_autores(conexion, nombres, tamano_lote=TAMANO_LOTE_UPSERT):
+    """
+    Inserta los autores que no existan y devuelve un diccionario {nombre: id}
+    con el id de todos los nombres recibidos, nuevos o ya existentes
+
+    Cada lote se inserta con un único INSERT ... ON CONFLICT DO NOTHING RETURNING;
+    solo los nombres que ya existían requieren un SELECT adicional por lote.
+    """
+    ids = {}
+    pendientes = list(dict.fromkeys(nombres))
+    cursor = conexion.cursor()
+
+    for inicio in range(0, len(pendientes), tamano_lote):
+        lote = pendientes[inicio:inicio + tamano_lote]
+        cursor.execute(f"""
+            INSERT INTO autores (nombre) VALUES {", ".join(["(?)"] * len(lote))}
+            ON CONFLICT DO NOTHING
+            RETURNING id, nombre
+            """, lote)
+        for autor_id, nombre in cursor.fetchall():
+            ids[nombre] = autor_id
+
+        existentes = [nombre for nombre in lote if nombre not in ids]
+        if existentes:
+            cursor.execute(f"""
+                SELECT id, nombre FROM autores
+                WHERE nombre IN ({", ".join("?" * len(existentes))})
+                """, existentes)
+            for autor_id, nombre in cursor.fetchall():
+                ids[nombre] = autor_id
+
+    _confirmar(conexion)
+    return ids
 
 def insertar_libros(conexion, libros):
     """
@@ -75,7 +542,118 @@ def insertar_libros(conexion, libros):
     # Usa consultas parametrizadas para mayor seguridad
     cursor = conexion.cursor()
     cursor.executemany('INSERT INTO libros (titulo, anio, autor_id) VALUES (?, ?, ?)', libros)
-    conexion.commit()
+    _confirmar(conexion)
+
+# PRAGMA que se aplican durante una carga masiva y se restauran al terminar
+PRAGMAS_CARGA_MASIVA = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+}
+
+# Filas por executemany en una carga masiva
+TAMANO_LOTE_CARGA = 10000
+
+def _insertar_por_lotes(cursor, sql, filas, tamano_lote):
+    """
+    Inserta las filas de un iterable por lotes de tamano_lote y devuelve cuántas hay
+    """
+    iterador = iter(filas)
+    total = 0
+    while True:
+        lote = list(itertools.islice(iterador, tamano_lote))
+        if not lote:
+            return total
+        cursor.executemany(sql, lote)
+        total += len(lote)
+
+def carga_masiva(conexion, autores=(), libros=(), tamano_lote=TAMANO_LOTE_CARGA):
+    """
+    Carga autores y libros desde cualquier iterable (o generador) en una sola transacción
+
+    Los datos se insertan por lotes, así que nunca se tienen todos en memoria.
+    Durante la carga se relajan los PRAGMA de durabilidad (PRAGMAS_CARGA_MASIVA),
+    se eliminan los índices y el trigger de inserción de la búsqueda de texto,
+    y se reconstruyen al final; los PRAGMA originales se restauran siempre.
+    Si se cargan nombres de autor repetidos, el índice único no puede
+    reconstruirse y se deshace la carga completa (sqlite3.IntegrityError).
+
+    Retorna un diccionario con las filas insertadas, los segundos empleados y
+    las filas por segundo
+    """
+    if conexion.in_transaction:
+        raise sqlite3.ProgrammingError("La carga masiva no puede ejecutarse dentro de una transacción")
+
+    cursor = conexion.cursor()
+    # journal_mode no puede cambiarse dentro de una transacción: se aplica antes de BEGIN
+    pragmas_originales = {}
+    for pragma, valor in PRAGMAS_CARGA_MASIVA.items():
+        pragmas_originales[pragma] = cursor.execute(f"PRAGMA {pragma}").fetchone()[0]
+        cursor.execute(f"PRAGMA {pragma}={valor}")
+
+    inicio = time.perf_counter()
+    try:
+        with unidad_de_trabajo(conexion):
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM libros")
+            ultimo_libro = cursor.fetchone()[0]
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'libros_fts'")
+            con_fts = cursor.fetchone() is not None
+
+            for nombre in SQL_INDICES:
+                cursor.execute(f"DROP INDEX IF EXISTS {nombre}")
+            cursor.execute("DROP TRIGGER IF EXISTS libros_fts_insert")
+
+            total_autores = _insertar_por_lotes(
+                cursor, 'INSERT INTO autores (nombre) VALUES (?)', autores, tamano_lote)
+            total_libros = _insertar_por_lotes(
+                cursor, 'INSERT INTO libros (titulo, anio, autor_id) VALUES (?, ?, ?)',
+                libros, tamano_lote)
+
+            for sentencia in SQL_INDICES.values():
+                cursor.execute(sentencia)
+            if con_fts:
+                cursor.execute("""
+                    INSERT INTO libros_fts (rowid, titulo, autor)
+                    SELECT libros.id, libros.titulo, autores.nombre
+                    FROM libros
+                    LEFT JOIN autores ON libros.autor_id = autores.id
+                    WHERE libros.id > ?
+                    """, (ultimo_libro,))
+                cursor.execute(SQL_TRIGGERS_FTS['libros_fts_insert'])
+    finally:
+        for pragma, valor in pragmas_originales.items():
+            cursor.execute(f"PRAGMA {pragma}={valor}")
+
+    segundos = time.perf_counter() - inicio
+    filas = total_autores + total_libros
+    return {
+        'autores': total_autores,
+        'libros': total_libros,
+        'segundos': segundos,
+        'filas_por_segundo': filas / segundos if segundos else float('inf'),
+    }
+
+# Filas que se piden a SQLite en cada fetchmany al recorrer resultados
+TAMANO_LOTE = 500
+
+def _iterar_filas(cursor, tamano_lote):
+    """
+    Recorre un cursor ya ejecutado por lotes de fetchmany, sin cargarlo entero
+    """
+    cursor.arraysize = tamano_lote
+    while True:
+        filas = cursor.fetchmany()
+        if not filas:
+            break
+        yield from filas
+
+def iterar_libros(conexion, tamano_lote=TAMANO_LOTE):
+    """
+    Generador que devuelve los libros con su autor fila a fila
+    Produce tuplas (titulo, anio, autor)
+    """
+    cursor = conexion.cursor()
+    cursor.execute(SQL_LIBROS)
+    yield from _iterar_filas(cursor, tamano_lote)
 
 def consultar_libros(conexion):
     """
@@ -83,31 +661,47 @@ def consultar_libros(conexion):
     """
     # Implementa una consulta SQL JOIN para obtener libros con sus autores
     # Imprime los resultados formateados
-    cursor = conexion.cursor()
-    cursor.execute("""
-        SELECT libros.titulo, autores.nombre, libros.anio
-        FROM libros
-        JOIN autores ON libros.autor_id = autores.id
-        """)
-    
-    for titulo, anio, autor in cursor.fetchall():
+    for titulo, anio, autor in iterar_libros(conexion):
         print(f"{titulo} ({anio}) - {autor}")
 
+def paginar_libros(conexion, despues_de_id=0, limite=100):
+    """
+    Devuelve una página de libros con id mayor que despues_de_id (paginación por clave)
+    Retorna una lista de tuplas (id, titulo, anio, autor) ordenada por id
+    """
+    cursor = conexion.cursor()
+    cursor.execute(SQL_PAGINA_LIBROS, (despues_de_id, limite))
+    return cursor.fetchall()
+
+def iterar_paginas_libros(conexion, tamano_pagina=100):
+    """
+    Generador que recorre todo el catálogo página a página con memoria constante
+    Produce listas de tuplas (id, titulo, anio, autor)
+    """
+    ultimo_id = 0
+    while True:
+        pagina = paginar_libros(conexion, ultimo_id, tamano_pagina)
+        if not pagina:
+            break
+        yield pagina
+        ultimo_id = pagina[-1][0]
+
+def iterar_libros_por_autor(conexion, nombre_autor, tamano_lote=TAMANO_LOTE):
+    """
+    Generador que devuelve los libros de un autor fila a fila
+    Produce tuplas (titulo, anio)
+    """
+    cursor = conexion.cursor()
+    cursor.execute(SQL_LIBROS_POR_AUTOR, (nombre_autor,))
+    yield from _iterar_filas(cursor, tamano_lote)
+
 def buscar_libros_por_autor(conexion, nombre_autor):
     """
     Busca libros por el nombre del autor
     """
     # Implementa una consulta SQL con WHERE para filtrar por autor
     # Retorna una lista de tuplas (titulo, anio)
-    cursor = conexion.cursor()
-    cursor.execute("""
-        SELECT libros.titulo, autores.nombre
-        FROM libros
-        JOIN autores ON libros.autor_id = autores.id
-        WHERE autores.nombre = ?
-        """, (nombre_autor,))
-    
-    return cursor.fetchall()
+    return list(iterar_libros_por_autor(conexion, nombre_autor))
 
 def actualizar_libro(conexion, id_libro, nuevo_titulo=None, nuevo_anio=None):
     """
@@ -131,41 +725,82 @@ def actualizar_libro(conexion, id_libro, nuevo_titulo=None, nuevo_anio=None):
 
     values.append(id_libro)
 
-    query = f"UPDATE libros SET {', '.join(updates)} WHERE id = ?"
+    query = SQL_ACTUALIZAR_LIBRO.format(columnas=', '.join(updates))
     cursor.execute(query, values)
-    conexion.commit()
+    _confirmar(conexion)
 
 def eliminar_libro(conexion, id_libro):
     """
     Elimina un libro por su ID
     """
     cursor = conexion.cursor()
-    cursor.execute('DELETE FROM libros WHERE id = ?', (id_libro,))
-    conexion.commit()
+    cursor.execute(SQL_ELIMINAR_LIBRO, (id_libro,))
+    _confirmar(conexion)
+
+def actualizar_libros(conexion, cambios):
+    """
+    Aplica muchas actualizaciones de libros en una sola transacción
+    Parámetro cambios: iterable de tuplas (id_libro, nuevo_titulo, nuevo_anio);
+    como en actualizar_libro, los campos None no se modifican
+
+    Los cambios se agrupan según las columnas que modifican, de modo que cada
+    forma de UPDATE se prepara una sola vez y se ejecuta con executemany.
+    Retorna el número de libros actualizados
+    """
+    grupos = {}
+    for id_libro, nuevo_titulo, nuevo_anio in cambios:
+        columnas = []
+        valores = []
+        if nuevo_titulo is not None:
+            columnas.append("titulo = ?")
+            valores.append(nuevo_titulo)
+        if nuevo_anio is not None:
+            columnas.append("anio = ?")
+            valores.append(nuevo_anio)
+        if columnas:
+            valores.append(id_libro)
+            grupos.setdefault(", ".join(columnas), []).append(valores)
+
+    actualizados = 0
+    with unidad_de_trabajo(conexion):
+        cursor = conexion.cursor()
+        for columnas, filas in grupos.items():
+            cursor.executemany(SQL_ACTUALIZAR_LIBRO.format(columnas=columnas), filas)
+            actualizados += cursor.rowcount
+    return actualizados
+
+def eliminar_libros(conexion, ids_libros):
+    """
+    Elimina muchos libros por su ID en una sola transacción
+    Los ids se cargan en una tabla temporal y se borran con un único DELETE
+    Retorna el número de libros eliminados
+    """
+    with unidad_de_trabajo(conexion):
+        cursor = conexion.cursor()
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS ids_eliminar (id INTEGER PRIMARY KEY)")
+        cursor.execute("DELETE FROM temp.ids_eliminar")
+        cursor.executemany("INSERT OR IGNORE INTO temp.ids_eliminar (id) VALUES (?)",
+                           ((id_libro,) for id_libro in ids_libros))
+        cursor.execute("DELETE FROM libros WHERE id IN (SELECT id FROM temp.ids_eliminar)")
+        eliminados = cursor.rowcount
+        cursor.execute("DELETE FROM temp.ids_eliminar")
+    return eliminados
 
 def ejemplo_transaccion(conexion):
     """
     Demuestra el uso de transacciones para operaciones agrupadas
     """
-    cursor = conexion.cursor()
-    try:
-        cursor.execute("BEGIN TRANSACTION")
-
-        # Ejemplo: Insertar un nuevo autor y sus libros
-        cursor.execute("INSERT INTO autores (nombre) VALUES (?)", ("Miguel de Cervantes",))
-        autor_id = cursor.lastrowid
+    # La unidad de trabajo hace commit al salir o rollback si hay un error
+    with unidad_de_trabajo(conexion):
+        # Ejemplo: Insertar un nuevo autor (o reutilizarlo si ya existe) y sus libros
+        autor_id = upsert_autores(conexion, ["Miguel de Cervantes"])["Miguel de Cervantes"]
 
         # Insertar dos libros del autor
         libros_cervantes = [
             ("Don Quijote de la Mancha", 1605, autor_id),
             ("Novelas ejemplares", 1613, autor_id)
         ]
-        cursor.executemany("INSERT INTO libros (titulo, anio, autor_id) VALUES (?, ?, ?)", libros_cervantes)
-
-        conexion.commit()
-    except sqlite3.Error:
-        conexion.rollback()
-        raise
+        insertar_libros(conexion, libros_cervantes)
 
 if __name__ == "__main__":
     try:
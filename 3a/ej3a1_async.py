@@ -0,0 +1,150 @@
+"""
+Fachada asyncio para las funciones de la biblioteca de ej3a1.py.
+
+Las funciones de ej3a1 son bloqueantes; llamarlas desde una corrutina detiene el
+bucle de eventos. BibliotecaAsync las ejecuta en hilos propios:
+- un único hilo escritor, con su conexión, para todas las escrituras (SQLite solo
+  admite un escritor a la vez, así que no se pierde paralelismo)
+- un pool pequeño de hilos lectores, cada uno con su conexión de solo lectura,
+  que gracias al modo WAL leen en paralelo con el escritor
+
+Uso:
+    async with BibliotecaAsync('biblioteca.db') as biblioteca:
+        await biblioteca.crear_tablas()
+        await biblioteca.insertar_libros(libros)
+        libros = await biblioteca.buscar_libros_por_autor("Isabel Allende")
+        async for titulo, anio, autor in biblioteca.iterar_libros():
+            ...
+"""
+
+import asyncio
+import functools
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import ej3a1
+
+# Hilos lectores por defecto
+LECTORES = 4
+
+def _lectura(funcion):
+    """Crea un método asíncrono que ejecuta funcion en un hilo lector"""
+    @functools.wraps(funcion)
+    async def metodo(self, *args, **kwargs):
+        return await self.ejecutar_lectura(funcion, *args, **kwargs)
+    return metodo
+
+def _escritura(funcion):
+    """Crea un método asíncrono que ejecuta funcion en el hilo escritor"""
+    @functools.wraps(funcion)
+    async def metodo(self, *args, **kwargs):
+        return await self.ejecutar_escritura(funcion, *args, **kwargs)
+    return metodo
+
+class BibliotecaAsync:
+    """
+    Versión asíncrona de las funciones de ej3a1 sobre una base de datos en archivo
+
+    Cada método recibe los mismos argumentos que la función de ej3a1 homónima,
+    salvo la conexión, que pone la propia clase.
+    """
+
+    def __init__(self, db_path, lectores=LECTORES, timeout=ej3a1.POOL_TIMEOUT):
+        if db_path == ':memory:':
+            raise ValueError("BibliotecaAsync necesita una base de datos en archivo")
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._conexiones = []
+        self._lock = threading.Lock()
+        self._escritor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='biblioteca-escritor',
+            initializer=self._abrir_conexion, initargs=(False,))
+        self._lectores = ThreadPoolExecutor(
+            max_workers=lectores, thread_name_prefix='biblioteca-lector',
+            initializer=self._abrir_conexion, initargs=(True,))
+
+    def _abrir_conexion(self, solo_lectura):
+        # Se ejecuta una vez en cada hilo del pool, al arrancarlo
+        conexion = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        ej3a1.configurar_conexion(conexion, self.timeout)
+        if solo_lectura:
+            conexion.execute("PRAGMA query_only=ON")
+        self._local.conexion = conexion
+        with self._lock:
+            self._conexiones.append(conexion)
+
+    def _llamar(self, funcion, args, kwargs):
+        return funcion(self._local.conexion, *args, **kwargs)
+
+    async def _ejecutar(self, executor, funcion, args, kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self._llamar, funcion, args, kwargs)
+
+    async def ejecutar_lectura(self, funcion, *args, **kwargs):
+        """
+        Ejecuta funcion(conexion, *args, **kwargs) en un hilo lector
+        """
+        return await self._ejecutar(self._lectores, funcion, args, kwargs)
+
+    async def ejecutar_escritura(self, funcion, *args, **kwargs):
+        """
+        Ejecuta funcion(conexion, *args, **kwargs) en el hilo escritor
+        Útil para agrupar varias escrituras en una unidad de trabajo
+        """
+        return await self._ejecutar(self._escritor, funcion, args, kwargs)
+
+    crear_tablas = _escritura(ej3a1.crear_tablas)
+    insertar_autores = _escritura(ej3a1.insertar_autores)
+    insertar_libros = _escritura(ej3a1.insertar_libros)
+    upsert_autores = _escritura(ej3a1.upsert_autores)
+    carga_masiva = _escritura(ej3a1.carga_masiva)
+    actualizar_libro = _escritura(ej3a1.actualizar_libro)
+    actualizar_libros = _escritura(ej3a1.actualizar_libros)
+    eliminar_libro = _escritura(ej3a1.eliminar_libro)
+    eliminar_libros = _escritura(ej3a1.eliminar_libros)
+    ejemplo_transaccion = _escritura(ej3a1.ejemplo_transaccion)
+
+    consultar_libros = _lectura(ej3a1.consultar_libros)
+    buscar_libros_por_autor = _lectura(ej3a1.buscar_libros_por_autor)
+    buscar_libros = _lectura(ej3a1.buscar_libros)
+    paginar_libros = _lectura(ej3a1.paginar_libros)
+
+    async def iterar_paginas_libros(self, tamano_pagina=100):
+        """
+        Recorre el catálogo con 'async for' página a página (paginación por clave)
+        Cada página se lee en un hilo lector: ninguno queda ocupado entre páginas
+        """
+        ultimo_id = 0
+        while True:
+            pagina = await self.paginar_libros(ultimo_id, tamano_pagina)
+            if not pagina:
+                break
+            yield pagina
+            ultimo_id = pagina[-1][0]
+
+    async def iterar_libros(self, tamano_pagina=100):
+        """
+        Recorre con 'async for' todos los libros como tuplas (titulo, anio, autor)
+        """
+        async for pagina in self.iterar_paginas_libros(tamano_pagina):
+            for _, titulo, anio, autor in pagina:
+                yield titulo, anio, autor
+
+    def cerrar(self):
+        """
+        Espera a que terminen las operaciones pendientes y cierra las conexiones
+        """
+        self._escritor.shutdown(wait=True)
+        self._lectores.shutdown(wait=True)
+        with self._lock:
+            for conexion in self._conexiones:
+                conexion.close()
+            self._conexiones.clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.get_running_loop().run_in_executor(None, self.cerrar)
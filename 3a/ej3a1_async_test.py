@@ -0,0 +1,54 @@
+"""
+Tests para ej3a1_async.py, la fachada asyncio de las funciones de ej3a1.py.
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from ej3a1_async import BibliotecaAsync
+
+AUTORES = [("Gabriel García Márquez",), ("Isabel Allende",), ("Jorge Luis Borges",)]
+LIBROS = [
+    ("Cien años de soledad", 1967, 1),
+    ("El amor en los tiempos del cólera", 1985, 1),
+    ("La casa de los espíritus", 1982, 2),
+    ("Paula", 1994, 2),
+    ("Ficciones", 1944, 3),
+    ("El Aleph", 1949, 3),
+]
+
+def test_biblioteca_async(tmp_path):
+    """Prueba las lecturas y escrituras asíncronas y el recorrido con async for"""
+    async def escenario():
+        async with BibliotecaAsync(str(tmp_path / 'async.db'), lectores=3) as biblioteca:
+            await biblioteca.crear_tablas()
+            await biblioteca.insertar_autores(AUTORES)
+            await biblioteca.insertar_libros(LIBROS)
+
+            # Muchas lecturas concurrentes desde distintas corrutinas
+            resultados = await asyncio.gather(*[
+                biblioteca.buscar_libros_por_autor("Isabel Allende") for _ in range(20)])
+            assert all(sorted(r) == [("La casa de los espíritus", 1982), ("Paula", 1994)]
+                       for r in resultados)
+
+            await biblioteca.eliminar_libro(6)
+            libros = [libro async for libro in biblioteca.iterar_libros(tamano_pagina=2)]
+            assert len(libros) == 5
+            assert libros[0] == ("Cien años de soledad", 1967, "Gabriel García Márquez")
+
+            paginas = [p async for p in biblioteca.iterar_paginas_libros(tamano_pagina=2)]
+            assert [len(p) for p in paginas] == [2, 2, 1]
+
+            # Los lectores usan conexiones de solo lectura
+            with pytest.raises(sqlite3.OperationalError):
+                await biblioteca.ejecutar_lectura(
+                    lambda conexion: conexion.execute("DELETE FROM libros"))
+
+    asyncio.run(escenario())
+
+def test_biblioteca_async_memoria():
+    """Prueba que la fachada rechaza las bases de datos en memoria"""
+    with pytest.raises(ValueError):
+        BibliotecaAsync(':memory:')
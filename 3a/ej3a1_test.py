@@ -6,9 +6,15 @@ trabajar con bases de datos SQLite.
 import pytest
 import sqlite3
 import os
+import threading
+import ej3a1
 from ej3a1 import (crear_conexion, crear_tablas, insertar_autores, insertar_libros,
                   consultar_libros, buscar_libros_por_autor, actualizar_libro,
-                  eliminar_libro, ejemplo_transaccion)
+                  eliminar_libro, ejemplo_transaccion, PoolConexiones,
+                  unidad_de_trabajo, iterar_libros, iterar_libros_por_autor,
+                  paginar_libros, iterar_paginas_libros, verificar_planes_consulta, plan_consulta,
+                  crear_indice_busqueda, buscar_libros, carga_masiva, upsert_autores,
+                  actualizar_libros, eliminar_libros)
 
 # Path to test SQL script
 SQL_TEST_PATH = os.path.join(os.path.dirname(__file__), 'test.sql')
@@ -235,3 +241,355 @@ def test_ejemplo_transaccion(db_con_datos):
     # La implementación específica dependerá del estudiante,
     # pero comprobamos que al menos la función no genera errores
     assert True  # No errores = prueba pasa
+
+def test_crear_conexion_en_memoria():
+    """Prueba que con ':memory:' cada llamada crea una base de datos nueva y close() la cierra"""
+    conn = crear_conexion()
+    crear_tablas(conn)
+    insertar_autores(conn, [("Gabriel García Márquez",)])
+    conn.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+
+    otra = crear_conexion()
+    try:
+        assert otra is not conn
+        assert otra.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0
+    finally:
+        otra.close()
+
+def test_pool_reutiliza_conexion(tmp_path):
+    """Prueba que el pool reutiliza la conexión del hilo y aplica los PRAGMA"""
+    pool = PoolConexiones(str(tmp_path / 'pool.db'), max_conexiones=2)
+    try:
+        conn = pool.obtener()
+        assert isinstance(conn, sqlite3.Connection)
+        assert pool.obtener() is conn  # préstamo reentrante en el mismo hilo
+        pool.devolver(conn)
+        conn.close()  # close() devuelve la conexión al pool
+
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+
+        with pool.conexion() as otra:
+            assert otra is conn
+    finally:
+        pool.cerrar()
+
+def test_pool_tamano_maximo(tmp_path):
+    """Prueba que el pool no presta más conexiones que su tamaño máximo"""
+    pool = PoolConexiones(str(tmp_path / 'pool.db'), max_conexiones=1, timeout=0.1)
+    conn = pool.obtener()
+    errores = []
+
+    def pedir():
+        try:
+            pool.obtener()
+        except sqlite3.OperationalError as e:
+            errores.append(e)
+
+    hilo = threading.Thread(target=pedir)
+    hilo.start()
+    hilo.join()
+    assert len(errores) == 1
+
+    # Al devolverla, otro hilo puede usarla
+    pool.devolver(conn)
+    prestadas = []
+    hilo = threading.Thread(target=lambda: prestadas.append(pool.obtener()))
+    hilo.start()
+    hilo.join()
+    assert prestadas == [conn]
+    pool.cerrar()
+
+def test_pool_recupera_conexion_de_hilo_terminado(tmp_path):
+    """Prueba que la conexión de un hilo que termina sin devolverla vuelve al pool"""
+    pool = PoolConexiones(str(tmp_path / 'pool.db'), max_conexiones=2, timeout=0.1)
+    prestadas = []
+
+    def usar_sin_devolver():
+        conn = pool.obtener()
+        conn.execute("CREATE TABLE IF NOT EXISTS t (a INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")  # transacción sin confirmar
+        prestadas.append(conn)
+
+    try:
+        for _ in range(5):
+            hilo = threading.Thread(target=usar_sin_devolver)
+            hilo.start()
+            hilo.join()
+        assert len(prestadas) == 5
+        assert len(set(map(id, prestadas))) <= 2
+
+        with pool.conexion() as conn:
+            # La transacción del hilo terminado se deshizo al recuperarla
+            assert not conn.in_transaction
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    finally:
+        pool.cerrar()
+
+def test_obtener_pool_cierra_el_anterior(tmp_path, monkeypatch):
+    """Prueba que al cambiar DB_PATH se cierran las conexiones del pool anterior"""
+    monkeypatch.setattr(ej3a1, 'DB_PATH', str(tmp_path / 'uno.db'))
+    monkeypatch.setattr(ej3a1, '_pool', None)
+    anterior = ej3a1.obtener_pool()
+    conn = crear_conexion()
+    conn.close()
+
+    monkeypatch.setattr(ej3a1, 'DB_PATH', str(tmp_path / 'dos.db'))
+    nuevo = ej3a1.obtener_pool()
+    try:
+        assert nuevo is not anterior
+        assert anterior._cerrado and anterior._total == 0
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    finally:
+        nuevo.cerrar()
+
+def test_unidad_de_trabajo(db_con_datos):
+    """Prueba que la unidad de trabajo agrupa escrituras en una transacción"""
+    cursor = db_con_datos.cursor()
+
+    with unidad_de_trabajo(db_con_datos):
+        insertar_autores(db_con_datos, [("Julio Cortázar",)])
+        actualizar_libro(db_con_datos, 1, nuevo_anio=2000)
+        eliminar_libro(db_con_datos, 6)
+        # Nada se ha confirmado todavía
+        assert db_con_datos.in_transaction
+
+    assert not db_con_datos.in_transaction
+    cursor.execute("SELECT COUNT(*) FROM autores;")
+    assert cursor.fetchone()[0] == 4
+    cursor.execute("SELECT COUNT(*) FROM libros;")
+    assert cursor.fetchone()[0] == 5
+
+    # Un error deshace todos los cambios de la unidad
+    with pytest.raises(sqlite3.IntegrityError):
+        with unidad_de_trabajo(db_con_datos):
+            eliminar_libro(db_con_datos, 1)
+            insertar_libros(db_con_datos, [(None, 2000, 1)])
+    cursor.execute("SELECT COUNT(*) FROM libros WHERE id = 1;")
+    assert cursor.fetchone()[0] == 1
+
+def test_unidad_de_trabajo_anidada(db_con_datos):
+    """Prueba que una unidad anidada solo deshace sus propios cambios"""
+    with unidad_de_trabajo(db_con_datos):
+        eliminar_libro(db_con_datos, 1)
+        try:
+            with unidad_de_trabajo(db_con_datos):
+                eliminar_libro(db_con_datos, 2)
+                raise ValueError("error en la unidad anidada")
+        except ValueError:
+            pass
+
+    cursor = db_con_datos.cursor()
+    cursor.execute("SELECT id FROM libros WHERE id IN (1, 2);")
+    assert cursor.fetchall() == [(2,)]
+
+def test_crear_tablas_en_unidad_de_trabajo(conexion):
+    """Prueba que crear_tablas no confirma la unidad de trabajo que la contiene"""
+    with unidad_de_trabajo(conexion):
+        conexion.execute("CREATE TABLE previa (a INTEGER)")
+        with unidad_de_trabajo(conexion):
+            crear_tablas(conexion)
+            insertar_autores(conexion, [("Julio Cortázar",)])
+        assert conexion.in_transaction
+
+    assert conexion.execute("SELECT COUNT(*) FROM autores").fetchone()[0] == 1
+
+    # Si la unidad falla, las tablas creadas en ella también se deshacen
+    with pytest.raises(ValueError):
+        with unidad_de_trabajo(conexion):
+            conexion.execute("DROP TABLE libros")
+            crear_tablas(conexion)
+            raise ValueError("error tras crear las tablas")
+    tablas = {fila[0] for fila in conexion.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'previa', 'autores', 'libros'} <= tablas
+
+def test_iterar_libros(db_con_datos):
+    """Prueba que los generadores devuelven las mismas filas por lotes"""
+    libros = list(iterar_libros(db_con_datos, tamano_lote=2))
+    assert len(libros) == 6
+    assert ("Cien años de soledad", 1967, "Gabriel García Márquez") in libros
+
+    libros_autor = list(iterar_libros_por_autor(db_con_datos, "Isabel Allende", tamano_lote=1))
+    assert sorted(libros_autor) == [("La casa de los espíritus", 1982), ("Paula", 1994)]
+
+def test_paginar_libros(db_con_datos):
+    """Prueba la paginación por clave de libros"""
+    pagina = paginar_libros(db_con_datos, despues_de_id=0, limite=4)
+    assert [libro[0] for libro in pagina] == [1, 2, 3, 4]
+
+    pagina = paginar_libros(db_con_datos, despues_de_id=4, limite=4)
+    assert [libro[0] for libro in pagina] == [5, 6]
+
+    paginas = list(iterar_paginas_libros(db_con_datos, tamano_pagina=4))
+    assert [len(p) for p in paginas] == [4, 2]
+
+def test_verificar_planes_consulta(conexion):
+    """Prueba que las consultas del módulo usan índices y no recorren tablas"""
+    crear_tablas(conexion)
+
+    cursor = conexion.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='index';")
+    indices = [fila[0] for fila in cursor.fetchall()]
+    assert "idx_autores_nombre" in indices
+    assert "idx_libros_autor" in indices
+
+    planes = verificar_planes_consulta(conexion)
+    assert any("COVERING INDEX idx_libros_autor" in paso
+               for paso in planes["buscar_libros_por_autor"])
+
+    # Sin el índice de autores la búsqueda por nombre vuelve a ser un SCAN
+    cursor.execute("DROP INDEX idx_autores_nombre;")
+    with pytest.raises(RuntimeError):
+        verificar_planes_consulta(conexion)
+
+def test_plan_consulta_tras_cambio_de_esquema(conexion):
+    """Prueba que plan_consulta refleja los cambios de esquema aunque la caché de sentencias no"""
+    conexion.execute("CREATE TABLE t (a INTEGER)")
+    conexion.execute("CREATE INDEX idx_t_a ON t (a)")
+    sql = "SELECT * FROM t WHERE a = ?"
+    explain = "EXPLAIN QUERY PLAN " + sql
+    assert "idx_t_a" in conexion.execute(explain, (1,)).fetchall()[0][3]
+    assert "idx_t_a" in plan_consulta(conexion, sql, (1,))[0]
+
+    conexion.execute("DROP INDEX idx_t_a")
+    # La sentencia cacheada por el módulo sqlite3 no se vuelve a preparar
+    assert "idx_t_a" in conexion.execute(explain, (1,)).fetchall()[0][3]
+    assert plan_consulta(conexion, sql, (1,)) == ["SCAN t"]
+
+def test_buscar_libros(db_con_datos):
+    """Prueba la búsqueda de texto completo por título y autor"""
+    crear_indice_busqueda(db_con_datos)
+
+    # Búsqueda por subcadena del título, sin distinguir mayúsculas
+    resultados = buscar_libros(db_con_datos, "SOLED")
+    assert [libro[1] for libro in resultados] == ["Cien años de soledad"]
+
+    # Búsqueda combinando autor y título
+    resultados = buscar_libros(db_con_datos, "borges aleph")
+    assert [libro[1] for libro in resultados] == ["El Aleph"]
+
+    resultados = buscar_libros(db_con_datos, "Allende", limite=1)
+    assert len(resultados) == 1
+
+    # Los triggers mantienen el índice sincronizado
+    insertar_libros(db_con_datos, [("Eva Luna", 1987, 2)])
+    actualizar_libro(db_con_datos, 5, nuevo_titulo="Artificios")
+    eliminar_libro(db_con_datos, 6)
+
+    assert [libro[1] for libro in buscar_libros(db_con_datos, "Eva Luna")] == ["Eva Luna"]
+    assert buscar_libros(db_con_datos, "Ficciones") == []
+    assert buscar_libros(db_con_datos, "Aleph") == []
+    assert len(buscar_libros(db_con_datos, "Artificios")) == 1
+
+    db_con_datos.execute("UPDATE autores SET nombre = 'J. L. Borges' WHERE id = 3")
+    assert len(buscar_libros(db_con_datos, "Borges")) == 1
+
+    # Cambiar solo el año no reescribe la fila del índice
+    sentencias = []
+    db_con_datos.set_trace_callback(sentencias.append)
+    actualizar_libro(db_con_datos, 5, nuevo_anio=1950)
+    db_con_datos.set_trace_callback(None)
+    assert not any("libros_fts" in sql for sql in sentencias)
+
+def test_crear_indice_busqueda_sustituye_triggers(db_con_datos):
+    """Prueba que un trigger de sincronización con otra definición se sustituye"""
+    db_con_datos.execute("""CREATE TRIGGER libros_fts_update AFTER UPDATE ON libros BEGIN
+        SELECT 1;
+    END""")
+    crear_indice_busqueda(db_con_datos)
+    sql = db_con_datos.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'libros_fts_update'").fetchone()[0]
+    assert "UPDATE OF id, titulo, autor_id" in sql
+
+def test_carga_masiva(tmp_path):
+    """Prueba la carga masiva desde generadores y la restauración de PRAGMA"""
+    conn = sqlite3.connect(str(tmp_path / 'carga.db'))
+    try:
+        crear_tablas(conn)
+        insertar_autores(conn, [("Jorge Luis Borges",)])
+        insertar_libros(conn, [("Ficciones", 1944, 1)])
+        conn.execute("PRAGMA journal_mode=WAL")
+        synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+
+        autores = ((f"Autor {i}",) for i in range(10))
+        libros = ((f"Libro {i}", 2000 + i % 20, i % 10 + 2) for i in range(2500))
+        resultado = carga_masiva(conn, autores, libros, tamano_lote=1000)
+
+        assert resultado['autores'] == 10
+        assert resultado['libros'] == 2500
+        assert resultado['filas_por_segundo'] > 0
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM libros;")
+        assert cursor.fetchone()[0] == 2501
+
+        # PRAGMA restaurados, índices y búsqueda reconstruidos
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == synchronous
+        verificar_planes_consulta(conn)
+        assert len(buscar_libros(conn, "Libro 2499")) == 1
+        assert len(buscar_libros(conn, "Ficciones")) == 1
+
+        insertar_libros(conn, [("El Aleph", 1949, 1)])
+        assert len(buscar_libros(conn, "Aleph")) == 1
+    finally:
+        conn.close()
+
+def test_upsert_autores(conexion):
+    """Prueba que upsert_autores no duplica autores y devuelve todos los ids"""
+    crear_tablas(conexion)
+    insertar_autores(conexion, [("Isabel Allende",)])
+
+    ids = upsert_autores(conexion, ["Julio Cortázar", "Isabel Allende", "Julio Cortázar",
+                                    "Octavio Paz"], tamano_lote=2)
+    assert set(ids) == {"Julio Cortázar", "Isabel Allende", "Octavio Paz"}
+    assert ids["Isabel Allende"] == 1
+
+    cursor = conexion.cursor()
+    cursor.execute("SELECT COUNT(*) FROM autores;")
+    assert cursor.fetchone()[0] == 3
+
+    # Repetir la operación devuelve los mismos ids sin insertar nada
+    assert upsert_autores(conexion, ["Octavio Paz", "Julio Cortázar"]) == {
+        "Octavio Paz": ids["Octavio Paz"], "Julio Cortázar": ids["Julio Cortázar"]}
+    cursor.execute("SELECT COUNT(*) FROM autores;")
+    assert cursor.fetchone()[0] == 3
+
+    # El índice único impide duplicados por la vía normal
+    with pytest.raises(sqlite3.IntegrityError):
+        insertar_autores(conexion, [("Octavio Paz",)])
+
+def test_actualizar_libros(db_con_datos):
+    """Prueba la actualización de varios libros en una transacción"""
+    cambios = [
+        (1, "Cien años de soledad (Edición especial)", None),
+        (2, None, 1986),
+        (3, "La casa", 1983),
+        (4, None, None),  # Sin cambios: se ignora
+        (999, "No existe", None),
+    ]
+    assert actualizar_libros(db_con_datos, cambios) == 3
+
+    cursor = db_con_datos.cursor()
+    cursor.execute("SELECT id, titulo, anio FROM libros WHERE id <= 4 ORDER BY id;")
+    assert cursor.fetchall() == [
+        (1, "Cien años de soledad (Edición especial)", 1967),
+        (2, "El amor en los tiempos del cólera", 1986),
+        (3, "La casa", 1983),
+        (4, "Paula", 1994),
+    ]
+
+def test_eliminar_libros(db_con_datos):
+    """Prueba la eliminación de varios libros en una transacción"""
+    assert eliminar_libros(db_con_datos, [2, 4, 4, 999]) == 2
+
+    cursor = db_con_datos.cursor()
+    cursor.execute("SELECT id FROM libros ORDER BY id;")
+    assert [fila[0] for fila in cursor.fetchall()] == [1, 3, 5, 6]
+
+    # La tabla temporal se reutiliza entre llamadas
+    assert eliminar_libros(db_con_datos, range(1, 4)) == 2
+    assert eliminar_libros(db_con_datos, []) == 0
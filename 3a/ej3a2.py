@@ -14,50 +14,655 @@ Debes crear una base de datos a partir de este script y realizar operaciones sob
 
 import sqlite3
 import os
-from typing import List, Tuple, Dict, Any, Optional
+import functools
+import hashlib
+import re
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import filas
+from typing import Callable, Iterable, Iterator, List, Tuple, Dict, Any, Optional
 
 # Ruta al archivo SQL
 SQL_FILE_PATH = os.path.join(os.path.dirname(__file__), 'test.sql')
 # Ruta para la base de datos SQLite
 DB_PATH = os.path.join(os.path.dirname(__file__), 'biblioteca.db')
+# Directorio con las bases de datos plantilla ya construidas a partir del SQL
+PLANTILLAS_DIR = os.path.join(os.path.dirname(__file__), '.plantillas')
+# Directorio con las migraciones del esquema (NNNN_descripcion.sql)
+MIGRACIONES_DIR = os.path.join(os.path.dirname(__file__), 'migraciones')
+
+# Sentencias por transacción al cargar un script SQL
+SENTENCIAS_POR_TRANSACCION = 1000
+
+# Sentencias que confirman la transacción de un script (ver cargar_script_sql)
+_FIN_TRANSACCION = ('COMMIT', 'END')
+
+# ROLLBACK TO de un SAVEPOINT, que se ejecuta como una sentencia más
+_RE_ROLLBACK_SAVEPOINT = re.compile(r'ROLLBACK(?:\s+TRANSACTION)?\s+TO\b', re.IGNORECASE)
+
+# Sentencias que no pueden ir (o no tienen efecto) dentro de una transacción
+_FUERA_DE_TRANSACCION = ('PRAGMA', 'VACUUM', 'ATTACH', 'DETACH')
+
+# Cabecera de un INSERT con lista de columnas, hasta la palabra VALUES incluida
+_RE_CABECERA_INSERT = re.compile(
+    r'INSERT\s+INTO\s+(?:[A-Za-z_]\w*|"[^"]+"|`[^`]+`|\[[^\]]+\])\s*\([^()]*\)\s*VALUES\s*',
+    re.IGNORECASE)
+
+# Literales de cadena SQL ('' dentro de una cadena la parte en dos coincidencias)
+_RE_CADENA_SQL = re.compile(r"'[^']*'")
+
+# Espacios y comentarios (-- y /* */) al principio de una sentencia
+_RE_COMENTARIOS_INICIALES = re.compile(r'(?:\s+|--[^\n]*(?:\n|\Z)|/\*.*?(?:\*/|\Z))*', re.DOTALL)
+
+# Nombre de un archivo de migración: versión y descripción
+_RE_MIGRACION = re.compile(r'^(\d+)_\w+\.sql$')
+
+# Filas por INSERT al agrupar los INSERT de un script
+FILAS_POR_INSERT = 500
+
+# Hash de cada script ya calculado, por (ruta, tamaño, fecha de modificación)
+_hashes_sql: Dict[Tuple[str, int, int], str] = {}
+
+def hash_archivo_sql(ruta: str) -> str:
+    """
+    Calcula el hash SHA-256 del contenido de un archivo SQL
+
+    El resultado se recuerda mientras el archivo no cambie de tamaño ni de
+    fecha de modificación, para no releer scripts grandes en cada llamada.
+
+    Args:
+        ruta (str): Ruta del archivo SQL
+
+    Returns:
+        str: Hash hexadecimal del contenido
+    """
+    estado = os.stat(ruta)
+    clave = (os.path.abspath(ruta), estado.st_size, estado.st_mtime_ns)
+    if clave not in _hashes_sql:
+        sha = hashlib.sha256()
+        with open(ruta, 'rb') as archivo:
+            for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+                sha.update(bloque)
+        _hashes_sql[clave] = sha.hexdigest()
+    return _hashes_sql[clave]
+
+def iterar_sentencias_sql(lineas: Iterable[str]) -> Iterator[str]:
+    """
+    Separa un script SQL en sentencias leyendo línea a línea
+
+    Usa sqlite3.complete_statement para decidir dónde acaba cada sentencia, así
+    que los ';' dentro de cadenas o de cuerpos de trigger no la cortan. Los
+    comentarios que preceden a cada sentencia se descartan, de modo que empieza
+    por su primera palabra clave (BEGIN, PRAGMA, INSERT...).
+
+    Args:
+        lineas (Iterable[str]): Líneas del script (por ejemplo, un archivo abierto)
+
+    Returns:
+        Iterator[str]: Sentencias completas, en orden
+    """
+    buffer = ''
+    for linea in lineas:
+        buffer += linea
+        if ';' not in linea:
+            continue
+
+        inicio = 0
+        posicion = buffer.find(';')
+        while posicion != -1:
+            candidata = buffer[inicio:posicion + 1]
+            if sqlite3.complete_statement(candidata):
+                sentencia = _quitar_comentarios_iniciales(candidata)
+                if sentencia.rstrip(';').strip():
+                    yield sentencia
+                inicio = posicion + 1
+            posicion = buffer.find(';', posicion + 1)
+        buffer = buffer[inicio:]
+
+    sentencia = _quitar_comentarios_iniciales(buffer)
+    if sentencia:
+        yield sentencia
+
+def _quitar_comentarios_iniciales(sentencia: str) -> str:
+    """Quita los espacios y comentarios del principio y los espacios del final"""
+    return sentencia[_RE_COMENTARIOS_INICIALES.match(sentencia).end():].rstrip()
+
+def analizar_insert(sentencia: str) -> Optional[Tuple[str, str]]:
+    """
+    Reconoce un INSERT de una sola fila con lista de columnas
+
+    Args:
+        sentencia (str): Sentencia SQL
+
+    Returns:
+        Optional[Tuple[str, str]]: La cabecera ('INSERT INTO tabla (cols) VALUES ')
+        y la tupla de valores tal cual aparece en el script, o None si la
+        sentencia tiene otra forma (sin columnas, varias filas, subconsultas o
+        llamadas a funciones, ON CONFLICT, RETURNING...)
+    """
+    cabecera = _RE_CABECERA_INSERT.match(sentencia)
+    if cabecera is None:
+        return None
+    tupla = _tupla_valores(sentencia[cabecera.end():])
+    if tupla is None:
+        return None
+    return cabecera.group(0), tupla
+
+def _tupla_valores(resto: str) -> Optional[str]:
+    """
+    Devuelve resto sin el ';' final si es exactamente una tupla '(...)' sin
+    paréntesis anidados ni comentarios fuera de las cadenas, o None
+    """
+    tupla = resto.rstrip().rstrip(';').rstrip()
+    sin_cadenas = _RE_CADENA_SQL.sub('', tupla)
+    if (not sin_cadenas.startswith('(') or not sin_cadenas.endswith(')')
+            or sin_cadenas.count('(') != 1 or sin_cadenas.count(')') != 1
+            or '--' in sin_cadenas or '/*' in sin_cadenas or "'" in sin_cadenas):
+        return None
+    return tupla
+
+def cargar_script_sql(conexion: sqlite3.Connection, ruta: str,
+                      sentencias_por_transaccion: int = SENTENCIAS_POR_TRANSACCION,
+                      progreso: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      agrupar_inserts: bool = True) -> Dict[str, Any]:
+    """
+    Ejecuta un script SQL leyéndolo de forma incremental
+
+    El archivo nunca se carga entero en memoria y las sentencias se agrupan en
+    transacciones de sentencias_por_transaccion, en lugar de hacer commit de
+    cada una. Los PRAGMA, VACUUM, ATTACH y DETACH se ejecutan fuera de la
+    transacción (confirmando antes lo pendiente), porque algunos, como
+    foreign_keys, no tienen efecto dentro de ella y los demás fallarían.
+
+    Las transacciones del propio script (BEGIN ... COMMIT) se respetan enteras:
+    dentro de ellas no se confirma cada lote, para que un ROLLBACK (como el
+    "ROLLBACK; -- due to errors" de los volcados de sqlite3) descarte todo lo
+    ejecutado desde su BEGIN, igual que con executescript.
+
+    Con agrupar_inserts, los INSERT de una fila consecutivos sobre la misma
+    tabla y columnas (ver analizar_insert) se reescriben como un único INSERT de
+    hasta FILAS_POR_INSERT filas, de modo que SQLite compila una sentencia por
+    lote y no una por fila. Los valores no se interpretan en Python: se copian
+    tal cual del script, así que el resultado es idéntico al de ejecutarlos uno a uno.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        ruta (str): Ruta del archivo SQL
+        sentencias_por_transaccion (int): Sentencias que se confirman juntas
+        progreso (Optional[Callable]): Función que recibe las estadísticas
+            (como las del resultado) tras cada lote y al terminar
+        agrupar_inserts (bool): Si se agrupan los INSERT consecutivos
+
+    Returns:
+        Dict[str, Any]: Sentencias ejecutadas, bytes leídos, segundos empleados y
+        sentencias por segundo
+    """
+    estadisticas = {'sentencias': 0, 'bytes': 0, 'segundos': 0.0, 'sentencias_por_segundo': 0.0}
+    inicio = time.perf_counter()
+
+    def actualizar(archivo):
+        # Posición del archivo binario subyacente (incluye lo ya leído por adelantado)
+        estadisticas['bytes'] = archivo.buffer.tell()
+        estadisticas['segundos'] = time.perf_counter() - inicio
+        if estadisticas['segundos']:
+            estadisticas['sentencias_por_segundo'] = estadisticas['sentencias'] / estadisticas['segundos']
+
+    cursor = conexion.cursor()
+    pendientes = 0
+    # Si hay abierta una transacción del propio script
+    transaccion_script = False
+    # Cabecera del INSERT que se está agrupando y tuplas de valores acumuladas
+    cabecera = None
+    lote: List[str] = []
+
+    def vaciar_lote():
+        if lote:
+            cursor.execute(cabecera + ", ".join(lote))
+            lote.clear()
+
+    def confirmar():
+        nonlocal pendientes
+        vaciar_lote()
+        if conexion.in_transaction:
+            conexion.commit()
+            pendientes = 0
+
+    try:
+        with open(ruta, 'r') as sql_file:
+            for sentencia in iterar_sentencias_sql(sql_file):
+                palabra = sentencia.split(None, 1)[0].rstrip(';').upper()
+                if palabra == 'BEGIN':
+                    # Lo anterior al BEGIN no forma parte de su transacción
+                    confirmar()
+                    cursor.execute(sentencia)
+                    transaccion_script = True
+                    continue
+                if palabra in _FIN_TRANSACCION:
+                    confirmar()
+                    transaccion_script = False
+                    continue
+                if palabra == 'ROLLBACK' and not _RE_ROLLBACK_SAVEPOINT.match(sentencia):
+                    if not transaccion_script:
+                        raise sqlite3.OperationalError("cannot rollback - no transaction is active")
+                    lote.clear()
+                    conexion.rollback()
+                    pendientes = 0
+                    transaccion_script = False
+                    continue
+                if palabra in _FUERA_DE_TRANSACCION and not transaccion_script:
+                    confirmar()
+                    cursor.execute(sentencia)
+                    estadisticas['sentencias'] += 1
+                    continue
+                if not conexion.in_transaction:
+                    cursor.execute("BEGIN")
+
+                tupla = None
+                if agrupar_inserts:
+                    # Caso frecuente: misma cabecera que el INSERT anterior
+                    if cabecera is not None and sentencia.startswith(cabecera):
+                        tupla = _tupla_valores(sentencia[len(cabecera):])
+                    if tupla is None:
+                        insert = analizar_insert(sentencia)
+                        if insert is not None:
+                            vaciar_lote()
+                            cabecera, tupla = insert
+
+                if tupla is not None:
+                    lote.append(tupla)
+                    if len(lote) >= FILAS_POR_INSERT:
+                        vaciar_lote()
+                else:
+                    vaciar_lote()
+                    cursor.execute(sentencia)
+                estadisticas['sentencias'] += 1
+                pendientes += 1
+
+                if pendientes >= sentencias_por_transaccion:
+                    vaciar_lote()
+                    if not transaccion_script:
+                        conexion.commit()
+                    pendientes = 0
+                    if progreso is not None:
+                        actualizar(sql_file)
+                        progreso(dict(estadisticas))
+
+            vaciar_lote()
+            if conexion.in_transaction:
+                conexion.commit()
+            actualizar(sql_file)
+    except BaseException:
+        if conexion.in_transaction:
+            conexion.rollback()
+        raise
+
+    if progreso is not None:
+        progreso(dict(estadisticas))
+    return estadisticas
+
+def listar_migraciones(directorio: Optional[str] = None) -> List[Tuple[int, str]]:
+    """
+    Lista las migraciones de un directorio en orden de versión
+
+    Cada migración es un archivo NNNN_descripcion.sql; las versiones deben ir
+    seguidas desde 1 para que no se pueda saltar ninguna.
+
+    Args:
+        directorio (Optional[str]): Directorio de migraciones (MIGRACIONES_DIR por defecto)
+
+    Returns:
+        List[Tuple[int, str]]: Tuplas (version, ruta)
+    """
+    directorio = directorio or MIGRACIONES_DIR
+    migraciones = []
+    for archivo in os.listdir(directorio):
+        coincidencia = _RE_MIGRACION.match(archivo)
+        if coincidencia:
+            migraciones.append((int(coincidencia.group(1)), os.path.join(directorio, archivo)))
+    migraciones.sort()
+
+    versiones = [version for version, _ in migraciones]
+    if versiones != list(range(1, len(versiones) + 1)):
+        raise ValueError(f"Las migraciones de {directorio} no son consecutivas desde 1: {versiones}")
+    return migraciones
+
+def version_esquema(conexion: sqlite3.Connection) -> int:
+    """
+    Devuelve la versión del esquema guardada en PRAGMA user_version
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+
+    Returns:
+        int: Última migración aplicada (0 si ninguna)
+    """
+    return conexion.execute("PRAGMA user_version").fetchone()[0]
+
+def migrar(conexion: sqlite3.Connection, directorio: Optional[str] = None,
+           hasta: Optional[int] = None) -> List[int]:
+    """
+    Aplica las migraciones pendientes sin recrear la base de datos
+
+    Cada migración se ejecuta en su propia transacción junto con la
+    actualización de PRAGMA user_version: si falla, la base de datos queda en
+    la versión anterior. Las migraciones ya aplicadas no se vuelven a leer, y
+    si el esquema ya está al día solo se lee PRAGMA user_version, sin tomar el
+    bloqueo de escritura. Los índices van en migraciones propias, posteriores
+    a la carga de datos, para construirse de una vez y no durante la carga.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite, sin
+            transacción abierta
+        directorio (Optional[str]): Directorio de migraciones (MIGRACIONES_DIR por defecto)
+        hasta (Optional[int]): Última versión a aplicar (todas por defecto)
+
+    Returns:
+        List[int]: Versiones aplicadas, en orden
+    """
+    if conexion.in_transaction:
+        raise RuntimeError("migrar necesita una conexión sin transacción abierta")
+
+    # Sin bloqueo: si no queda nada por aplicar, no se toma el de escritura
+    actual = version_esquema(conexion)
+    pendientes = [(version, ruta) for version, ruta in listar_migraciones(directorio)
+                  if version > actual and (hasta is None or version <= hasta)]
+
+    aplicadas = []
+    cursor = conexion.cursor()
+    for version, ruta in pendientes:
+        # IMMEDIATE toma el bloqueo de escritura antes de volver a leer user_version:
+        # dos procesos no pueden aplicar la misma migración a la vez
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if version_esquema(conexion) >= version:
+                conexion.rollback()
+                continue
+            with open(ruta, 'r') as sql_file:
+                for sentencia in iterar_sentencias_sql(sql_file):
+                    cursor.execute(sentencia)
+            cursor.execute(f"PRAGMA user_version = {version:d}")
+            conexion.commit()
+        except BaseException:
+            conexion.rollback()
+            raise
+        aplicadas.append(version)
+
+    if aplicadas:
+        # Actualiza las estadísticas del planificador para los índices nuevos
+        cursor.execute("PRAGMA optimize")
+    return aplicadas
+
+class Conexion(sqlite3.Connection):
+    """
+    Conexión de sqlite3 que admite referencias débiles
+
+    En Python 3.11 sqlite3.Connection no las admite; con esta subclase
+    CacheResultados no necesita mantener viva la conexión de sus entradas.
+    """
+
+def abrir_bd(ruta: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Abre la base de datos y le aplica las migraciones pendientes
+
+    A diferencia de crear_bd_desde_sql, conserva los datos: solo si el archivo
+    no existe se crea a partir de la plantilla del script SQL.
+
+    Args:
+        ruta (Optional[str]): Ruta de la base de datos (DB_PATH por defecto)
+
+    Returns:
+        sqlite3.Connection: Conexión a la base de datos, ya migrada
+    """
+    ruta = ruta or DB_PATH
+    if not os.path.exists(ruta):
+        shutil.copyfile(obtener_plantilla(), ruta)
+
+    conexion = sqlite3.connect(ruta, factory=Conexion)
+    migrar(conexion)
+    return conexion
+
+def _construir_bd(ruta_bd: str) -> None:
+    """
+    Crea una base de datos nueva en ruta_bd ejecutando el script SQL y
+    después las migraciones (los índices se crean sobre los datos ya cargados)
+
+    Args:
+        ruta_bd (str): Ruta del archivo de base de datos a crear
+    """
+    conexion = sqlite3.connect(ruta_bd)
+    try:
+        cargar_script_sql(conexion, SQL_FILE_PATH)
+        migrar(conexion)
+    finally:
+        conexion.close()
+
+def obtener_plantilla() -> str:
+    """
+    Devuelve la ruta de la base de datos plantilla del script SQL actual,
+    construyéndola solo si el script o las migraciones han cambiado desde la
+    última vez
+
+    Returns:
+        str: Ruta del archivo plantilla
+    """
+    os.makedirs(PLANTILLAS_DIR, exist_ok=True)
+    migraciones = "-".join(hash_archivo_sql(ruta)[:12] for _, ruta in listar_migraciones())
+    clave = hashlib.sha256(f"{hash_archivo_sql(SQL_FILE_PATH)}-{migraciones}".encode()).hexdigest()
+    nombre = f"biblioteca-{clave}.db"
+    plantilla = os.path.join(PLANTILLAS_DIR, nombre)
+
+    if not os.path.exists(plantilla):
+        # Se construye en un temporal y se renombra: nunca queda una plantilla a medias
+        descriptor, temporal = tempfile.mkstemp(suffix='.db', dir=PLANTILLAS_DIR)
+        os.close(descriptor)
+        try:
+            _construir_bd(temporal)
+            os.replace(temporal, plantilla)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+        # Las plantillas de versiones anteriores del script ya no sirven
+        for archivo in os.listdir(PLANTILLAS_DIR):
+            if archivo.startswith('biblioteca-') and archivo != nombre:
+                os.remove(os.path.join(PLANTILLAS_DIR, archivo))
+
+    return plantilla
 
 def crear_bd_desde_sql() -> sqlite3.Connection:
     """
     Crea una base de datos SQLite a partir del archivo SQL
 
+    La base de datos se copia de una plantilla construida la primera vez que se
+    usa cada versión del script, así que solo se ejecuta el SQL cuando cambia.
+    Borra la base de datos existente; para conservar los datos y aplicar solo
+    los cambios de esquema pendientes, usa abrir_bd.
+
     Returns:
         sqlite3.Connection: Objeto de conexión a la base de datos SQLite
     """
     # Implementa aquí la creación de la base de datos:
     # 1. Si el archivo de base de datos existe, elimínalo para empezar desde cero
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
+    for sufijo in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(DB_PATH + sufijo):
+            os.remove(DB_PATH + sufijo)
 
-    # 2. Conecta a la base de datos (se creará si no existe)
-    conexion = sqlite3.connect(DB_PATH)
+    # 2. Copia la plantilla construida a partir del script SQL (ver obtener_plantilla)
+    shutil.copyfile(obtener_plantilla(), DB_PATH)
 
-    # 3. Lee el contenido del archivo SQL
-    with open(SQL_FILE_PATH, 'r') as sql_file:
-        sql_script = sql_file.read()
+    # 3. Conecta a la base de datos y devuelve la conexión
+    conexion = sqlite3.connect(DB_PATH, factory=Conexion)
+    return conexion
 
-    # 4. Ejecuta el script SQL completo
-    conexion.executescript(sql_script)
+# Resultados de consulta que guarda como máximo la caché de resultados
+MAX_RESULTADOS_CACHE = 128
 
-    # 5. Haz commit de los cambios
-    conexion.commit()
+# Escrituras hechas con agregar_libro, agregar_libros y actualizar_libro
+_contador_escrituras = 0
 
-    # 6. Devuelve la conexión
-    return conexion
+def _registrar_escritura() -> None:
+    """Invalida los resultados cacheados tras una escritura de este módulo"""
+    global _contador_escrituras
+    _contador_escrituras += 1
+
+def version_datos(conexion: sqlite3.Connection) -> Tuple[int, ...]:
+    """
+    Calcula la versión de los datos vista por una conexión
+
+    Combina PRAGMA data_version (cambia cuando otra conexión confirma cambios),
+    PRAGMA schema_version (cambia con el esquema), total_changes (filas que ha
+    modificado esta misma conexión) y el contador de escrituras del módulo.
+    Si la versión no ha cambiado, un resultado leído antes sigue siendo válido.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+
+    Returns:
+        Tuple[int, ...]: Versión comparable con otra versión de la misma conexión
+    """
+    data_version, schema_version = conexion.execute(
+        "SELECT data_version, schema_version FROM pragma_data_version, pragma_schema_version"
+    ).fetchone()
+    return data_version, schema_version, conexion.total_changes, _contador_escrituras
+
+def _copiar(resultado: Any) -> Any:
+    """Copia superficial de una lista de filas; el resto de resultados se comparten"""
+    return list(resultado) if isinstance(resultado, list) else resultado
+
+class CacheResultados:
+    """
+    Caché LRU de resultados de consultas, versionada con version_datos
+
+    Cada entrada se guarda por conexión, consulta y parámetros junto con la
+    versión de los datos con que se leyó; si al consultarla la versión ha
+    cambiado, se descarta y se vuelve a ejecutar la consulta. Mientras la
+    conexión tiene una transacción abierta no se guarda ni se devuelve nada:
+    lo leído en ella puede deshacerse con rollback sin que cambie la versión.
+
+    La clave incluye el row_factory de la conexión, porque cambia la forma de
+    las filas devueltas. Las entradas guardan una referencia débil a la
+    conexión (ver Conexion) y se descartan cuando esta se destruye; con las
+    conexiones que no admiten referencias débiles (un sqlite3.Connection sin
+    más) no se guarda nada, para no mantenerlas vivas.
+    """
 
-def obtener_libros(conexion: sqlite3.Connection) -> List[Tuple]:
+    def __init__(self, max_entradas: int = MAX_RESULTADOS_CACHE):
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas: "OrderedDict[Tuple, Tuple[Callable[[], Optional[sqlite3.Connection]], Tuple[int, ...], List[Tuple]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # ids de conexiones destruidas; el callback de weakref solo los anota,
+        # porque puede ejecutarse en cualquier momento (incluso con _lock tomado)
+        self._destruidas: List[int] = []
+
+    def _referencia(self, conexion: sqlite3.Connection) -> Optional[Callable[[], Optional[sqlite3.Connection]]]:
+        """Referencia débil a la conexión, o None si no la admite"""
+        try:
+            return weakref.ref(conexion, lambda _, ident=id(conexion): self._destruidas.append(ident))
+        except TypeError:
+            return None
+
+    def _purgar(self) -> None:
+        """Descarta las entradas de conexiones destruidas (con _lock tomado)"""
+        while self._destruidas:
+            ident = self._destruidas.pop()
+            for clave in [clave for clave, entrada in self._entradas.items()
+                          if clave[0] == ident and entrada[0]() is None]:
+                del self._entradas[clave]
+
+    def obtener(self, conexion: sqlite3.Connection, clave: Tuple,
+                consultar: Callable[[], List[Tuple]]) -> List[Tuple]:
+        """
+        Devuelve el resultado cacheado para clave, o lo calcula con consultar()
+
+        Args:
+            conexion (sqlite3.Connection): Conexión con la que se hace la consulta
+            clave (Tuple): Consulta y parámetros
+            consultar (Callable[[], List[Tuple]]): Ejecuta la consulta
+
+        Returns:
+            List[Tuple]: Copia de la lista de filas, que el llamante puede
+            modificar (un filas.ResultadoColumnar se devuelve sin copiar)
+        """
+        if conexion.in_transaction:
+            with self._lock:
+                self.fallos += 1
+            return consultar()
+
+        clave = (id(conexion), conexion.row_factory) + clave
+        version = version_datos(conexion)
+        with self._lock:
+            self._purgar()
+            entrada = self._entradas.get(clave)
+            # La comprobación de identidad evita servir la entrada de una
+            # conexión ya destruida cuyo id se ha reutilizado
+            if entrada is not None and entrada[0]() is conexion and entrada[1] == version:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return _copiar(entrada[2])
+            self.fallos += 1
+
+        resultado = consultar()
+        referencia = self._referencia(conexion)
+        if referencia is None:
+            return resultado
+        with self._lock:
+            self._entradas[clave] = (referencia, version, resultado)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return _copiar(resultado)
+
+    def invalidar(self) -> None:
+        """Descarta todas las entradas (los contadores se mantienen)"""
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: aciertos, fallos, entradas y max_entradas
+        """
+        with self._lock:
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+            }
+
+# Caché compartida por obtener_libros y obtener_autores
+CACHE_RESULTADOS = CacheResultados()
+
+def _cacheado(funcion: Callable[..., List[Tuple]]) -> Callable[..., List[Tuple]]:
+    """Guarda en CACHE_RESULTADOS los resultados de funcion(conexion, *args)"""
+    @functools.wraps(funcion)
+    def envoltorio(conexion: sqlite3.Connection, *args: Any, **kwargs: Any) -> List[Tuple]:
+        clave = (funcion.__name__, args, tuple(sorted(kwargs.items())))
+        return CACHE_RESULTADOS.obtener(
+            conexion, clave, lambda: funcion(conexion, *args, **kwargs))
+    return envoltorio
+
+@_cacheado
+def obtener_libros(conexion: sqlite3.Connection, formato: str = 'tupla') -> List[Tuple]:
     """
     Obtiene la lista de libros con información de sus autores
 
     Args:
         conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        formato (str): Representación de las filas, uno de filas.FORMATOS
 
     Returns:
-        List[Tuple]: Lista de tuplas (id, titulo, anio, autor)
+        List[Tuple]: Lista de tuplas (id, titulo, anio, autor), o de filas en
+        el formato pedido ('columnas' devuelve un filas.ResultadoColumnar)
     """
     # Implementa aquí la consulta de libros:
     # 1. Crea un cursor a partir de la conexión
@@ -71,8 +676,108 @@ def obtener_libros(conexion: sqlite3.Connection) -> List[Tuple]:
         ORDER BY l.id
     """)
 
-    # 3. Retorna los resultados como una lista de tuplas
-    return cursor.fetchall()
+    # 3. Retorna los resultados como una lista de tuplas (o en el formato pedido)
+    return filas.leer(cursor, formato)
+
+# Trabajadores por defecto de obtener_libros_paralelo
+TRABAJADORES_LECTURA = 4
+# Particiones por trabajador: varias por cabeza reparten mejor rangos desiguales
+PARTICIONES_POR_TRABAJADOR = 4
+
+# Misma consulta que obtener_libros, limitada a un rango de ids
+_SQL_LIBROS_RANGO = """
+    SELECT l.id, l.titulo, l.anio, a.nombre
+    FROM libros l
+    JOIN autores a ON l.autor_id = a.id
+    WHERE l.id BETWEEN ? AND ?
+    ORDER BY l.id
+"""
+
+def _leer_particion(ruta: str, desde: int, hasta: int) -> List[Tuple]:
+    """Lee los libros con id en [desde, hasta] con una conexión de solo lectura"""
+    conexion = sqlite3.connect(Path(ruta).absolute().as_uri() + '?mode=ro', uri=True)
+    try:
+        return conexion.execute(_SQL_LIBROS_RANGO, (desde, hasta)).fetchall()
+    finally:
+        conexion.close()
+
+def particionar_libros(ruta: str, particiones: int) -> List[Tuple[int, int]]:
+    """
+    Divide el rango de libros.id en particiones de la misma amplitud
+
+    Args:
+        ruta (str): Ruta de la base de datos
+        particiones (int): Número máximo de particiones
+
+    Returns:
+        List[Tuple[int, int]]: Rangos (desde, hasta) inclusivos, ordenados y sin solaparse
+    """
+    conexion = sqlite3.connect(Path(ruta).absolute().as_uri() + '?mode=ro', uri=True)
+    try:
+        minimo, maximo = conexion.execute("SELECT MIN(id), MAX(id) FROM libros").fetchone()
+    finally:
+        conexion.close()
+    if minimo is None:
+        return []
+
+    amplitud = -(-(maximo - minimo + 1) // max(1, particiones))
+    return [(desde, min(desde + amplitud - 1, maximo))
+            for desde in range(minimo, maximo + 1, amplitud)]
+
+def iterar_libros_paralelo(ruta: Optional[str] = None, trabajadores: int = TRABAJADORES_LECTURA,
+                           particiones: Optional[int] = None, ordenado: bool = True,
+                           procesos: bool = False) -> Iterator[List[Tuple]]:
+    """
+    Lee los libros en paralelo, por rangos de id, y los devuelve partición a partición
+
+    Cada partición se lee con su propia conexión de solo lectura en un pool de
+    hilos (sqlite3 suelta el GIL mientras SQLite ejecuta la consulta) o de
+    procesos (paralelismo completo, a cambio de serializar las filas).
+
+    Args:
+        ruta (Optional[str]): Ruta de la base de datos (DB_PATH por defecto)
+        trabajadores (int): Hilos o procesos del pool
+        particiones (Optional[int]): Rangos en que se divide la tabla
+            (trabajadores * PARTICIONES_POR_TRABAJADOR por defecto)
+        ordenado (bool): True para devolver las particiones en orden de id; False
+            para devolver cada una en cuanto está leída
+        procesos (bool): Usar un pool de procesos en lugar de hilos
+
+    Returns:
+        Iterator[List[Tuple]]: Listas de tuplas (id, titulo, anio, autor), cada
+        una ordenada por id
+    """
+    ruta = ruta or DB_PATH
+    rangos = particionar_libros(ruta, particiones or trabajadores * PARTICIONES_POR_TRABAJADOR)
+    pool: Executor = (ProcessPoolExecutor if procesos else ThreadPoolExecutor)(max_workers=trabajadores)
+    with pool:
+        futuros = [pool.submit(_leer_particion, ruta, desde, hasta) for desde, hasta in rangos]
+        try:
+            # Los rangos no se solapan y van en orden: concatenarlos ya es la mezcla ordenada
+            for futuro in (futuros if ordenado else as_completed(futuros)):
+                yield futuro.result()
+        finally:
+            for futuro in futuros:
+                futuro.cancel()
+
+def obtener_libros_paralelo(ruta: Optional[str] = None, trabajadores: int = TRABAJADORES_LECTURA,
+                            particiones: Optional[int] = None, procesos: bool = False) -> List[Tuple]:
+    """
+    Obtiene el mismo resultado que obtener_libros leyendo en paralelo
+
+    Ver iterar_libros_paralelo. Solo ve los cambios ya confirmados en la base
+    de datos, y cada partición se lee en su propia transacción.
+
+    Returns:
+        List[Tuple]: Lista de tuplas (id, titulo, anio, autor) ordenada por id
+    """
+    libros: List[Tuple] = []
+    for particion in iterar_libros_paralelo(ruta, trabajadores, particiones, True, procesos):
+        libros.extend(particion)
+    return libros
+
+# Libros por sentencia INSERT en agregar_libros (3 parámetros por libro)
+LIBROS_POR_INSERT = 500
 
 def agregar_libro(conexion: sqlite3.Connection, titulo: str, anio: int, autor_id: int) -> int:
     """
@@ -91,17 +796,63 @@ def agregar_libro(conexion: sqlite3.Connection, titulo: str, anio: int, autor_id
     # 1. Crea un cursor a partir de la conexión
     cursor = conexion.cursor()
 
-    # 2. Ejecuta una consulta INSERT INTO para añadir el libro
+    # 2. Ejecuta una consulta INSERT INTO que devuelve el ID del libro añadido
     cursor.execute("""
         INSERT INTO libros (titulo, anio, autor_id)
         VALUES (?, ?, ?)
+        RETURNING id
     """, (titulo, anio, autor_id))
+    libro_id = cursor.fetchone()[0]
 
-    # 3. Haz commit de los cambios
+    # 3. Haz commit de los cambios (después de leer el RETURNING)
     conexion.commit()
+    _registrar_escritura()
+
+    # 4. Retorna el ID del nuevo libro
+    return libro_id
 
-    # 4. Retorna el ID del nuevo libro (usar cursor.lastrowid)
-    return cursor.lastrowid
+def agregar_libros(conexion: sqlite3.Connection, libros: Iterable[Tuple[str, int, int]]) -> List[int]:
+    """
+    Agrega varios libros en una sola transacción
+
+    Los lotes se agrupan en un SAVEPOINT: sin transacción abierta se confirman
+    juntos al terminar; dentro de una transacción del llamante se unen a ella
+    sin confirmarla. Si un lote falla se deshacen todos, y solo ellos.
+
+    Los libros se insertan por lotes de LIBROS_POR_INSERT con un INSERT de
+    varias filas y RETURNING id. SQLite no garantiza el orden de las filas de
+    RETURNING, pero con AUTOINCREMENT los ids crecen en orden de inserción, así
+    que basta ordenarlos para emparejarlos con los libros recibidos.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        libros (Iterable[Tuple[str, int, int]]): Tuplas (titulo, anio, autor_id)
+
+    Returns:
+        List[int]: IDs de los nuevos libros, en el mismo orden que libros
+    """
+    ids: List[int] = []
+    libros = list(libros)
+    cursor = conexion.cursor()
+
+    cursor.execute("SAVEPOINT agregar_libros")
+    try:
+        for inicio in range(0, len(libros), LIBROS_POR_INSERT):
+            lote = libros[inicio:inicio + LIBROS_POR_INSERT]
+            cursor.execute(f"""
+                INSERT INTO libros (titulo, anio, autor_id)
+                VALUES {", ".join(["(?, ?, ?)"] * len(lote))}
+                RETURNING id
+            """, [valor for libro in lote for valor in libro])
+            ids.extend(sorted(fila[0] for fila in cursor.fetchall()))
+    except BaseException:
+        cursor.execute("ROLLBACK TO SAVEPOINT agregar_libros")
+        cursor.execute("RELEASE SAVEPOINT agregar_libros")
+        raise
+    cursor.execute("RELEASE SAVEPOINT agregar_libros")
+    _registrar_escritura()
+
+    return ids
 
 def actualizar_libro(conexion: sqlite3.Connection, libro_id: int, nuevo_titulo: Optional[str] = None,
                     nuevo_anio: Optional[int] = None, nuevo_autor_id: Optional[int] = None) -> bool:
@@ -122,12 +873,7 @@ def actualizar_libro(conexion: sqlite3.Connection, libro_id: int, nuevo_titulo:
     # 1. Crea un cursor a partir de la conexión
     cursor = conexion.cursor()
 
-    # 2. Verifica primero que el libro existe
-    cursor.execute("SELECT id FROM libros WHERE id = ?", (libro_id,))
-    if not cursor.fetchone():
-        return False
-
-    # 3. Prepara la consulta UPDATE con los campos que no son None
+    # 2. Prepara la consulta UPDATE con los campos que no son None
     updates = []
     values = []
 
@@ -141,27 +887,35 @@ def actualizar_libro(conexion: sqlite3.Connection, libro_id: int, nuevo_titulo:
         updates.append("autor_id = ?")
         values.append(nuevo_autor_id)
 
+    # Sin cambios solo hay que comprobar que el libro existe
     if not updates:
-        return True
+        cursor.execute("SELECT id FROM libros WHERE id = ?", (libro_id,))
+        return cursor.fetchone() is not None
 
-    # 4. Ejecuta la consulta y haz commit de los cambios
+    # 3. Ejecuta la consulta: RETURNING indica en la misma sentencia si el libro existía
     values.append(libro_id)
-    query = f"UPDATE libros SET {', '.join(updates)} WHERE id = ?"
+    query = f"UPDATE libros SET {', '.join(updates)} WHERE id = ? RETURNING id"
     cursor.execute(query, values)
+    actualizado = cursor.fetchone() is not None
+
+    # 4. Haz commit de los cambios (después de leer el RETURNING)
     conexion.commit()
+    _registrar_escritura()
 
-    # 5. Retorna True si se modificó alguna fila, False en caso contrario
-    return cursor.rowcount > 0
+    # 5. Retorna True si se modificó el libro, False si no existía
+    return actualizado
 
-def obtener_autores(conexion: sqlite3.Connection) -> List[Tuple]:
+@_cacheado
+def obtener_autores(conexion: sqlite3.Connection, formato: str = 'tupla') -> List[Tuple]:
     """
     Obtiene la lista de autores
 
     Args:
         conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        formato (str): Representación de las filas, uno de filas.FORMATOS
 
     Returns:
-        List[Tuple]: Lista de tuplas (id, nombre)
+        List[Tuple]: Lista de tuplas (id, nombre), o de filas en el formato pedido
     """
     # Implementa aquí la consulta de autores:
     # 1. Crea un cursor a partir de la conexión
@@ -170,8 +924,8 @@ def obtener_autores(conexion: sqlite3.Connection) -> List[Tuple]:
     # 2. Ejecuta una consulta SELECT para obtener los autores
     cursor.execute("SELECT id, nombre FROM autores ORDER BY id")
 
-    # 3. Retorna los resultados como una lista de tuplas
-    return cursor.fetchall()
+    # 3. Retorna los resultados como una lista de tuplas (o en el formato pedido)
+    return filas.leer(cursor, formato)
 
 if __name__ == "__main__":
     try:
@@ -3,11 +3,18 @@ Tests para el ejercicio ej3a2.py que trabaja con la inicialización de bases de
 SQLite a partir de un archivo SQL y realiza operaciones básicas de modificación de datos.
 """
 
+import gc
 import pytest
 import sqlite3
 import os
+import weakref
+import ej3a2
+import filas
 from ej3a2 import (crear_bd_desde_sql, obtener_libros, agregar_libro,
-                 actualizar_libro, obtener_autores)
+                 actualizar_libro, obtener_autores, iterar_sentencias_sql,
+                 cargar_script_sql, analizar_insert, agregar_libros, CacheResultados,
+                 migrar, version_esquema, listar_migraciones, abrir_bd,
+                 obtener_libros_paralelo, iterar_libros_paralelo, particionar_libros)
 
 # Path to SQL script and database
 SQL_FILE_PATH = os.path.join(os.path.dirname(__file__), 'test.sql')
@@ -247,3 +254,477 @@ def test_actualizar_libro(conexion_bd):
     libro_id_inexistente = 9999
     actualizado3 = actualizar_libro(conexion_bd, libro_id_inexistente, nuevo_titulo="No debería actualizarse")
     assert actualizado3 is False, "La función debería devolver False cuando el libro no existe"
+
+def test_crear_bd_desde_plantilla(tmp_path, monkeypatch):
+    """
+    Prueba que crear_bd_desde_sql reutiliza la plantilla mientras el script
+    no cambia y la reconstruye cuando cambia
+    """
+    sql_path = tmp_path / 'script.sql'
+    with open(SQL_FILE_PATH, 'r') as sql_file:
+        sql_path.write_text(sql_file.read())
+    monkeypatch.setattr(ej3a2, 'SQL_FILE_PATH', str(sql_path))
+    monkeypatch.setattr(ej3a2, 'DB_PATH', str(tmp_path / 'biblioteca.db'))
+    monkeypatch.setattr(ej3a2, 'PLANTILLAS_DIR', str(tmp_path / 'plantillas'))
+
+    conn = crear_bd_desde_sql()
+    agregar_libro(conn, "Violeta", 2022, 2)
+    conn.close()
+    plantillas = os.listdir(tmp_path / 'plantillas')
+    assert len(plantillas) == 1
+
+    # La segunda llamada parte de nuevo de la plantilla, sin los cambios anteriores
+    conn = crear_bd_desde_sql()
+    assert len(obtener_libros(conn)) == 6
+    conn.close()
+    assert os.listdir(tmp_path / 'plantillas') == plantillas
+
+    # Si el script cambia, se construye una plantilla nueva
+    with open(sql_path, 'a') as sql_file:
+        sql_file.write("\nINSERT INTO libros (titulo, anio, autor_id) VALUES ('Violeta', 2022, 2);\n")
+    conn = crear_bd_desde_sql()
+    assert len(obtener_libros(conn)) == 7
+    conn.close()
+    nuevas = os.listdir(tmp_path / 'plantillas')
+    assert len(nuevas) == 1 and nuevas != plantillas
+
+def test_iterar_sentencias_sql():
+    """Prueba la separación de un script SQL en sentencias"""
+    script = [
+        "-- Comentario inicial\n",
+        "CREATE TABLE t (a TEXT);\n",
+        "INSERT INTO t VALUES ('uno; dos'); INSERT INTO t VALUES ('tres');\n",
+        "CREATE TRIGGER tr AFTER INSERT ON t BEGIN\n",
+        "    UPDATE t SET a = a;\n",
+        "END;\n",
+        ";\n",
+        "INSERT INTO t VALUES ('sin punto y coma')\n",
+    ]
+    sentencias = list(iterar_sentencias_sql(script))
+    assert len(sentencias) == 5
+    assert sentencias[0] == "CREATE TABLE t (a TEXT);"
+    assert sentencias[1] == "INSERT INTO t VALUES ('uno; dos');"
+    assert sentencias[3].startswith("CREATE TRIGGER") and sentencias[3].endswith("END;")
+    assert sentencias[4] == "INSERT INTO t VALUES ('sin punto y coma')"
+
+def test_cargar_script_sql(tmp_path):
+    """Prueba la carga incremental de un script SQL por transacciones"""
+    sql_path = tmp_path / 'volcado.sql'
+    with open(SQL_FILE_PATH, 'r') as sql_file:
+        contenido = sql_file.read()
+    # Los BEGIN/COMMIT de un volcado los gestiona el cargador
+    sql_path.write_text("BEGIN TRANSACTION;\n" + contenido + "COMMIT;\n")
+
+    conn = sqlite3.connect(':memory:')
+    avisos = []
+    estadisticas = cargar_script_sql(conn, str(sql_path), sentencias_por_transaccion=4,
+                                     progreso=avisos.append)
+    try:
+        assert estadisticas['sentencias'] == 11
+        assert estadisticas['bytes'] > 0
+        assert len(avisos) == 3  # tras 4 y 8 sentencias, y al terminar
+        assert not conn.in_transaction
+        assert len(obtener_libros(conn)) == 6
+        assert len(obtener_autores(conn)) == 3
+    finally:
+        conn.close()
+
+def test_cargar_script_sql_comentarios(tmp_path):
+    """Prueba que los BEGIN/COMMIT precedidos de comentarios también se ignoran"""
+    sql_path = tmp_path / 'comentado.sql'
+    sql_path.write_text("-- Volcado\nBEGIN TRANSACTION;\n"
+                        "CREATE TABLE t (a INTEGER);\n"
+                        "INSERT INTO t VALUES (1);\n"
+                        "/* fin del primer bloque */ COMMIT;\n"
+                        "INSERT INTO t VALUES (NULL);\n"
+                        "-- Comentario final\n")
+    conn = sqlite3.connect(':memory:')
+    try:
+        estadisticas = cargar_script_sql(conn, str(sql_path), sentencias_por_transaccion=10)
+        assert estadisticas['sentencias'] == 3
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 2
+    finally:
+        conn.close()
+
+def test_cargar_script_sql_pragma(tmp_path):
+    """Prueba que los PRAGMA se ejecutan fuera de la transacción y tienen efecto"""
+    sql_path = tmp_path / 'pragma.sql'
+    sql_path.write_text("CREATE TABLE padre (id INTEGER PRIMARY KEY);\n"
+                        "PRAGMA foreign_keys = ON;\n"
+                        "CREATE TABLE hijo (padre_id INTEGER REFERENCES padre (id));\n"
+                        "INSERT INTO hijo (padre_id) VALUES (1);\n")
+    conn = sqlite3.connect(':memory:')
+    try:
+        with pytest.raises(sqlite3.IntegrityError):
+            cargar_script_sql(conn, str(sql_path))
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        # Lo anterior al PRAGMA ya estaba confirmado; el resto se deshace
+        tablas = [fila[0] for fila in conn.execute("SELECT name FROM sqlite_master")]
+        assert tablas == ['padre']
+    finally:
+        conn.close()
+
+def test_cargar_script_sql_rollback(tmp_path):
+    """Prueba que un ROLLBACK del script descarta su transacción, como executescript"""
+    sql_path = tmp_path / 'rollback.sql'
+    sql_path.write_text("CREATE TABLE t (a INTEGER);\n"
+                        "INSERT INTO t VALUES (1);\n"
+                        "BEGIN TRANSACTION;\n"
+                        "INSERT INTO t VALUES (2);\n"
+                        "INSERT INTO t VALUES (3);\n"
+                        "INSERT INTO t VALUES (4);\n"
+                        "ROLLBACK; -- due to errors\n"
+                        "INSERT INTO t VALUES (5);\n")
+    conn = sqlite3.connect(':memory:')
+    try:
+        # Aunque el lote sea menor que la transacción del script, no se confirma a medias
+        cargar_script_sql(conn, str(sql_path), sentencias_por_transaccion=2)
+        assert not conn.in_transaction
+        assert [fila[0] for fila in conn.execute("SELECT a FROM t ORDER BY a")] == [1, 5]
+    finally:
+        conn.close()
+
+def test_cargar_script_sql_fuera_de_transaccion(tmp_path):
+    """Prueba que VACUUM y ATTACH se ejecutan fuera de la transacción del lote"""
+    sql_path = tmp_path / 'vacuum.sql'
+    otra = tmp_path / 'otra.db'
+    sql_path.write_text("CREATE TABLE t (a INTEGER);\n"
+                        "INSERT INTO t VALUES (1);\n"
+                        "VACUUM;\n"
+                        f"ATTACH DATABASE '{otra}' AS otra;\n"
+                        "CREATE TABLE otra.u AS SELECT * FROM t;\n"
+                        "DETACH DATABASE otra;\n")
+    conn = sqlite3.connect(str(tmp_path / 'principal.db'))
+    try:
+        estadisticas = cargar_script_sql(conn, str(sql_path))
+        assert estadisticas['sentencias'] == 6
+    finally:
+        conn.close()
+    conn = sqlite3.connect(str(otra))
+    try:
+        assert conn.execute("SELECT a FROM u").fetchall() == [(1,)]
+    finally:
+        conn.close()
+
+def test_cargar_script_sql_error(tmp_path):
+    """Prueba que un error deshace la transacción en curso"""
+    sql_path = tmp_path / 'roto.sql'
+    sql_path.write_text("CREATE TABLE t (a INTEGER NOT NULL);\n"
+                        "INSERT INTO t VALUES (1);\n"
+                        "INSERT INTO t VALUES (NULL);\n")
+    conn = sqlite3.connect(':memory:')
+    try:
+        with pytest.raises(sqlite3.IntegrityError):
+            cargar_script_sql(conn, str(sql_path))
+        # El lote entero se deshace, incluido el CREATE TABLE
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+def test_analizar_insert():
+    """Prueba el reconocimiento de INSERT de una fila con lista de columnas"""
+    assert analizar_insert(
+        "INSERT INTO libros (titulo, anio, autor_id) VALUES ('Cien años de soledad', 1967, 1);") == (
+        "INSERT INTO libros (titulo, anio, autor_id) VALUES ",
+        "('Cien años de soledad', 1967, 1)")
+    assert analizar_insert("insert into t (a, b) values ('it''s; (ok)', -2.5)") == (
+        "insert into t (a, b) values ", "('it''s; (ok)', -2.5)")
+    assert analizar_insert("INSERT INTO t (a) VALUES (NULL)")[1] == "(NULL)"
+
+    # Lo que no se reconoce se ejecuta tal cual
+    no_reconocidas = [
+        "INSERT INTO t VALUES (1)",
+        "INSERT INTO t (a) VALUES (lower('X'))",
+        "INSERT INTO t (a) VALUES ('x'), ('y')",
+        "INSERT INTO t (a) VALUES (1) ON CONFLICT DO NOTHING",
+        "INSERT INTO t (a) VALUES (1) RETURNING a",
+        "INSERT INTO t (a) SELECT a FROM t",
+        "INSERT OR IGNORE INTO t (a) VALUES (1)",
+        "UPDATE t SET a = 1",
+    ]
+    for sentencia in no_reconocidas:
+        assert analizar_insert(sentencia) is None, sentencia
+
+def test_cargar_script_sql_agrupando_inserts(tmp_path):
+    """Prueba que agrupar los INSERT da la misma base de datos que ejecutarlos uno a uno"""
+    sql_path = tmp_path / 'mixto.sql'
+    with open(SQL_FILE_PATH, 'r') as sql_file:
+        contenido = sql_file.read()
+    sql_path.write_text(contenido +
+                        "INSERT INTO libros (titulo, anio, autor_id) VALUES ('Eva Luna', 1987, 2 * 1);\n"
+                        "INSERT INTO libros (titulo, anio, autor_id) VALUES (upper('x'), 1990, 1);\n"
+                        "INSERT INTO libros (titulo, anio, autor_id) VALUES ('O''Brien', NULL, 3);\n"
+                        "UPDATE libros SET anio = 1988 WHERE titulo = 'Eva Luna';\n"
+                        "INSERT INTO autores (nombre) VALUES ('Julio Cortázar');\n")
+
+    resultados = []
+    for agrupar in (False, True):
+        conn = sqlite3.connect(':memory:')
+        try:
+            estadisticas = cargar_script_sql(conn, str(sql_path), sentencias_por_transaccion=5,
+                                             agrupar_inserts=agrupar)
+            assert estadisticas['sentencias'] == 16
+            resultados.append((obtener_libros(conn), obtener_autores(conn)))
+        finally:
+            conn.close()
+
+    assert resultados[0] == resultados[1]
+    assert "O'Brien" in [libro[1] for libro in resultados[1][0]]
+
+def test_agregar_libros(conexion_bd, monkeypatch):
+    """Prueba la inserción de varios libros en una transacción"""
+    monkeypatch.setattr(ej3a2, 'LIBROS_POR_INSERT', 2)
+    libros = [("Eva Luna", 1987, 2), ("Violeta", 2022, 2), ("El Aleph", 1949, 3)]
+
+    ids = agregar_libros(conexion_bd, libros)
+    assert len(ids) == 3
+    assert not conexion_bd.in_transaction
+
+    cursor = conexion_bd.cursor()
+    for libro_id, (titulo, anio, autor_id) in zip(ids, libros):
+        cursor.execute("SELECT titulo, anio, autor_id FROM libros WHERE id = ?", (libro_id,))
+        assert cursor.fetchone() == (titulo, anio, autor_id)
+
+    assert agregar_libros(conexion_bd, []) == []
+
+def test_agregar_libros_transaccion_llamante(conexion_bd, monkeypatch):
+    """Prueba que agregar_libros se une a la transacción abierta sin confirmarla"""
+    monkeypatch.setattr(ej3a2, 'LIBROS_POR_INSERT', 1)
+    total = len(obtener_libros(conexion_bd))
+    conexion_bd.execute("DELETE FROM libros WHERE id = 1")
+    agregar_libros(conexion_bd, [("Eva Luna", 1987, 2)])
+    assert conexion_bd.in_transaction
+    conexion_bd.rollback()
+    assert len(obtener_libros(conexion_bd)) == total
+
+    # Un lote que falla deshace los anteriores, pero no lo que ya hizo el llamante
+    conexion_bd.execute("DELETE FROM libros WHERE id = 1")
+    with pytest.raises(sqlite3.IntegrityError):
+        agregar_libros(conexion_bd, [("Eva Luna", 1987, 2), (None, 2022, 2)])
+    assert conexion_bd.in_transaction
+    conexion_bd.commit()
+    assert len(obtener_libros(conexion_bd)) == total - 1
+
+def test_actualizar_libro_sin_cambios(conexion_bd):
+    """Prueba actualizar_libro sin campos: solo comprueba si el libro existe"""
+    assert actualizar_libro(conexion_bd, 1) is True
+    assert actualizar_libro(conexion_bd, 9999) is False
+
+def test_cache_resultados(conexion_bd, monkeypatch):
+    """Prueba que obtener_libros reutiliza el resultado hasta que cambian los datos"""
+    cache = CacheResultados(max_entradas=8)
+    monkeypatch.setattr(ej3a2, 'CACHE_RESULTADOS', cache)
+
+    libros = obtener_libros(conexion_bd)
+    assert obtener_libros(conexion_bd) == libros
+    assert cache.estadisticas()['aciertos'] == 1
+    assert cache.estadisticas()['fallos'] == 1
+
+    # Modificar la lista devuelta no altera la caché
+    libros.clear()
+    assert len(obtener_libros(conexion_bd)) == 6
+
+    # Las escrituras del módulo y las de SQL directo invalidan la caché
+    agregar_libro(conexion_bd, "Eva Luna", 1987, 2)
+    assert len(obtener_libros(conexion_bd)) == 7
+    conexion_bd.execute("DELETE FROM libros WHERE titulo = 'Eva Luna'")
+    conexion_bd.commit()
+    assert len(obtener_libros(conexion_bd)) == 6
+
+def test_cache_resultados_otra_conexion(conexion_bd, monkeypatch):
+    """Prueba que un commit de otra conexión invalida la caché (PRAGMA data_version)"""
+    monkeypatch.setattr(ej3a2, 'CACHE_RESULTADOS', CacheResultados())
+    assert len(obtener_autores(conexion_bd)) == 3
+
+    otra = sqlite3.connect(ej3a2.DB_PATH)
+    try:
+        otra.execute("INSERT INTO autores (nombre) VALUES ('Julio Cortázar')")
+        otra.commit()
+    finally:
+        otra.close()
+
+    assert len(obtener_autores(conexion_bd)) == 4
+
+def test_cache_resultados_lru(conexion_bd, monkeypatch):
+    """Prueba que la caché respeta su tamaño máximo descartando la entrada menos usada"""
+    cache = CacheResultados(max_entradas=1)
+    monkeypatch.setattr(ej3a2, 'CACHE_RESULTADOS', cache)
+
+    obtener_libros(conexion_bd)
+    obtener_autores(conexion_bd)
+    obtener_libros(conexion_bd)
+    assert cache.estadisticas() == {'aciertos': 0, 'fallos': 3, 'entradas': 1, 'max_entradas': 1}
+    obtener_libros(conexion_bd)
+    assert cache.estadisticas()['aciertos'] == 1
+
+def test_cache_resultados_rollback(conexion_bd, monkeypatch):
+    """Prueba que lo leído dentro de una transacción no se sirve tras el rollback"""
+    cache = CacheResultados()
+    monkeypatch.setattr(ej3a2, 'CACHE_RESULTADOS', cache)
+    assert len(obtener_libros(conexion_bd)) == 6
+
+    conexion_bd.execute("INSERT INTO libros (titulo, anio, autor_id) VALUES ('Eva Luna', 1987, 2)")
+    assert conexion_bd.in_transaction
+    assert len(obtener_libros(conexion_bd)) == 7
+    assert cache.estadisticas()['entradas'] == 1
+
+    conexion_bd.rollback()
+    assert len(obtener_libros(conexion_bd)) == 6
+
+def test_cache_resultados_referencia_debil(conexion_bd, monkeypatch):
+    """Prueba que la caché no mantiene viva la conexión de sus entradas"""
+    cache = CacheResultados()
+    monkeypatch.setattr(ej3a2, 'CACHE_RESULTADOS', cache)
+
+    conexion = abrir_bd()
+    referencia = weakref.ref(conexion)
+    obtener_autores(conexion)
+    conexion.close()
+    del conexion
+    gc.collect()
+    assert referencia() is None
+
+    obtener_autores(conexion_bd)
+    assert cache.estadisticas()['entradas'] == 1
+
+def test_cache_resultados_row_factory(conexion_bd, monkeypatch):
+    """Prueba que cambiar el row_factory de la conexión no sirve filas con la forma anterior"""
+    monkeypatch.setattr(ej3a2, 'CACHE_RESULTADOS', CacheResultados())
+    assert type(obtener_libros(conexion_bd)[0]) is tuple
+
+    conexion_bd.row_factory = filas.fabrica_namedtuple
+    libro = obtener_libros(conexion_bd)[0]
+    assert type(libro) is not tuple and libro.titulo
+
+def test_cache_resultados_sin_referencia_debil(tmp_path, monkeypatch):
+    """Prueba que no se guarda nada de las conexiones que no admiten referencias débiles"""
+    cache = CacheResultados()
+    monkeypatch.setattr(ej3a2, 'CACHE_RESULTADOS', cache)
+    conexion = sqlite3.connect(str(tmp_path / 'plana.db'))
+    try:
+        cargar_script_sql(conexion, SQL_FILE_PATH)
+        assert obtener_autores(conexion) == obtener_autores(conexion)
+        assert cache.estadisticas()['entradas'] == 0
+    finally:
+        conexion.close()
+
+def test_migracion_inicial_igual_que_script():
+    """
+    Prueba que la migración 0001 crea exactamente el esquema de test.sql, para
+    que las dos definiciones no se separen sin que nadie lo note
+    """
+    script = sqlite3.connect(':memory:')
+    migrada = sqlite3.connect(':memory:')
+    try:
+        with open(SQL_FILE_PATH, 'r') as sql_file:
+            script.executescript(sql_file.read())
+        assert migrar(migrada, hasta=1) == [1]
+        consulta = "SELECT type, name, tbl_name, sql FROM sqlite_master ORDER BY name"
+        assert migrada.execute(consulta).fetchall() == script.execute(consulta).fetchall()
+    finally:
+        script.close()
+        migrada.close()
+
+def test_migrar_bd_existente(tmp_path):
+    """Prueba que migrar aplica las migraciones pendientes conservando los datos"""
+    ruta = str(tmp_path / 'existente.db')
+    conn = sqlite3.connect(ruta)
+    try:
+        cargar_script_sql(conn, SQL_FILE_PATH)
+        assert version_esquema(conn) == 0
+
+        ultima = len(listar_migraciones())
+        assert migrar(conn) == list(range(1, ultima + 1))
+        assert version_esquema(conn) == ultima
+        assert len(obtener_libros(conn)) == 6
+
+        indices = {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert 'idx_libros_autor_id' in indices
+
+        # Ya migrada: no hay nada pendiente y no se toma el bloqueo de escritura,
+        # aunque otra conexión lo tenga
+        otra = sqlite3.connect(ruta, timeout=0)
+        otra.execute("BEGIN IMMEDIATE")
+        consultas = []
+        conn.set_trace_callback(consultas.append)
+        try:
+            assert migrar(conn) == []
+        finally:
+            conn.set_trace_callback(None)
+            otra.rollback()
+            otra.close()
+        assert not [sql for sql in consultas if sql.startswith('BEGIN')]
+    finally:
+        conn.close()
+
+def test_migrar_error(tmp_path):
+    """Prueba que una migración fallida no cambia la versión ni deja cambios a medias"""
+    directorio = tmp_path / 'migraciones'
+    directorio.mkdir()
+    (directorio / '0001_tabla.sql').write_text("CREATE TABLE prestamos (id INTEGER PRIMARY KEY);\n")
+    (directorio / '0002_error.sql').write_text(
+        "ALTER TABLE prestamos ADD COLUMN fecha TEXT;\n"
+        "INSERT INTO tabla_inexistente VALUES (1);\n")
+
+    conn = sqlite3.connect(':memory:')
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            migrar(conn, str(directorio))
+        assert version_esquema(conn) == 1
+        assert not conn.in_transaction
+        columnas = [fila[1] for fila in conn.execute("PRAGMA table_info(prestamos)")]
+        assert columnas == ['id']
+
+        (directorio / '0004_salto.sql').write_text("SELECT 1;\n")
+        with pytest.raises(ValueError):
+            migrar(conn, str(directorio))
+    finally:
+        conn.close()
+
+def test_abrir_bd_conserva_datos(tmp_path, monkeypatch):
+    """Prueba que abrir_bd crea la base de datos una vez y después solo la migra"""
+    monkeypatch.setattr(ej3a2, 'PLANTILLAS_DIR', str(tmp_path / 'plantillas'))
+    ruta = str(tmp_path / 'produccion.db')
+
+    conn = abrir_bd(ruta)
+    assert version_esquema(conn) == len(listar_migraciones())
+    agregar_libro(conn, "Eva Luna", 1987, 2)
+    conn.close()
+
+    conn = abrir_bd(ruta)
+    try:
+        assert len(obtener_libros(conn)) == 7
+    finally:
+        conn.close()
+
+def test_obtener_libros_paralelo(conexion_bd):
+    """Prueba que la lectura paralela por rangos devuelve lo mismo que obtener_libros"""
+    # Un hueco en los ids no debe perder ni duplicar filas
+    conexion_bd.execute("DELETE FROM libros WHERE id = 3")
+    conexion_bd.commit()
+    libros = obtener_libros(conexion_bd)
+
+    assert particionar_libros(DB_PATH, 4) == [(1, 2), (3, 4), (5, 6)]
+    assert obtener_libros_paralelo(DB_PATH, trabajadores=3, particiones=4) == libros
+    assert obtener_libros_paralelo(DB_PATH, trabajadores=2, procesos=True) == libros
+
+    desordenado = [libro for particion in iterar_libros_paralelo(DB_PATH, 3, ordenado=False)
+                   for libro in particion]
+    assert sorted(desordenado) == libros
+
+def test_obtener_libros_paralelo_vacia(conexion_bd):
+    """Prueba la lectura paralela de una tabla vacía"""
+    conexion_bd.execute("DELETE FROM libros")
+    conexion_bd.commit()
+    assert obtener_libros_paralelo(DB_PATH) == []
+
+def test_obtener_libros_formatos(conexion_bd):
+    """Prueba obtener_libros y obtener_autores con representaciones compactas de filas"""
+    libros = obtener_libros(conexion_bd)
+    assert [tuple(libro) for libro in obtener_libros(conexion_bd, formato='namedtuple')] == libros
+    assert obtener_libros(conexion_bd, formato='namedtuple')[0].titulo == libros[0][1]
+
+    columnas = obtener_libros(conexion_bd, formato='columnas')
+    assert list(columnas) == libros
+    assert list(columnas.columna('anio')) == [libro[2] for libro in libros]
+    assert obtener_autores(conexion_bd, formato='namedtuple')[0].nombre == 'Gabriel García Márquez'
@@ -12,14 +12,312 @@ usando diferentes técnicas.
 """
 
 import sqlite3
+import numpy as np
 import pandas as pd
 import os
+import base64
+import hashlib
 import json
-from typing import List, Dict, Any, Optional, Tuple, Union
+import shutil
+import tempfile
+from array import array
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Iterator, Optional, TextIO, Tuple, Union
+
+import filas
 
 # Ruta a la base de datos SQLite
 DB_PATH = os.path.join(os.path.dirname(__file__), 'ventas_comerciales.db')
 
+# Filas leídas (y escritas) de cada vez al exportar a JSON
+TAMANO_LOTE_EXPORTACION = 1000
+
+# Formatos de exportar_json
+FORMATOS_EXPORTACION = ('ndjson', 'json')
+
+# Directorio de la caché en disco de los DataFrames extraídos
+CACHE_DATAFRAMES_DIR = os.path.join(os.path.dirname(__file__), '.cache_dataframes')
+# Versión del formato de la caché: cambiarla invalida las cachés anteriores
+_VERSION_CACHE_DATAFRAMES = 1
+
+# Conexiones (por modo de carga) de las que se recuerda el estado de la última
+# extracción cacheada: (data_version, total_changes) y clave
+MAX_ESTADOS_CACHE_DATAFRAMES = 64
+_estados_cache_dataframes: Dict[Tuple[int, bool], Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+# Tabla donde los triggers de SQL_REGISTRO_CAMBIOS anotan los cambios de ventas
+# que no son altas al final de la tabla (ver ExtractorIncremental)
+REGISTRO_CAMBIOS = 'ventas_cambios'
+
+SQL_REGISTRO_CAMBIOS = {
+    'ventas_cambios': """
+        CREATE TABLE IF NOT EXISTS ventas_cambios (
+            id INTEGER PRIMARY KEY,
+            venta_id INTEGER NOT NULL,
+            operacion TEXT NOT NULL
+        )
+    """,
+    'ventas_cambios_update': """
+        CREATE TRIGGER IF NOT EXISTS ventas_cambios_update AFTER UPDATE ON ventas BEGIN
+            INSERT INTO ventas_cambios (venta_id, operacion) VALUES (OLD.id, 'UPDATE');
+        END
+    """,
+    'ventas_cambios_delete': """
+        CREATE TRIGGER IF NOT EXISTS ventas_cambios_delete AFTER DELETE ON ventas BEGIN
+            INSERT INTO ventas_cambios (venta_id, operacion) VALUES (OLD.id, 'DELETE');
+        END
+    """,
+    # Un alta con id menor que el máximo (un hueco) quedaría por debajo de la marca de agua
+    'ventas_cambios_insert': """
+        CREATE TRIGGER IF NOT EXISTS ventas_cambios_insert AFTER INSERT ON ventas
+        WHEN NEW.id < (SELECT MAX(id) FROM ventas) BEGIN
+            INSERT INTO ventas_cambios (venta_id, operacion) VALUES (NEW.id, 'INSERT');
+        END
+    """,
+    # INSERT OR REPLACE sobre un id existente no dispara el trigger de DELETE, y
+    # si sustituye la venta de mayor id la nueva no queda por encima de la marca
+    'ventas_cambios_reemplazo': """
+        CREATE TRIGGER IF NOT EXISTS ventas_cambios_reemplazo BEFORE INSERT ON ventas
+        WHEN EXISTS (SELECT 1 FROM ventas WHERE id = NEW.id) BEGIN
+            INSERT INTO ventas_cambios (venta_id, operacion) VALUES (NEW.id, 'REPLACE');
+        END
+    """,
+}
+
+# Resumen de ventas al grano más fino de los análisis (región, vendedor,
+# categoría y mes); cualquier agrupación más gruesa se calcula sumando sus filas.
+# Solo cuenta las ventas que aparecen en ventas_completas (todas las uniones).
+SQL_RESUMEN_VENTAS = """
+    CREATE TABLE IF NOT EXISTS resumen_ventas (
+        vendedor_id INTEGER NOT NULL,
+        categoria TEXT NOT NULL,
+        mes TEXT NOT NULL,
+        region_id INTEGER NOT NULL,
+        ingresos REAL NOT NULL,
+        unidades INTEGER NOT NULL,
+        ventas INTEGER NOT NULL,
+        PRIMARY KEY (vendedor_id, categoria, mes, region_id)
+    )
+"""
+
+# Ventas cuya aportación se ha restado de resumen_ventas antes de que un INSERT
+# con su id las sustituya (ver resumen_ventas_reemplazo). Si el INSERT acaba
+# ignorándose (OR IGNORE, DO NOTHING), la venta sigue igual y actualizar_resumenes
+# vuelve a sumarla.
+SQL_RESUMEN_PENDIENTES = """
+    CREATE TABLE IF NOT EXISTS resumen_ventas_pendientes (
+        venta_id INTEGER PRIMARY KEY
+    )
+"""
+
+# Una sola fila: desactualizado = 1 tras un cambio en productos, vendedores o
+# regiones que afecta al resumen; actualizar_resumenes lo recalcula entonces una vez
+SQL_RESUMEN_ESTADO = """
+    CREATE TABLE IF NOT EXISTS resumen_ventas_estado (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        desactualizado INTEGER NOT NULL
+    )
+"""
+
+def _aportacion_venta(fila: str, signo: int, origen: str = '', condicion: str = '') -> str:
+    """
+    SELECT de la aportación (signo 1) o resta (signo -1) de una venta a su grupo del resumen
+
+    fila es la venta (NEW, OLD o un alias de origen); origen añade tablas al
+    FROM y condicion, condiciones al WHERE (ambas terminadas en separador).
+    Devuelve las columnas de resumen_ventas, en su orden.
+    """
+    return f"""
+        SELECT vd.id, p.categoria, substr({fila}.fecha, 1, 7), r.id,
+               {signo} * {fila}.cantidad * p.precio_unitario, {signo} * {fila}.cantidad, {signo}
+        FROM {origen}productos p, vendedores vd, regiones r
+        WHERE {condicion}p.id = {fila}.producto_id AND vd.id = {fila}.vendedor_id AND r.id = vd.region_id
+    """
+
+def _ajuste_resumen(fila: str, signo: int, origen: str = '', condicion: str = '') -> str:
+    """Suma (signo 1) o resta (signo -1) una venta en su grupo del resumen (ver _aportacion_venta)"""
+    return f"""
+        INSERT INTO resumen_ventas (vendedor_id, categoria, mes, region_id, ingresos, unidades, ventas)
+        {_aportacion_venta(fila, signo, origen, condicion)}
+        ON CONFLICT (vendedor_id, categoria, mes, region_id) DO UPDATE SET
+            ingresos = ingresos + excluded.ingresos,
+            unidades = unidades + excluded.unidades,
+            ventas = ventas + excluded.ventas;
+    """
+
+def _no_pendiente(venta_id: str) -> str:
+    """Condición de que la aportación de la venta sigue en el resumen"""
+    return f"NOT EXISTS (SELECT 1 FROM resumen_ventas_pendientes WHERE venta_id = {venta_id}) AND "
+
+# Los grupos que se quedan sin ventas desaparecen, como en un GROUP BY
+_SQL_LIMPIEZA_RESUMEN = """
+    DELETE FROM resumen_ventas
+    WHERE vendedor_id = {fila}.vendedor_id AND mes = substr({fila}.fecha, 1, 7) AND ventas = 0;
+"""
+
+_SQL_QUITAR_PENDIENTE = """
+    DELETE FROM resumen_ventas_pendientes WHERE venta_id = {venta_id};
+"""
+
+def _agregar_ventas(solo_desactualizado: bool = False) -> str:
+    """
+    SELECT de las filas de resumen_ventas calculadas directamente a partir de ventas
+
+    Con solo_desactualizado no devuelve nada salvo que resumen_ventas_estado lo
+    marque: el CROSS JOIN obliga a mirar el estado antes de recorrer ventas.
+    """
+    return f"""
+        SELECT vd.id, p.categoria, substr(v.fecha, 1, 7), r.id,
+               SUM(v.cantidad * p.precio_unitario), SUM(v.cantidad), COUNT(*)
+        FROM {"resumen_ventas_estado e CROSS JOIN " if solo_desactualizado else ""}ventas v
+        JOIN productos p ON v.producto_id = p.id
+        JOIN vendedores vd ON v.vendedor_id = vd.id
+        JOIN regiones r ON vd.region_id = r.id
+        {"WHERE e.desactualizado" if solo_desactualizado else ""}
+        GROUP BY vd.id, p.categoria, substr(v.fecha, 1, 7), r.id
+    """
+
+# Recalcula el resumen entero a partir de ventas
+SQL_RECONSTRUIR_RESUMEN = f"""
+    DELETE FROM resumen_ventas;
+    INSERT INTO resumen_ventas (vendedor_id, categoria, mes, region_id, ingresos, unidades, ventas)
+    {_agregar_ventas()};
+    DELETE FROM resumen_ventas_pendientes;
+    UPDATE resumen_ventas_estado SET desactualizado = 0;
+"""
+
+_ORIGEN_PENDIENTES = 'resumen_ventas_pendientes pe, ventas o, '
+_CONDICION_PENDIENTES = 'o.id = pe.venta_id AND '
+
+# Vuelve a sumar las ventas pendientes cuyo INSERT no llegó a sustituirlas
+SQL_APLICAR_PENDIENTES = _ajuste_resumen('o', 1, _ORIGEN_PENDIENTES, _CONDICION_PENDIENTES) + """
+    DELETE FROM resumen_ventas_pendientes;
+"""
+
+# Filas de resumen_ventas al día sin escribir nada: con el resumen desactualizado
+# se agrupa ventas entera; si no, se añade a resumen_ventas la aportación de las
+# ventas pendientes. Es una sola sentencia, así que todo se lee del mismo estado.
+SQL_RESUMEN_AL_DIA = f"""
+    SELECT vendedor_id, categoria, mes, region_id, ingresos, unidades, ventas
+    FROM resumen_ventas
+    WHERE NOT (SELECT desactualizado FROM resumen_ventas_estado)
+    UNION ALL
+    {_aportacion_venta('o', 1, _ORIGEN_PENDIENTES,
+                       _CONDICION_PENDIENTES + 'NOT (SELECT desactualizado FROM resumen_ventas_estado) AND ')}
+    UNION ALL
+    {_agregar_ventas(solo_desactualizado=True)}
+"""
+
+def _trigger_invalidar_resumen(nombre: str, evento: str, tabla: str, cuando: str = '') -> str:
+    """CREATE TRIGGER que marca resumen_ventas como desactualizado tras un evento en una tabla de dimensiones"""
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS {nombre} AFTER {evento} ON {tabla}
+        {f"WHEN {cuando}" if cuando else ""} BEGIN
+            UPDATE resumen_ventas_estado SET desactualizado = 1 WHERE desactualizado = 0;
+        END
+    """
+
+# Triggers que mantienen resumen_ventas. Las altas, bajas y cambios de ventas
+# ajustan solo su grupo; un INSERT OR REPLACE resta antes la venta sustituida,
+# porque el borrado implícito no dispara resumen_ventas_delete. Los cambios en
+# productos, vendedores o regiones que afectan al resumen (precio, categoría,
+# región, altas que completan uniones) son raros: solo lo marcan como
+# desactualizado, y la siguiente consulta lo recalcula una vez, no una por fila.
+SQL_TRIGGERS_RESUMEN = {
+    'resumen_ventas_reemplazo': f"""
+        CREATE TRIGGER IF NOT EXISTS resumen_ventas_reemplazo BEFORE INSERT ON ventas
+        WHEN EXISTS (SELECT 1 FROM ventas WHERE id = NEW.id) BEGIN
+            {_ajuste_resumen('o', -1, 'ventas o, ', 'o.id = NEW.id AND ' + _no_pendiente('NEW.id'))}
+            DELETE FROM resumen_ventas
+            WHERE ventas = 0 AND (vendedor_id, mes) IN (
+                SELECT vendedor_id, substr(fecha, 1, 7) FROM ventas WHERE id = NEW.id);
+            INSERT OR IGNORE INTO resumen_ventas_pendientes (venta_id) VALUES (NEW.id);
+        END
+    """,
+    'resumen_ventas_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS resumen_ventas_insert AFTER INSERT ON ventas BEGIN
+            {_ajuste_resumen('NEW', 1)}
+            {_SQL_QUITAR_PENDIENTE.format(venta_id='NEW.id')}
+        END
+    """,
+    'resumen_ventas_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS resumen_ventas_delete AFTER DELETE ON ventas BEGIN
+            {_ajuste_resumen('OLD', -1, condicion=_no_pendiente('OLD.id'))}
+            {_SQL_LIMPIEZA_RESUMEN.format(fila='OLD')}
+            {_SQL_QUITAR_PENDIENTE.format(venta_id='OLD.id')}
+        END
+    """,
+    'resumen_ventas_update': f"""
+        CREATE TRIGGER IF NOT EXISTS resumen_ventas_update
+        AFTER UPDATE OF id, fecha, vendedor_id, producto_id, cantidad ON ventas BEGIN
+            {_ajuste_resumen('OLD', -1, condicion=_no_pendiente('OLD.id'))}
+            {_ajuste_resumen('NEW', 1)}
+            {_SQL_LIMPIEZA_RESUMEN.format(fila='OLD')}
+            {_SQL_QUITAR_PENDIENTE.format(venta_id='OLD.id')}
+        END
+    """,
+    'resumen_productos_update': _trigger_invalidar_resumen(
+        'resumen_productos_update', 'UPDATE OF id, categoria, precio_unitario', 'productos'),
+    'resumen_vendedores_update': _trigger_invalidar_resumen(
+        'resumen_vendedores_update', 'UPDATE OF id, region_id', 'vendedores'),
+    'resumen_regiones_update': _trigger_invalidar_resumen(
+        'resumen_regiones_update', 'UPDATE OF id', 'regiones'),
+    'resumen_productos_delete': _trigger_invalidar_resumen(
+        'resumen_productos_delete', 'DELETE', 'productos'),
+    'resumen_vendedores_delete': _trigger_invalidar_resumen(
+        'resumen_vendedores_delete', 'DELETE', 'vendedores'),
+    'resumen_regiones_delete': _trigger_invalidar_resumen(
+        'resumen_regiones_delete', 'DELETE', 'regiones'),
+    # Un alta solo cambia el resumen si completa la unión de ventas que ya existían
+    'resumen_productos_insert': _trigger_invalidar_resumen(
+        'resumen_productos_insert', 'INSERT', 'productos',
+        "EXISTS (SELECT 1 FROM ventas WHERE producto_id = NEW.id)"),
+    'resumen_vendedores_insert': _trigger_invalidar_resumen(
+        'resumen_vendedores_insert', 'INSERT', 'vendedores',
+        "EXISTS (SELECT 1 FROM ventas WHERE vendedor_id = NEW.id)"),
+    'resumen_regiones_insert': _trigger_invalidar_resumen(
+        'resumen_regiones_insert', 'INSERT', 'regiones',
+        "EXISTS (SELECT 1 FROM vendedores WHERE region_id = NEW.id)"),
+}
+
+# Tablas auxiliares de este módulo (más las sqlite_* del propio SQLite), que
+# listar_tablas omite para que no aparezcan entre los datos exportados
+TABLAS_INTERNAS = frozenset({REGISTRO_CAMBIOS, 'resumen_ventas', 'resumen_ventas_pendientes',
+                             'resumen_ventas_estado'})
+
+# Dimensiones de consultar_resumen: columnas por las que se agrupa y columnas que se devuelven
+DIMENSIONES_RESUMEN = {
+    'region': (['rs.region_id'], ['rs.region_id', 'r.nombre AS region_nombre']),
+    'vendedor': (['rs.vendedor_id'], ['rs.vendedor_id', 'vd.nombre AS vendedor_nombre']),
+    'categoria': (['rs.categoria'], ['rs.categoria']),
+    'mes': (['rs.mes'], ['rs.mes']),
+}
+
+# Formatos de ExtractorIncremental
+FORMATOS_INCREMENTALES = ('dataframes', 'json')
+
+# Filas por lote al leer tablas con tipos (chunksize de pd.read_sql_query)
+TAMANO_CHUNK = 100_000
+
+# Tipos de cada columna al cargar DataFrames con tipado: enteros reducidos,
+# 'category' para texto con pocos valores distintos, fechas como datetime64 y
+# precios en float32. Las columnas que no aparecen conservan el tipo de pandas.
+TIPOS_COLUMNAS = {
+    'regiones': {'id': 'int16', 'nombre': 'category', 'pais': 'category'},
+    'vendedores': {'id': 'int16', 'nombre': 'category', 'apellido': 'category',
+                   'region_id': 'int16', 'fecha_contratacion': 'datetime64[ns]'},
+    'productos': {'id': 'int16', 'nombre': 'category', 'categoria': 'category',
+                  'precio_unitario': 'float32'},
+    'ventas': {'id': 'int32', 'fecha': 'datetime64[ns]', 'vendedor_id': 'int16',
+               'producto_id': 'int16', 'cantidad': 'int16'},
+}
+
+# Formatos de convertir_a_json: una lista de diccionarios o una lista por columna
+FORMATOS_JSON = ('filas', 'columnas')
+# Una columna de texto se codifica con diccionario si tiene como mucho este
+# número de valores distintos y estos son como mucho la mitad de sus filas
+MAX_VALORES_DICCIONARIO = 1000
+
 def conectar_bd() -> sqlite3.Connection:
     """
     Conecta a una base de datos SQLite existente
@@ -35,17 +333,27 @@ def conectar_bd() -> sqlite3.Connection:
     conexion = sqlite3.connect(DB_PATH)
     return conexion
 
-def convertir_a_json(conexion: sqlite3.Connection) -> Dict[str, List[Dict[str, Any]]]:
+def convertir_a_json(conexion: sqlite3.Connection, formato: str = 'filas',
+                     diccionario: bool = False) -> Dict[str, Any]:
     """
     Convierte los datos de la base de datos en un objeto compatible con JSON
 
     Args:
         conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        formato (str): 'filas' para una lista de registros por tabla; 'columnas'
+            para {tabla: {columna: [valores...]}} (ver convertir_a_json_columnar)
+        diccionario (bool): Con formato 'columnas', codificar con diccionario las
+            columnas de texto con pocos valores distintos
 
     Returns:
         Dict[str, List[Dict[str, Any]]]: Diccionario con todas las tablas y sus registros
-        en formato JSON-serializable
+        en formato JSON-serializable (con formato 'columnas', sus columnas)
     """
+    if formato not in FORMATOS_JSON:
+        raise ValueError(f"Formato desconocido: {formato!r}; debe ser uno de {FORMATOS_JSON}")
+    if formato == 'columnas':
+        return convertir_a_json_columnar(conexion, diccionario)
+
     # Implementa aquí la conversión de datos a formato JSON:
     # 1. Crea un diccionario vacío para almacenar el resultado
     # 2. Obtén la lista de tablas de la base de datos
@@ -59,11 +367,8 @@ def convertir_a_json(conexion: sqlite3.Connection) -> Dict[str, List[Dict[str, A
     resultado = {}
 
     cursor = conexion.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tablas = cursor.fetchall()
 
-    for tabla in tablas:
-        nombre_tabla = tabla[0]
+    for nombre_tabla in listar_tablas(conexion):
         cursor.execute(f"SELECT * FROM {nombre_tabla};")
 
         columnas = [descripcion[0] for descripcion in cursor.description]
@@ -77,22 +382,467 @@ def convertir_a_json(conexion: sqlite3.Connection) -> Dict[str, List[Dict[str, A
     return resultado
 
 
-def convertir_a_dataframes(conexion: sqlite3.Connection) -> Dict[str, pd.DataFrame]:
+def _codificar_diccionario(valores: List[Any]) -> Optional[Dict[str, List[Any]]]:
+    """
+    Codifica una columna de texto como {"diccionario": [...], "indices": [...]}
+
+    Devuelve None si la columna no es de texto o tiene demasiados valores distintos
+    para que la codificación compense.
+    """
+    if not valores or not all(isinstance(valor, str) for valor in valores):
+        return None
+
+    posiciones: Dict[str, int] = {}
+    indices = []
+    for valor in valores:
+        indice = posiciones.setdefault(valor, len(posiciones))
+        if len(posiciones) > MAX_VALORES_DICCIONARIO:
+            return None
+        indices.append(indice)
+    if len(posiciones) * 2 > len(valores):
+        return None
+    return {'diccionario': list(posiciones), 'indices': indices}
+
+def convertir_a_json_columnar(conexion: sqlite3.Connection,
+                              diccionario: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Convierte los datos de la base de datos a JSON por columnas
+
+    Cada nombre de columna aparece una sola vez por tabla en lugar de una vez
+    por fila. Con diccionario, las columnas de texto de baja cardinalidad (como
+    categoria o pais) se guardan como {"diccionario": [valores distintos],
+    "indices": [posición de cada fila en el diccionario]}.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        diccionario (bool): Codificar con diccionario las columnas que lo admitan
+
+    Returns:
+        Dict[str, Dict[str, Any]]: {tabla: {columna: [valores...]}}, en formato
+        JSON-serializable (ver columnar_a_filas para volver al formato por filas)
+    """
+    resultado = {}
+    cursor = conexion.cursor()
+    for tabla in listar_tablas(conexion):
+        nombre = tabla.replace('"', '""')
+        cursor.execute(f'SELECT * FROM "{nombre}"')
+        columnar = filas.leer(cursor, 'columnas')
+
+        columnas = {}
+        for columna, valores in zip(columnar.columnas, columnar.datos):
+            valores = valores.tolist() if isinstance(valores, array) else valores
+            codificada = _codificar_diccionario(valores) if diccionario else None
+            columnas[columna] = valores if codificada is None else codificada
+        resultado[tabla] = columnas
+    return resultado
+
+def columnar_a_filas(datos: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Convierte el resultado de convertir_a_json_columnar al formato por filas
+
+    Args:
+        datos (Dict[str, Dict[str, Any]]): {tabla: {columna: [valores...]}}, con
+            o sin columnas codificadas con diccionario
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: El mismo resultado que convertir_a_json
+    """
+    resultado = {}
+    for tabla, columnas in datos.items():
+        valores = {}
+        for columna, contenido in columnas.items():
+            if isinstance(contenido, dict):
+                valores_distintos = contenido['diccionario']
+                contenido = [valores_distintos[indice] for indice in contenido['indices']]
+            valores[columna] = contenido
+        nombres = list(valores)
+        resultado[tabla] = [dict(zip(nombres, fila)) for fila in zip(*valores.values())]
+    return resultado
+
+def listar_tablas(conexion: sqlite3.Connection) -> List[str]:
+    """
+    Obtiene los nombres de las tablas de datos de la base de datos
+
+    Omite las de TABLAS_INTERNAS y las internas de SQLite (sqlite_*).
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+
+    Returns:
+        List[str]: Nombres de las tablas, en el orden de sqlite_master
+    """
+    cursor = conexion.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+    return [tabla[0] for tabla in cursor.fetchall()
+            if tabla[0] not in TABLAS_INTERNAS and not tabla[0].startswith('sqlite_')]
+
+def _sql_tabla(tabla: str, desde_id: Optional[int] = None) -> Tuple[str, Tuple]:
+    """Consulta (y parámetros) que lee una tabla entera o sus filas con id mayor que desde_id"""
+    sql = 'SELECT * FROM "{}"'.format(tabla.replace('"', '""'))
+    if desde_id is None:
+        return sql, ()
+    return sql + " WHERE id > ? ORDER BY id", (desde_id,)
+
+def iterar_filas_tabla(conexion: sqlite3.Connection, tabla: str,
+                       tamano_lote: int = TAMANO_LOTE_EXPORTACION,
+                       desde_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre las filas de una tabla como diccionarios, leyéndolas por lotes
+
+    Solo hay en memoria un lote de fetchmany a la vez, sea cual sea el tamaño de la tabla.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        tabla (str): Nombre de la tabla
+        tamano_lote (int): Filas por fetchmany
+        desde_id (Optional[int]): Leer solo las filas con id mayor, en orden de id
+
+    Returns:
+        Iterator[Dict[str, Any]]: Un diccionario {columna: valor} por fila
+    """
+    cursor = conexion.cursor()
+    cursor.execute(*_sql_tabla(tabla, desde_id))
+    columnas = [descripcion[0] for descripcion in cursor.description]
+    while True:
+        lote = cursor.fetchmany(tamano_lote)
+        if not lote:
+            break
+        for fila in lote:
+            yield dict(zip(columnas, fila))
+
+def exportar_json(conexion: sqlite3.Connection, destino: Union[str, TextIO],
+                  formato: str = 'ndjson', tablas: Optional[Iterable[str]] = None,
+                  tamano_lote: int = TAMANO_LOTE_EXPORTACION) -> Dict[str, int]:
+    """
+    Exporta las tablas a JSON escribiendo fila a fila, sin cargar la base de datos en memoria
+
+    Formatos:
+    - 'ndjson': una línea por fila, {"tabla": nombre, "fila": {columna: valor}}
+    - 'json': un objeto con un array por tabla, la misma estructura que
+      devuelve convertir_a_json
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        destino (Union[str, TextIO]): Ruta del archivo, o un archivo de texto ya
+            abierto (para un socket, socket.makefile('w', encoding='utf-8'))
+        formato (str): 'ndjson' o 'json'
+        tablas (Optional[Iterable[str]]): Tablas a exportar (todas por defecto)
+        tamano_lote (int): Filas leídas con fetchmany y escritas de cada vez
+
+    Returns:
+        Dict[str, int]: Filas exportadas de cada tabla
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato desconocido: {formato!r}; debe ser uno de {FORMATOS_EXPORTACION}")
+
+    if isinstance(destino, str):
+        with open(destino, 'w', encoding='utf-8') as archivo:
+            return exportar_json(conexion, archivo, formato, tablas, tamano_lote)
+
+    filas_exportadas = {}
+    tablas = listar_tablas(conexion) if tablas is None else list(tablas)
+    if formato == 'json':
+        destino.write('{')
+
+    for indice, tabla in enumerate(tablas):
+        if formato == 'ndjson':
+            prefijo = f'{{"tabla": {json.dumps(tabla, ensure_ascii=False)}, "fila": '
+            separador, sufijo = '', '}\n'
+        else:
+            destino.write(f'{", " if indice else ""}{json.dumps(tabla, ensure_ascii=False)}: [')
+            prefijo, separador, sufijo = '', ', ', ''
+
+        filas = 0
+        lineas = []
+        for fila in iterar_filas_tabla(conexion, tabla, tamano_lote):
+            lineas.append(prefijo + json.dumps(fila, ensure_ascii=False) + sufijo)
+            filas += 1
+            if len(lineas) >= tamano_lote:
+                # Cada lote va separado del anterior, salvo el primero de la tabla
+                destino.write((separador if filas > len(lineas) else '') + separador.join(lineas))
+                lineas.clear()
+        if lineas:
+            destino.write((separador if filas > len(lineas) else '') + separador.join(lineas))
+
+        if formato == 'json':
+            destino.write(']')
+        filas_exportadas[tabla] = filas
+
+    if formato == 'json':
+        destino.write('}\n')
+    destino.flush()
+    return filas_exportadas
+
+# Tablas combinadas de convertir_a_dataframes: (tabla izquierda, [(clave, tabla
+# derecha, {columna de la derecha: nombre en el resultado})]). Cada unión es un
+# merge con la derecha indexada por id, así que no se vuelve a leer la base de datos.
+COMBINACIONES = {
+    # - Ventas con información de productos
+    'ventas_productos': ('ventas', [
+        ('producto_id', 'productos', {'nombre': 'producto_nombre', 'categoria': 'categoria',
+                                      'precio_unitario': 'precio_unitario'}),
+    ]),
+    # - Ventas con información de vendedores
+    'ventas_vendedores': ('ventas', [
+        ('vendedor_id', 'vendedores', {'nombre': 'vendedor_nombre'}),
+    ]),
+    # - Vendedores con regiones
+    'vendedores_regiones': ('vendedores', [
+        ('region_id', 'regiones', {'nombre': 'region_nombre', 'pais': 'pais'}),
+    ]),
+    # - Consulta completa con todas las relaciones
+    'ventas_completas': ('ventas', [
+        ('producto_id', 'productos', {'nombre': 'producto_nombre', 'categoria': 'categoria',
+                                      'precio_unitario': 'precio_unitario'}),
+        ('vendedor_id', 'vendedores', {'nombre': 'vendedor_nombre', 'region_id': '_region_id'}),
+        ('_region_id', 'regiones', {'nombre': 'region_nombre', 'pais': 'pais'}),
+    ]),
+}
+
+# Valor guardado para las tablas combinadas que todavía no se han construido
+_PENDIENTE = object()
+
+class DataFramesVentas(dict):
+    """
+    Diccionario de DataFrames cuyas tablas combinadas se construyen al usarlas
+
+    Las tablas base se leen una vez al crearlo. Las combinadas (COMBINACIONES)
+    aparecen como claves desde el principio, pero solo se calculan, con merges
+    de pandas sobre las tablas base, la primera vez que se accede a ellas.
+    """
+
+    def __init__(self, tablas: Dict[str, pd.DataFrame],
+                 combinaciones: Dict[str, Tuple[str, List[Tuple[str, str, Dict[str, str]]]]] = COMBINACIONES):
+        super().__init__(tablas)
+        self._combinaciones = dict(combinaciones)
+        self._por_id: Dict[str, pd.DataFrame] = {}
+        for nombre in self._combinaciones:
+            super().__setitem__(nombre, _PENDIENTE)
+
+    def _indexada(self, tabla: str) -> pd.DataFrame:
+        """Tabla base indexada por id (se calcula una vez por tabla)"""
+        if tabla not in self._por_id:
+            self._por_id[tabla] = self[tabla].set_index('id')
+        return self._por_id[tabla]
+
+    def _combinar(self, nombre: str) -> pd.DataFrame:
+        izquierda, uniones = self._combinaciones[nombre]
+        resultado = self[izquierda]
+        for clave, derecha, columnas in uniones:
+            anadidas = self._indexada(derecha)[list(columnas)].rename(columns=columnas)
+            resultado = resultado.merge(anadidas, how='inner', left_on=clave, right_index=True)
+        auxiliares = [columna for columna in resultado.columns if columna.startswith('_')]
+        return resultado.drop(columns=auxiliares).reset_index(drop=True)
+
+    def construidas(self) -> List[str]:
+        """Nombres de las tablas combinadas que ya se han calculado"""
+        return [nombre for nombre in self._combinaciones
+                if dict.get(self, nombre, _PENDIENTE) is not _PENDIENTE]
+
+    def __getitem__(self, nombre: str) -> pd.DataFrame:
+        valor = super().__getitem__(nombre)
+        if valor is _PENDIENTE:
+            valor = self._combinar(nombre)
+            super().__setitem__(nombre, valor)
+        return valor
+
+    def __iter__(self):
+        # Redefinirlo evita que dict(...) copie directamente los valores pendientes
+        return super().__iter__()
+
+    def get(self, nombre, defecto=None):
+        return self[nombre] if nombre in self else defecto
+
+    def items(self):
+        return [(nombre, self[nombre]) for nombre in self]
+
+    def values(self):
+        return [self[nombre] for nombre in self]
+
+    def pop(self, nombre, *defecto):
+        if nombre in self:
+            valor = self[nombre]
+            super().pop(nombre)
+            return valor
+        return super().pop(nombre, *defecto)
+
+    def copy(self) -> Dict[str, pd.DataFrame]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return repr({nombre: (valor if valor is not _PENDIENTE else '<pendiente>')
+                     for nombre, valor in super().items()})
+
+def _ampliar(destino: np.ndarray, minimo: int) -> np.ndarray:
+    """Devuelve un array con al menos minimo posiciones y el contenido de destino"""
+    nuevo = np.empty(max(minimo, 2 * len(destino)), dtype=destino.dtype)
+    nuevo[:len(destino)] = destino
+    return nuevo
+
+def _asignar(destino: np.ndarray, inicio: int, valores: np.ndarray) -> np.ndarray:
+    """
+    Copia valores en destino[inicio:]; si no caben en el tipo de destino, lo amplía
+    (a int64 si se salen de rango, a float64 si hay NULL en una columna entera)
+    """
+    if destino.dtype.kind in 'iu' and len(valores):
+        if valores.dtype.kind == 'f':
+            destino = destino.astype('float64')
+        elif valores.dtype.kind in 'iu':
+            limites = np.iinfo(destino.dtype)
+            if valores.min() < limites.min or valores.max() > limites.max:
+                destino = destino.astype('int64')
+    destino[inicio:inicio + len(valores)] = valores
+    return destino
+
+def _codigos_categoria(serie: pd.Series, posiciones: Dict[Any, int]) -> np.ndarray:
+    """Códigos de una columna de categoría, añadiendo a posiciones los valores nuevos"""
+    for valor in serie.dropna().unique():
+        posiciones.setdefault(valor, len(posiciones))
+    return serie.map(posiciones).fillna(-1).to_numpy(dtype='int32')
+
+def leer_tabla_tipada(conexion: sqlite3.Connection, tabla: str,
+                      tipos: Optional[Dict[str, str]] = None,
+                      chunksize: int = TAMANO_CHUNK,
+                      desde_id: Optional[int] = None) -> pd.DataFrame:
+    """
+    Lee una tabla a un DataFrame con los tipos de TIPOS_COLUMNAS, por lotes
+
+    Cada columna con tipo se guarda en un array reservado con el número de filas
+    de la tabla, que se rellena lote a lote: nunca hay en memoria más de un lote
+    con los tipos genéricos de pandas. Las columnas 'category' se guardan como
+    códigos int32 y se convierten a Categorical al final.
+
+    Si un valor no cabe en el tipo indicado (un entero fuera de rango o un NULL
+    en una columna entera) la columna se amplía en lugar de truncarlo.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        tabla (str): Nombre de la tabla
+        tipos (Optional[Dict[str, str]]): Tipo de cada columna
+            (TIPOS_COLUMNAS[tabla] por defecto)
+        chunksize (int): Filas por lote de pd.read_sql_query
+        desde_id (Optional[int]): Leer solo las filas con id mayor, en orden de id
+
+    Returns:
+        pd.DataFrame: La tabla con las columnas en el orden de la base de datos
+    """
+    tipos = TIPOS_COLUMNAS.get(tabla, {}) if tipos is None else tipos
+    sql, parametros = _sql_tabla(tabla, desde_id)
+    total = conexion.execute(f"SELECT COUNT(*) FROM ({sql})", parametros).fetchone()[0]
+
+    orden: List[str] = []
+    arrays: Dict[str, np.ndarray] = {}
+    categorias: Dict[str, Dict[Any, int]] = {}
+    sin_tipo: Dict[str, List[pd.Series]] = {}
+    inicio = 0
+    for lote in pd.read_sql_query(sql, conexion, params=parametros, chunksize=chunksize):
+        if not orden:
+            orden = list(lote.columns)
+            for columna in orden:
+                tipo = tipos.get(columna)
+                if tipo is None:
+                    sin_tipo[columna] = []
+                elif tipo == 'category':
+                    categorias[columna] = {}
+                    arrays[columna] = np.empty(total, dtype='int32')
+                else:
+                    arrays[columna] = np.empty(total, dtype=tipo)
+
+        for columna in orden:
+            tipo = tipos.get(columna)
+            if tipo is None:
+                sin_tipo[columna].append(lote[columna])
+                continue
+            if tipo == 'category':
+                valores = _codigos_categoria(lote[columna], categorias[columna])
+            elif tipo.startswith('datetime64'):
+                valores = pd.to_datetime(lote[columna], format='ISO8601').to_numpy(dtype=tipo)
+            else:
+                valores = lote[columna].to_numpy()
+            # La tabla puede haber crecido desde el COUNT(*)
+            if inicio + len(valores) > len(arrays[columna]):
+                arrays[columna] = _ampliar(arrays[columna], inicio + len(valores))
+            arrays[columna] = _asignar(arrays[columna], inicio, valores)
+        inicio += len(lote)
+
+    if not orden:
+        vacia = pd.read_sql_query(sql + " LIMIT 0", conexion, params=parametros)
+        return vacia.astype({columna: tipo for columna, tipo in tipos.items() if columna in vacia})
+
+    datos = {}
+    for columna in orden:
+        if columna in sin_tipo:
+            datos[columna] = pd.concat(sin_tipo[columna], ignore_index=True)
+            continue
+        valores = arrays[columna]
+        valores = valores[:inicio].copy() if len(valores) > inicio else valores
+        if columna in categorias:
+            valores = pd.Categorical.from_codes(valores, categories=list(categorias[columna]))
+        datos[columna] = valores
+    return pd.DataFrame(datos)
+
+def memoria_dataframes(dataframes: Dict[str, pd.DataFrame]) -> Dict[str, int]:
+    """
+    Bytes que ocupa cada DataFrame, contando el contenido de las cadenas
+
+    Args:
+        dataframes (Dict[str, pd.DataFrame]): DataFrames por nombre (las tablas
+            combinadas pendientes de un DataFramesVentas se calculan)
+
+    Returns:
+        Dict[str, int]: Bytes de cada DataFrame
+    """
+    return {nombre: int(df.memory_usage(deep=True).sum()) for nombre, df in dataframes.items()}
+
+def informe_memoria(sin_tipos: Dict[str, pd.DataFrame],
+                    con_tipos: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, float]]:
+    """
+    Compara la memoria de los DataFrames cargados sin tipos y con tipos
+
+    Args:
+        sin_tipos (Dict[str, pd.DataFrame]): convertir_a_dataframes(conexion)
+        con_tipos (Dict[str, pd.DataFrame]): convertir_a_dataframes(conexion, tipado=True)
+
+    Returns:
+        Dict[str, Dict[str, float]]: Por DataFrame, bytes sin tipos, bytes con
+        tipos, bytes ahorrados y porcentaje ahorrado
+    """
+    antes = memoria_dataframes(sin_tipos)
+    despues = memoria_dataframes(con_tipos)
+    informe = {}
+    for nombre in antes:
+        ahorro = antes[nombre] - despues[nombre]
+        informe[nombre] = {
+            'bytes_sin_tipos': antes[nombre],
+            'bytes_con_tipos': despues[nombre],
+            'bytes_ahorrados': ahorro,
+            'porcentaje_ahorrado': 100 * ahorro / antes[nombre] if antes[nombre] else 0.0,
+        }
+    return informe
+
+def convertir_a_dataframes(conexion: sqlite3.Connection, tipado: bool = False,
+                           chunksize: int = TAMANO_CHUNK) -> Dict[str, pd.DataFrame]:
     """
     Extrae los datos de la base de datos a DataFrames de pandas
 
+    Cada tabla se lee una sola vez; las consultas combinadas (ver COMBINACIONES)
+    se obtienen con merges de pandas sobre esas tablas cuando se accede a ellas.
+
     Args:
         conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        tipado (bool): Leer las tablas con los tipos de TIPOS_COLUMNAS y por
+            lotes (ver leer_tabla_tipada) en lugar de con los tipos de pandas
+        chunksize (int): Filas por lote cuando tipado es True
 
     Returns:
         Dict[str, pd.DataFrame]: Diccionario con DataFrames para cada tabla y para
-        consultas combinadas relevantes
+        consultas combinadas relevantes (un DataFramesVentas)
     """
     # Implementa aquí la extracción de datos a DataFrames:
     # 1. Crea un diccionario vacío para los DataFrames
     # 2. Obtén la lista de tablas de la base de datos
     # 3. Para cada tabla, crea un DataFrame usando pd.read_sql_query
-    # 4. Añade consultas JOIN para relaciones importantes:
+    # 4. Añade las relaciones importantes (COMBINACIONES), calculadas al usarlas:
     #    - Ventas con información de productos
     #    - Ventas con información de vendedores
     #    - Vendedores con regiones
@@ -100,55 +850,488 @@ def convertir_a_dataframes(conexion: sqlite3.Connection) -> Dict[str, pd.DataFra
     dataframes = {}
 
     # 2. Obtén la lista de tablas de la base de datos
-    cursor = conexion.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tablas = [tabla[0] for tabla in cursor.fetchall()]
+    tablas = listar_tablas(conexion)
 
     # 3. Para cada tabla, crea un DataFrame usando pd.read_sql_query
     for tabla in tablas:
-        dataframes[tabla] = pd.read_sql_query(f"SELECT * FROM {tabla}", conexion)
+        if tipado:
+            dataframes[tabla] = leer_tabla_tipada(conexion, tabla, chunksize=chunksize)
+        else:
+            dataframes[tabla] = pd.read_sql_query(f"SELECT * FROM {tabla}", conexion)
 
-    # 4. Añade consultas JOIN para relaciones importantes:
-    # - Ventas con información de productos
-    dataframes['ventas_productos'] = pd.read_sql_query("""
-        SELECT v.*, p.nombre as producto_nombre, p.categoria, p.precio_unitario
-        FROM ventas v
-        JOIN productos p ON v.producto_id = p.id
-    """, conexion)
+    # 4 y 5. Retorna el diccionario con las tablas y las combinaciones pendientes
+    return DataFramesVentas(dataframes)
 
-    # - Ventas con información de vendedores
-    dataframes['ventas_vendedores'] = pd.read_sql_query("""
-        SELECT v.*, vd.nombre as vendedor_nombre
-        FROM ventas v
-        JOIN vendedores vd ON v.vendedor_id = vd.id
-    """, conexion)
+def clave_cache_dataframes(conexion: sqlite3.Connection, tipado: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Calcula la clave con la que se guardan en caché los DataFrames de una base de datos
 
-    # - Vendedores con regiones
-    dataframes['vendedores_regiones'] = pd.read_sql_query("""
-        SELECT v.*, r.nombre as region_nombre, r.pais
-        FROM vendedores v
-        JOIN regiones r ON v.region_id = r.id
-    """, conexion)
+    La clave cambia si cambian la fecha de modificación o el tamaño del archivo
+    (o de su -wal, donde quedan los commits en modo WAL). No incluye PRAGMA
+    data_version, que solo se puede comparar dentro de una misma conexión: con
+    él, una caché escrita desde otra conexión nunca coincidiría (ver
+    convertir_a_dataframes_cacheado).
 
-    # - Consulta completa con todas las relaciones
-    dataframes['ventas_completas'] = pd.read_sql_query("""
-        SELECT 
-            v.*,
-            p.nombre as producto_nombre,
-            p.categoria,
-            p.precio_unitario,
-            vd.nombre as vendedor_nombre,
-            r.nombre as region_nombre,
-            r.pais
-        FROM ventas v
-        JOIN productos p ON v.producto_id = p.id
-        JOIN vendedores vd ON v.vendedor_id = vd.id
-        JOIN regiones r ON vd.region_id = r.id
-    """, conexion)
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        tipado (bool): Si los DataFrames se cargan con TIPOS_COLUMNAS
 
-    # 5. Retorna el diccionario con todos los DataFrames
+    Returns:
+        Optional[Dict[str, Any]]: La clave, o None si la base de datos no está
+        en un archivo (por ejemplo ':memory:')
+    """
+    ruta = next((fila[2] for fila in conexion.execute("PRAGMA database_list") if fila[1] == 'main'), '')
+    if not ruta:
+        return None
+
+    archivos = []
+    for sufijo in ('', '-wal'):
+        if os.path.exists(ruta + sufijo):
+            estado = os.stat(ruta + sufijo)
+            archivos.append([sufijo, estado.st_mtime_ns, estado.st_size])
+    return {
+        'version': _VERSION_CACHE_DATAFRAMES,
+        'ruta': os.path.abspath(ruta),
+        'archivos': archivos,
+        'tipado': tipado,
+    }
+
+def _directorio_cache(clave: Dict[str, Any], directorio: str) -> Tuple[str, str]:
+    """Prefijo de la base de datos (y modo de carga) y directorio de la caché para una clave"""
+    prefijo = hashlib.sha256(f"{clave['ruta']}:{clave['tipado']}".encode()).hexdigest()[:16]
+    version = hashlib.sha256(json.dumps(clave, sort_keys=True).encode()).hexdigest()[:32]
+    return prefijo, os.path.join(directorio, f"{prefijo}-{version}")
+
+def guardar_cache_dataframes(tablas: Dict[str, pd.DataFrame], clave: Dict[str, Any],
+                             directorio: Optional[str] = None) -> Optional[str]:
+    """
+    Guarda DataFrames en la caché como un archivo .npy por columna
+
+    Las columnas numéricas y de fechas se guardan tal cual; las de categoría y
+    las de texto, como códigos enteros más la lista de valores distintos (en el
+    manifiesto), de modo que todas se pueden leer con memoria mapeada. Los
+    valores bytes (BLOB) se guardan en base64. Las cachés anteriores de la misma
+    base de datos y modo de carga se borran.
+
+    Args:
+        tablas (Dict[str, pd.DataFrame]): DataFrames de las tablas base
+        clave (Dict[str, Any]): Resultado de clave_cache_dataframes
+        directorio (Optional[str]): Directorio de la caché (CACHE_DATAFRAMES_DIR por defecto)
+
+    Returns:
+        Optional[str]: Directorio con la caché guardada, o None si alguna
+        columna tiene valores que no se pueden guardar en el manifiesto
+    """
+    directorio = directorio or CACHE_DATAFRAMES_DIR
+    prefijo, destino = _directorio_cache(clave, directorio)
+    os.makedirs(directorio, exist_ok=True)
+
+    # Se escribe en un temporal y se renombra: nunca queda una caché a medias
+    temporal = tempfile.mkdtemp(dir=directorio)
+    try:
+        manifiesto: Dict[str, Any] = {'clave': clave, 'tablas': {}}
+        for i, (tabla, df) in enumerate(tablas.items()):
+            columnas = []
+            for j, columna in enumerate(df.columns):
+                serie = df[columna]
+                archivo = f"{i}_{j}.npy"
+                descripcion = {'nombre': columna, 'archivo': archivo, 'dtype': str(serie.dtype)}
+                if isinstance(serie.dtype, pd.CategoricalDtype):
+                    codigos = serie.cat.codes.to_numpy()
+                    descripcion.update(tipo='categoria', valores=serie.cat.categories.tolist())
+                elif serie.dtype.kind in 'biufmM':
+                    codigos = serie.to_numpy()
+                    descripcion['tipo'] = 'numpy'
+                else:
+                    codigos, valores = pd.factorize(serie)
+                    codigos = codigos.astype('int32')
+                    # JSON no admite bytes (columnas BLOB): van en base64 y se anotan sus posiciones
+                    binarios = [k for k, valor in enumerate(valores) if isinstance(valor, bytes)]
+                    valores = [base64.b64encode(valor).decode('ascii') if isinstance(valor, bytes) else valor
+                               for valor in valores]
+                    descripcion.update(tipo='texto', valores=valores, binarios=binarios)
+                np.save(os.path.join(temporal, archivo), np.ascontiguousarray(codigos))
+                columnas.append(descripcion)
+            manifiesto['tablas'][tabla] = columnas
+
+        try:
+            contenido = json.dumps(manifiesto, ensure_ascii=False)
+        except TypeError:
+            # Otros objetos que JSON no representa (Decimal, datetime...): no se cachea
+            return None
+        with open(os.path.join(temporal, 'manifiesto.json'), 'w', encoding='utf-8') as archivo:
+            archivo.write(contenido)
+
+        if os.path.exists(destino):
+            shutil.rmtree(destino)
+        os.replace(temporal, destino)
+    finally:
+        if os.path.exists(temporal):
+            shutil.rmtree(temporal)
+
+    for nombre in os.listdir(directorio):
+        ruta = os.path.join(directorio, nombre)
+        if nombre.startswith(prefijo + '-') and ruta != destino:
+            shutil.rmtree(ruta, ignore_errors=True)
+    return destino
+
+def cargar_cache_dataframes(clave: Dict[str, Any],
+                            directorio: Optional[str] = None) -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    Carga los DataFrames guardados en la caché para una clave
+
+    Los .npy se abren con memoria mapeada (mmap_mode='c'): solo se leen del
+    disco las páginas que se usan y las escrituras no llegan al archivo.
+
+    Args:
+        clave (Dict[str, Any]): Resultado de clave_cache_dataframes
+        directorio (Optional[str]): Directorio de la caché (CACHE_DATAFRAMES_DIR por defecto)
+
+    Returns:
+        Optional[Dict[str, pd.DataFrame]]: Los DataFrames de las tablas base, o
+        None si no hay caché válida para la clave
+    """
+    _, origen = _directorio_cache(clave, directorio or CACHE_DATAFRAMES_DIR)
+    try:
+        with open(os.path.join(origen, 'manifiesto.json'), encoding='utf-8') as archivo:
+            manifiesto = json.load(archivo)
+    except (OSError, ValueError):
+        return None
+    if manifiesto.get('clave') != clave:
+        return None
+
+    tablas = {}
+    for tabla, columnas in manifiesto['tablas'].items():
+        datos = {}
+        for descripcion in columnas:
+            # np.asarray da una vista ndarray del mapa: sigue sin copiar los datos
+            valores = np.asarray(np.load(os.path.join(origen, descripcion['archivo']), mmap_mode='c'))
+            if descripcion['tipo'] == 'categoria':
+                valores = pd.Categorical.from_codes(valores, categories=descripcion['valores'])
+            elif descripcion['tipo'] == 'texto':
+                # El código -1 (NULL) toma el último elemento: None
+                distintos = np.array(descripcion['valores'] + [None], dtype=object)
+                for k in descripcion.get('binarios', ()):
+                    distintos[k] = base64.b64decode(distintos[k])
+                valores = pd.Series(distintos[valores], dtype=descripcion['dtype'])
+            datos[descripcion['nombre']] = valores
+        tablas[tabla] = pd.DataFrame(datos, copy=False)
+    return tablas
+
+def convertir_a_dataframes_cacheado(conexion: sqlite3.Connection, tipado: bool = False,
+                                    directorio: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """
+    convertir_a_dataframes con caché en disco de las tablas base
+
+    Si la base de datos no ha cambiado desde la última extracción (ver
+    clave_cache_dataframes), las tablas se cargan de la caché sin consultar
+    SQLite; si no, se extraen y se guardan. Con una transacción abierta no se
+    usa la caché, porque la clave no refleja las escrituras sin confirmar de la
+    propia conexión. Las tablas combinadas se calculan igual que en
+    convertir_a_dataframes, al usarlas.
+
+    Además, para cada conexión se recuerdan PRAGMA data_version y total_changes
+    junto con la última clave: si han cambiado pero la clave es la misma (un
+    commit que no movió la fecha de modificación ni el tamaño), la caché no se
+    usa y se vuelve a extraer.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        tipado (bool): Cargar las tablas con TIPOS_COLUMNAS
+        directorio (Optional[str]): Directorio de la caché (CACHE_DATAFRAMES_DIR por defecto)
+
+    Returns:
+        Dict[str, pd.DataFrame]: El mismo resultado que convertir_a_dataframes
+    """
+    clave = None if conexion.in_transaction else clave_cache_dataframes(conexion, tipado)
+    if clave is None:
+        return convertir_a_dataframes(conexion, tipado)
+
+    estado = (conexion.execute("PRAGMA data_version").fetchone()[0], conexion.total_changes)
+    anterior = _estados_cache_dataframes.pop((id(conexion), tipado), None)
+    _estados_cache_dataframes[(id(conexion), tipado)] = (estado, clave)
+    while len(_estados_cache_dataframes) > MAX_ESTADOS_CACHE_DATAFRAMES:
+        del _estados_cache_dataframes[next(iter(_estados_cache_dataframes))]
+
+    if anterior is None or anterior[0] == estado or anterior[1] != clave:
+        tablas = cargar_cache_dataframes(clave, directorio)
+        if tablas is not None:
+            return DataFramesVentas(tablas)
+
+    dataframes = convertir_a_dataframes(conexion, tipado)
+    guardar_cache_dataframes({tabla: dataframes[tabla] for tabla in listar_tablas(conexion)},
+                             clave, directorio)
     return dataframes
 
+@contextmanager
+def _savepoint(conexion: sqlite3.Connection, nombre: str) -> Iterator[sqlite3.Connection]:
+    """
+    Agrupa sentencias en un SAVEPOINT
+
+    Sin transacción abierta, el SAVEPOINT la abre y se confirma al salir; dentro
+    de una transacción del llamante solo se anida, y el commit sigue siendo suyo.
+    Con una excepción se deshacen únicamente los cambios del bloque.
+    """
+    conexion.execute(f"SAVEPOINT {nombre}")
+    try:
+        yield conexion
+    except BaseException:
+        conexion.execute(f"ROLLBACK TO SAVEPOINT {nombre}")
+        conexion.execute(f"RELEASE SAVEPOINT {nombre}")
+        raise
+    else:
+        conexion.execute(f"RELEASE SAVEPOINT {nombre}")
+
+def instalar_registro_cambios(conexion: sqlite3.Connection) -> None:
+    """
+    Crea la tabla REGISTRO_CAMBIOS y los triggers que la mantienen (si no existen)
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+    """
+    with _savepoint(conexion, 'instalar_registro_cambios'):
+        for sql in SQL_REGISTRO_CAMBIOS.values():
+            conexion.execute(sql)
+
+def _concatenar(actual: pd.DataFrame, nuevas: pd.DataFrame) -> pd.DataFrame:
+    """Añade filas a un DataFrame conservando las columnas de categoría"""
+    if nuevas.empty:
+        return actual
+    datos = {}
+    for columna in actual.columns:
+        if isinstance(actual[columna].dtype, pd.CategoricalDtype):
+            datos[columna] = pd.api.types.union_categoricals(
+                [actual[columna], nuevas[columna]], ignore_order=True)
+        else:
+            datos[columna] = pd.concat([actual[columna], nuevas[columna]], ignore_index=True)
+    return pd.DataFrame(datos)
+
+class ExtractorIncremental:
+    """
+    Extracción de las tablas que, tras la primera, solo lee las ventas nuevas
+
+    Guarda una marca de agua (el mayor ventas.id leído) y en cada actualizar()
+    añade solo las ventas con id mayor. Si desde la última extracción hay
+    entradas nuevas en REGISTRO_CAMBIOS (ventas modificadas, borradas o dadas de
+    alta con un id antiguo), vuelve a leer todo y borra del registro las
+    entradas ya consumidas. Las demás tablas son pequeñas y se leen enteras cada vez.
+
+    Uso:
+        extractor = ExtractorIncremental(conexion)
+        extractor.actualizar()                  # primera vez: extracción completa
+        dataframes = extractor.resultado()
+        ...
+        extractor.actualizar()                  # solo las ventas nuevas
+    """
+
+    def __init__(self, conexion: sqlite3.Connection, formato: str = 'dataframes',
+                 tipado: bool = False, instalar: bool = True):
+        """
+        Args:
+            conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+            formato (str): 'dataframes' (como convertir_a_dataframes) o 'json'
+                (como convertir_a_json)
+            tipado (bool): Con 'dataframes', cargar las tablas con TIPOS_COLUMNAS
+            instalar (bool): Crear el registro de cambios si no existe
+        """
+        if formato not in FORMATOS_INCREMENTALES:
+            raise ValueError(f"Formato desconocido: {formato!r}; debe ser uno de {FORMATOS_INCREMENTALES}")
+        self.conexion = conexion
+        self.formato = formato
+        self.tipado = tipado
+        self.ultimo_id = 0
+        self.ultimo_cambio: Optional[int] = None
+        self.tablas: Optional[Dict[str, Any]] = None
+        if instalar:
+            instalar_registro_cambios(conexion)
+
+    def _leer(self, tabla: str, desde_id: Optional[int] = None) -> Any:
+        if self.formato == 'json':
+            return list(iterar_filas_tabla(self.conexion, tabla, desde_id=desde_id))
+        if self.tipado:
+            return leer_tabla_tipada(self.conexion, tabla, desde_id=desde_id)
+        sql, parametros = _sql_tabla(tabla, desde_id)
+        return pd.read_sql_query(sql, self.conexion, params=parametros)
+
+    def actualizar(self) -> Dict[str, Any]:
+        """
+        Lee los datos nuevos desde la última llamada
+
+        Todo se lee en una transacción, así que la marca de agua, el registro de
+        cambios y las filas corresponden al mismo estado de la base de datos.
+
+        Returns:
+            Dict[str, Any]: 'modo' ('completo' o 'incremental'), 'filas_nuevas'
+            de ventas y 'ultimo_id' (la nueva marca de agua)
+        """
+        propia = not self.conexion.in_transaction
+        if propia:
+            self.conexion.execute("BEGIN")
+        try:
+            ultimo_cambio = self.conexion.execute(
+                f"SELECT COALESCE(MAX(id), 0) FROM {REGISTRO_CAMBIOS}").fetchone()[0]
+            ultimo_id = self.conexion.execute("SELECT COALESCE(MAX(id), 0) FROM ventas").fetchone()[0]
+            completo = self.tablas is None or ultimo_cambio != self.ultimo_cambio
+
+            tablas = {}
+            for tabla in listar_tablas(self.conexion):
+                if tabla == 'ventas' and not completo:
+                    nuevas = self._leer(tabla, self.ultimo_id)
+                    filas_nuevas = len(nuevas)
+                    actual = self.tablas[tabla]
+                    tablas[tabla] = actual + nuevas if self.formato == 'json' else _concatenar(actual, nuevas)
+                else:
+                    tablas[tabla] = self._leer(tabla)
+            if completo:
+                filas_nuevas = len(tablas.get('ventas', ()))
+                # Se conserva la última entrada: sin AUTOINCREMENT, los ids nuevos
+                # siguen al máximo, que así nunca baja de ultimo_cambio
+                self.conexion.execute(f"DELETE FROM {REGISTRO_CAMBIOS} WHERE id < ?", (ultimo_cambio,))
+        except BaseException:
+            if propia:
+                self.conexion.rollback()
+            raise
+        else:
+            if propia:
+                self.conexion.commit()
+
+        self.tablas = tablas
+        self.ultimo_id = ultimo_id
+        self.ultimo_cambio = ultimo_cambio
+        return {'modo': 'completo' if completo else 'incremental',
+                'filas_nuevas': filas_nuevas, 'ultimo_id': ultimo_id}
+
+    def resultado(self) -> Dict[str, Any]:
+        """
+        Devuelve los datos de la última actualizar()
+
+        Returns:
+            Dict[str, Any]: Un DataFramesVentas con formato 'dataframes', o el
+            diccionario de convertir_a_json con formato 'json'
+        """
+        if self.tablas is None:
+            self.actualizar()
+        if self.formato == 'json':
+            return dict(self.tablas)
+        return DataFramesVentas(self.tablas)
+
+def instalar_resumenes(conexion: sqlite3.Connection) -> None:
+    """
+    Crea resumen_ventas y los triggers que lo mantienen, y lo calcula a partir de ventas
+
+    Se puede llamar sobre una base de datos que ya los tenga: solo recalcula el resumen.
+    Todo ocurre en una transacción: si el cálculo falla, no queda nada instalado.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+    """
+    with _savepoint(conexion, 'instalar_resumenes'):
+        conexion.execute(SQL_RESUMEN_VENTAS)
+        conexion.execute(SQL_RESUMEN_PENDIENTES)
+        conexion.execute(SQL_RESUMEN_ESTADO)
+        conexion.execute("INSERT OR IGNORE INTO resumen_ventas_estado (id, desactualizado) VALUES (1, 0)")
+        for sql in SQL_TRIGGERS_RESUMEN.values():
+            conexion.execute(sql)
+        _ejecutar_sentencias(conexion, SQL_RECONSTRUIR_RESUMEN)
+
+def _ejecutar_sentencias(conexion: sqlite3.Connection, script: str) -> None:
+    """Ejecuta las sentencias de script (separadas por ';') sin hacer commit"""
+    for sentencia in script.split(';'):
+        if sentencia.strip():
+            conexion.execute(sentencia)
+
+def reconstruir_resumenes(conexion: sqlite3.Connection) -> None:
+    """
+    Recalcula resumen_ventas entero a partir de ventas
+
+    Se confirma al terminar, salvo que la conexión ya tuviera una transacción
+    abierta: entonces forma parte de ella.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+    """
+    with _savepoint(conexion, 'reconstruir_resumenes'):
+        _ejecutar_sentencias(conexion, SQL_RECONSTRUIR_RESUMEN)
+
+def actualizar_resumenes(conexion: sqlite3.Connection) -> bool:
+    """
+    Pone al día resumen_ventas si los triggers lo han dejado pendiente
+
+    Lo recalcula entero si ha cambiado alguna dimensión, o vuelve a sumar las
+    ventas de resumen_ventas_pendientes; si no hay nada pendiente no escribe.
+    Como reconstruir_resumenes, respeta la transacción abierta del llamante.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+
+    Returns:
+        bool: Si había algo pendiente
+    """
+    with _savepoint(conexion, 'actualizar_resumenes'):
+        desactualizado, pendientes = conexion.execute(
+            "SELECT (SELECT desactualizado FROM resumen_ventas_estado), "
+            "EXISTS (SELECT 1 FROM resumen_ventas_pendientes)").fetchone()
+        if desactualizado:
+            _ejecutar_sentencias(conexion, SQL_RECONSTRUIR_RESUMEN)
+        elif pendientes:
+            _ejecutar_sentencias(conexion, SQL_APLICAR_PENDIENTES)
+    return bool(desactualizado or pendientes)
+
+def consultar_resumen(conexion: sqlite3.Connection, por: Iterable[str] = ('region',),
+                      desde_mes: Optional[str] = None, hasta_mes: Optional[str] = None,
+                      actualizar: bool = False) -> pd.DataFrame:
+    """
+    Ingresos, unidades y número de ventas agrupados, leídos de resumen_ventas
+
+    El coste depende del número de grupos del resumen, no del número de ventas.
+    El resultado coincide con agrupar ventas_completas (con ingresos =
+    cantidad * precio_unitario). Necesita instalar_resumenes.
+
+    Solo lee: lo que los triggers hayan dejado pendiente se calcula en la propia
+    consulta (SQL_RESUMEN_AL_DIA), sin tocar la transacción del llamante. Con
+    actualizar=True se llama antes a actualizar_resumenes, que sí escribe.
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a la base de datos SQLite
+        por (Iterable[str]): Dimensiones de DIMENSIONES_RESUMEN ('region',
+            'vendedor', 'categoria', 'mes'); vacío para el total
+        desde_mes (Optional[str]): Primer mes incluido, 'AAAA-MM'
+        hasta_mes (Optional[str]): Último mes incluido, 'AAAA-MM'
+        actualizar (bool): Guardar antes en resumen_ventas lo pendiente
+
+    Returns:
+        pd.DataFrame: Una fila por grupo, ordenada por las dimensiones, con
+        sus columnas y ingresos, unidades y ventas
+    """
+    por = list(por)
+    desconocidas = [dimension for dimension in por if dimension not in DIMENSIONES_RESUMEN]
+    if desconocidas:
+        raise ValueError(f"Dimensiones desconocidas: {desconocidas}; deben ser de {list(DIMENSIONES_RESUMEN)}")
+    if actualizar:
+        actualizar_resumenes(conexion)
+
+    agrupar = [columna for dimension in por for columna in DIMENSIONES_RESUMEN[dimension][0]]
+    columnas = [columna for dimension in por for columna in DIMENSIONES_RESUMEN[dimension][1]]
+    condiciones, parametros = [], []
+    if desde_mes is not None:
+        condiciones.append("rs.mes >= ?")
+        parametros.append(desde_mes)
+    if hasta_mes is not None:
+        condiciones.append("rs.mes <= ?")
+        parametros.append(hasta_mes)
+
+    sql = f"""
+        SELECT {"".join(columna + ", " for columna in columnas)}
+               SUM(rs.ingresos) AS ingresos, SUM(rs.unidades) AS unidades, SUM(rs.ventas) AS ventas
+        FROM ({SQL_RESUMEN_AL_DIA}) rs
+        JOIN regiones r ON rs.region_id = r.id
+        JOIN vendedores vd ON rs.vendedor_id = vd.id
+        {"WHERE " + " AND ".join(condiciones) if condiciones else ""}
+        {"GROUP BY " + ", ".join(agrupar) if agrupar else ""}
+        {"ORDER BY " + ", ".join(agrupar) if agrupar else ""}
+    """
+    return pd.read_sql_query(sql, conexion, params=parametros)
+
 if __name__ == "__main__":
     try:
         # Conectar a la base de datos existente
@@ -173,10 +1356,9 @@ if __name__ == "__main__":
             if datos_json[primera_tabla]:
                 print(f"Primer registro: {datos_json[primera_tabla][0]}")
 
-            # Opcional: guardar los datos en un archivo JSON
+            # Opcional: guardar los datos en un archivo JSON (en streaming, sin datos_json)
             # ruta_json = os.path.join(os.path.dirname(__file__), 'ventas_comerciales.json')
-            # with open(ruta_json, 'w', encoding='utf-8') as f:
-            #     json.dump(datos_json, f, ensure_ascii=False, indent=2)
+            # exportar_json(conexion, ruta_json, formato='json')
             # print(f"Datos guardados en {ruta_json}")
 
         # Conversión a DataFrames de pandas
@@ -6,9 +6,16 @@ y realiza operaciones de conversión de datos a JSON y pandas DataFrames.
 import pytest
 import sqlite3
 import os
+import io
 import json
+import shutil
+import tracemalloc
 import pandas as pd
-from ej3a3 import conectar_bd, convertir_a_json, convertir_a_dataframes
+import ej3a3
+from ej3a3 import (conectar_bd, convertir_a_json, convertir_a_dataframes, exportar_json,
+                   columnar_a_filas, leer_tabla_tipada, informe_memoria,
+                   convertir_a_dataframes_cacheado, ExtractorIncremental,
+                   instalar_resumenes, consultar_resumen, actualizar_resumenes)
 
 # Path to database file
 DB_PATH = os.path.join(os.path.dirname(__file__), 'ventas_comerciales.db')
@@ -313,3 +320,482 @@ def test_convertir_a_dataframes_data(conexion_bd):
         df_join = dataframes[df_join_name]
         # Un DataFrame con join debería tener más columnas que las tablas individuales
         assert len(df_join.columns) > len(dataframes["ventas"].columns), f"El DataFrame {df_join_name} no parece contener un join válido"
+
+def test_exportar_json_ndjson(conexion_bd, tmp_path):
+    """
+    Prueba la exportación en streaming a NDJSON
+    Verifica que cada línea es una fila y que el total coincide con convertir_a_json
+    """
+    ruta = tmp_path / 'ventas.ndjson'
+    filas = exportar_json(conexion_bd, str(ruta), tamano_lote=3)
+
+    reconstruido = {}
+    with open(ruta, encoding='utf-8') as archivo:
+        for linea in archivo:
+            registro = json.loads(linea)
+            reconstruido.setdefault(registro["tabla"], []).append(registro["fila"])
+
+    esperado = convertir_a_json(conexion_bd)
+    assert {tabla: len(registros) for tabla, registros in esperado.items()} == filas
+    assert reconstruido == {tabla: registros for tabla, registros in esperado.items() if registros}
+
+def test_exportar_json_arrays(conexion_bd):
+    """
+    Prueba la exportación en streaming a un objeto JSON con un array por tabla
+    Verifica que el resultado es el mismo que el de convertir_a_json, con lotes de
+    cualquier tamaño
+    """
+    esperado = convertir_a_json(conexion_bd)
+    for tamano_lote in (1, 2, 4, 1000):
+        destino = io.StringIO()
+        exportar_json(conexion_bd, destino, formato='json', tamano_lote=tamano_lote)
+        assert json.loads(destino.getvalue()) == esperado
+
+    destino = io.StringIO()
+    assert exportar_json(conexion_bd, destino, formato='json', tablas=['regiones']) == {
+        'regiones': len(esperado['regiones'])}
+    assert list(json.loads(destino.getvalue())) == ['regiones']
+
+    with pytest.raises(ValueError):
+        exportar_json(conexion_bd, io.StringIO(), formato='csv')
+
+def test_exportar_json_memoria_constante(tmp_path):
+    """
+    Prueba que la memoria de la exportación no crece con el tamaño de la tabla
+    """
+    def pico_memoria(filas):
+        conn = sqlite3.connect(str(tmp_path / f'ventas_{filas}.db'))
+        conn.execute("CREATE TABLE ventas (id INTEGER PRIMARY KEY, fecha TEXT, cantidad INTEGER)")
+        conn.executemany("INSERT INTO ventas (fecha, cantidad) VALUES (?, ?)",
+                         (("2024-03-15", i % 10) for i in range(filas)))
+        conn.commit()
+        tracemalloc.start()
+        try:
+            exportar_json(conn, os.devnull, tamano_lote=500)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            conn.close()
+
+    assert pico_memoria(50_000) < 2 * pico_memoria(5_000)
+
+def test_convertir_a_json_columnas(conexion_bd):
+    """
+    Prueba el formato JSON por columnas, con y sin codificación por diccionario
+    Verifica que ambos contienen los mismos datos que el formato por filas
+    """
+    por_filas = convertir_a_json(conexion_bd)
+
+    por_columnas = convertir_a_json(conexion_bd, formato='columnas')
+    assert set(por_columnas) == set(por_filas)
+    assert por_columnas["regiones"]["id"] == [region["id"] for region in por_filas["regiones"]]
+    assert columnar_a_filas(por_columnas) == por_filas
+
+    con_diccionario = convertir_a_json(conexion_bd, formato='columnas', diccionario=True)
+    categorias = con_diccionario["productos"]["categoria"]
+    assert isinstance(categorias, dict)
+    assert len(categorias["diccionario"]) == len({p["categoria"] for p in por_filas["productos"]})
+    # Los identificadores no se codifican: no son texto
+    assert isinstance(con_diccionario["ventas"]["id"], list)
+    assert columnar_a_filas(json.loads(json.dumps(con_diccionario))) == por_filas
+    assert len(json.dumps(con_diccionario)) < len(json.dumps(por_columnas)) < len(json.dumps(por_filas))
+
+    with pytest.raises(ValueError):
+        convertir_a_json(conexion_bd, formato='csv')
+
+def test_convertir_a_dataframes_perezoso(conexion_bd):
+    """
+    Prueba que las tablas combinadas se calculan al usarlas y coinciden con
+    las consultas JOIN equivalentes
+    """
+    dataframes = convertir_a_dataframes(conexion_bd)
+    assert dataframes.construidas() == []
+    assert "ventas_completas" in dataframes
+
+    esperado = pd.read_sql_query("""
+        SELECT v.*, p.nombre as producto_nombre, p.categoria, p.precio_unitario,
+               vd.nombre as vendedor_nombre, r.nombre as region_nombre, r.pais
+        FROM ventas v
+        JOIN productos p ON v.producto_id = p.id
+        JOIN vendedores vd ON v.vendedor_id = vd.id
+        JOIN regiones r ON vd.region_id = r.id
+        ORDER BY v.id
+    """, conexion_bd)
+    pd.testing.assert_frame_equal(dataframes["ventas_completas"], esperado)
+    assert dataframes.construidas() == ["ventas_completas"]
+
+    # Las tablas ya calculadas no dependen de la conexión
+    conexion_bd.close()
+    assert len(dataframes["ventas_vendedores"]) == len(esperado)
+
+def test_convertir_a_dataframes_tipado(conexion_bd):
+    """
+    Prueba la carga con tipos por lotes
+    Verifica los tipos de las columnas, que los valores no cambian y que ocupa menos memoria
+    """
+    sin_tipos = convertir_a_dataframes(conexion_bd)
+    con_tipos = convertir_a_dataframes(conexion_bd, tipado=True, chunksize=5)
+
+    ventas = con_tipos["ventas"]
+    assert str(ventas["id"].dtype) == "int32"
+    assert str(ventas["cantidad"].dtype) == "int16"
+    assert ventas["fecha"].dtype.kind == "M"
+    assert str(con_tipos["productos"]["categoria"].dtype) == "category"
+    assert str(con_tipos["productos"]["precio_unitario"].dtype) == "float32"
+    assert str(con_tipos["ventas_completas"]["pais"].dtype) == "category"
+
+    assert ventas["id"].tolist() == sin_tipos["ventas"]["id"].tolist()
+    assert ventas["fecha"].dt.strftime("%Y-%m-%d").tolist() == sin_tipos["ventas"]["fecha"].tolist()
+    assert (con_tipos["ventas_completas"]["categoria"].astype(str).tolist()
+            == sin_tipos["ventas_completas"]["categoria"].tolist())
+
+    informe = informe_memoria(sin_tipos, con_tipos)
+    assert informe["ventas"]["bytes_ahorrados"] > 0
+    assert informe["ventas_completas"]["porcentaje_ahorrado"] > 50
+
+def test_leer_tabla_tipada_amplia_tipos():
+    """
+    Prueba que leer_tabla_tipada amplía una columna en lugar de truncar valores
+    que no caben en el tipo pedido
+    """
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE medidas (id INTEGER, valor INTEGER, etiqueta TEXT)")
+    conn.executemany("INSERT INTO medidas VALUES (?, ?, ?)",
+                     [(1, 5, 'a'), (2, None, 'b'), (1000, 7, None)])
+
+    df = leer_tabla_tipada(conn, "medidas", {"id": "int8", "valor": "int8", "etiqueta": "category"},
+                           chunksize=2)
+    assert df["id"].tolist() == [1, 2, 1000]
+    assert df["valor"].isna().tolist() == [False, True, False]
+    assert df["etiqueta"].tolist()[:2] == ['a', 'b'] and pd.isna(df["etiqueta"].iloc[2])
+
+    conn.execute("DELETE FROM medidas")
+    vacia = leer_tabla_tipada(conn, "medidas", {"id": "int8", "etiqueta": "category"})
+    assert len(vacia) == 0 and str(vacia["id"].dtype) == "int8"
+    conn.close()
+
+def test_convertir_a_dataframes_cacheado(tmp_path):
+    """
+    Prueba la caché en disco de los DataFrames
+    Verifica que una segunda extracción no consulta las tablas y que un cambio
+    en la base de datos invalida la caché
+    """
+    ruta = str(tmp_path / 'ventas.db')
+    shutil.copyfile(DB_PATH, ruta)
+    cache = str(tmp_path / 'cache')
+
+    conn = sqlite3.connect(ruta)
+    consultas = []
+    conn.set_trace_callback(consultas.append)
+    try:
+        for tipado in (False, True):
+            original = convertir_a_dataframes_cacheado(conn, tipado, cache)
+            consultas.clear()
+            cacheado = convertir_a_dataframes_cacheado(conn, tipado, cache)
+            assert not [sql for sql in consultas if 'SELECT *' in sql]
+            for nombre in original:
+                pd.testing.assert_frame_equal(cacheado[nombre], original[nombre])
+
+        # Los DataFrames cargados de la caché se pueden modificar sin tocarla
+        cacheado["ventas"].loc[0, "cantidad"] = 999
+        assert convertir_a_dataframes_cacheado(conn, True, cache)["ventas"]["cantidad"][0] != 999
+
+        conn.execute("INSERT INTO ventas (fecha, vendedor_id, producto_id, cantidad) "
+                     "VALUES ('2024-12-31', 1, 1, 5)")
+        conn.commit()
+        actualizado = convertir_a_dataframes_cacheado(conn, True, cache)
+        assert len(actualizado["ventas"]) == len(original["ventas"]) + 1
+        # La caché anterior con tipos se borra; la de sin tipos sigue hasta que se use
+        assert len(os.listdir(cache)) == 2
+    finally:
+        conn.close()
+
+def test_convertir_a_dataframes_cacheado_otra_conexion(tmp_path, monkeypatch):
+    """
+    Prueba que la caché escrita desde una conexión de larga duración se usa
+    desde una conexión nueva, y que un commit que no cambia la fecha ni el
+    tamaño del archivo no sirve la caché antigua en la misma conexión
+    """
+    ruta = str(tmp_path / 'ventas.db')
+    shutil.copyfile(DB_PATH, ruta)
+    cache = str(tmp_path / 'cache')
+
+    larga = sqlite3.connect(ruta)
+    otra = sqlite3.connect(ruta)
+    try:
+        larga.execute("SELECT COUNT(*) FROM ventas").fetchone()
+        otra.execute("UPDATE ventas SET cantidad = cantidad + 1 WHERE id = 1")
+        otra.commit()
+        assert larga.execute("PRAGMA data_version").fetchone()[0] > 1
+        original = convertir_a_dataframes_cacheado(larga, directorio=cache)
+    finally:
+        otra.close()
+
+    nueva = sqlite3.connect(ruta)
+    consultas = []
+    nueva.set_trace_callback(consultas.append)
+    try:
+        cacheado = convertir_a_dataframes_cacheado(nueva, directorio=cache)
+        assert not [sql for sql in consultas if 'SELECT *' in sql]
+        pd.testing.assert_frame_equal(cacheado["ventas"], original["ventas"])
+    finally:
+        nueva.close()
+
+    # Fecha y tamaño congelados: solo el estado de la conexión delata el cambio
+    clave = ej3a3.clave_cache_dataframes(larga)
+    monkeypatch.setattr(ej3a3, 'clave_cache_dataframes', lambda conexion, tipado=False: clave)
+    try:
+        larga.execute("UPDATE ventas SET cantidad = 999 WHERE id = 1")
+        larga.commit()
+        actualizado = convertir_a_dataframes_cacheado(larga, directorio=cache)
+        assert actualizado["ventas"].loc[actualizado["ventas"]["id"] == 1, "cantidad"].tolist() == [999]
+    finally:
+        larga.close()
+
+def test_convertir_a_dataframes_cacheado_blob_y_transaccion(tmp_path):
+    """
+    Prueba que la caché guarda columnas BLOB y que no se usa con una
+    transacción abierta, cuyas escrituras no cambian la clave
+    """
+    ruta = str(tmp_path / 'blobs.db')
+    cache = str(tmp_path / 'cache')
+    conn = sqlite3.connect(ruta)
+    try:
+        conn.execute("CREATE TABLE adjuntos (id INTEGER PRIMARY KEY, nombre TEXT, datos BLOB)")
+        conn.executemany("INSERT INTO adjuntos (nombre, datos) VALUES (?, ?)",
+                         [('a', b'\x00\xffbin'), ('b', None), ('c', 'texto')])
+        conn.commit()
+
+        original = convertir_a_dataframes_cacheado(conn, directorio=cache)
+        cacheado = convertir_a_dataframes_cacheado(conn, directorio=cache)
+        assert cacheado["adjuntos"]["datos"].tolist() == [b'\x00\xffbin', None, 'texto']
+        pd.testing.assert_frame_equal(cacheado["adjuntos"], original["adjuntos"])
+
+        conn.execute("INSERT INTO adjuntos (nombre, datos) VALUES ('d', x'01')")
+        assert len(convertir_a_dataframes_cacheado(conn, directorio=cache)["adjuntos"]) == 4
+        conn.rollback()
+        assert len(convertir_a_dataframes_cacheado(conn, directorio=cache)["adjuntos"]) == 3
+    finally:
+        conn.close()
+
+@pytest.fixture
+def conexion_copia(tmp_path):
+    """
+    Fixture con una conexión a una copia de la base de datos que se puede modificar
+    """
+    ruta = str(tmp_path / 'ventas.db')
+    shutil.copyfile(DB_PATH, ruta)
+    conn = sqlite3.connect(ruta)
+    yield conn
+    conn.close()
+
+def _insertar_venta(conn, venta_id=None):
+    conn.execute("INSERT INTO ventas (id, fecha, vendedor_id, producto_id, cantidad) "
+                 "VALUES (?, '2024-12-31', 1, 1, 5)", (venta_id,))
+    conn.commit()
+
+def test_extractor_incremental_dataframes(conexion_copia):
+    """
+    Prueba la extracción incremental de DataFrames
+    Verifica que solo se leen las ventas nuevas y que el resultado es el de una
+    extracción completa
+    """
+    extractor = ExtractorIncremental(conexion_copia, tipado=True)
+    assert extractor.actualizar()["modo"] == "completo"
+
+    _insertar_venta(conexion_copia)
+    _insertar_venta(conexion_copia)
+    consultas = []
+    conexion_copia.set_trace_callback(consultas.append)
+    estado = extractor.actualizar()
+    conexion_copia.set_trace_callback(None)
+    assert estado["modo"] == "incremental" and estado["filas_nuevas"] == 2
+    assert any("WHERE id > " in sql for sql in consultas if "ventas" in sql)
+    assert not any(sql.startswith('SELECT * FROM "ventas"') and "WHERE" not in sql for sql in consultas)
+
+    completo = convertir_a_dataframes(conexion_copia, tipado=True)
+    incremental = extractor.resultado()
+    for nombre in ("ventas", "ventas_completas"):
+        pd.testing.assert_frame_equal(incremental[nombre], completo[nombre])
+
+def test_extractor_incremental_cambios(conexion_copia):
+    """
+    Prueba que las modificaciones, borrados y altas con id antiguo fuerzan una
+    extracción completa, y que el formato JSON coincide con convertir_a_json
+    """
+    extractor = ExtractorIncremental(conexion_copia, formato="json")
+    extractor.actualizar()
+
+    conexion_copia.execute("UPDATE ventas SET cantidad = 99 WHERE id = 1")
+    conexion_copia.commit()
+    assert extractor.actualizar()["modo"] == "completo"
+    assert extractor.resultado()["ventas"][0]["cantidad"] == 99
+    assert extractor.actualizar()["modo"] == "incremental"
+
+    conexion_copia.execute("DELETE FROM ventas WHERE id = 2")
+    conexion_copia.commit()
+    assert extractor.actualizar()["modo"] == "completo"
+
+    # El id 2 ha quedado libre: una venta nueva con ese id no está por encima de la marca
+    _insertar_venta(conexion_copia, 2)
+    assert extractor.actualizar()["modo"] == "completo"
+
+    _insertar_venta(conexion_copia)
+    assert extractor.actualizar() == {"modo": "incremental", "filas_nuevas": 1,
+                                      "ultimo_id": extractor.ultimo_id}
+    assert extractor.resultado() == convertir_a_json(conexion_copia)
+
+def test_extractor_incremental_reemplazo(conexion_copia):
+    """
+    Prueba que sustituir la venta de mayor id con INSERT OR REPLACE fuerza una
+    extracción completa, y que el registro de cambios se vacía al consumirse
+    """
+    extractor = ExtractorIncremental(conexion_copia)
+    extractor.actualizar()
+    for cantidad in (50, 60):
+        conexion_copia.execute("UPDATE ventas SET cantidad = ? WHERE id = 1", (cantidad,))
+        conexion_copia.commit()
+        assert extractor.actualizar()["modo"] == "completo"
+
+    conexion_copia.execute("INSERT OR REPLACE INTO ventas (id, fecha, vendedor_id, producto_id, cantidad) "
+                           "VALUES (?, '2024-12-31', 1, 1, 77)", (extractor.ultimo_id,))
+    conexion_copia.commit()
+    assert extractor.actualizar()["modo"] == "completo"
+    assert extractor.resultado()["ventas"]["cantidad"].iloc[-1] == 77
+
+    assert conexion_copia.execute("SELECT COUNT(*) FROM ventas_cambios").fetchone()[0] == 1
+    assert extractor.actualizar()["modo"] == "incremental"
+
+def test_tablas_internas_ocultas(conexion_copia):
+    """
+    Prueba que el registro de cambios y los resúmenes no aparecen entre los datos
+    exportados ni se releen en cada extracción incremental
+    """
+    tablas = list(convertir_a_json(conexion_copia))
+    dataframes = list(convertir_a_dataframes(conexion_copia))
+    extractor = ExtractorIncremental(conexion_copia)
+    instalar_resumenes(conexion_copia)
+    assert list(convertir_a_json(conexion_copia)) == tablas
+    assert list(convertir_a_dataframes(conexion_copia)) == dataframes
+
+    extractor.actualizar()
+    _insertar_venta(conexion_copia)
+    consultas = []
+    conexion_copia.set_trace_callback(consultas.append)
+    assert extractor.actualizar()["modo"] == "incremental"
+    conexion_copia.set_trace_callback(None)
+    assert not any("resumen_ventas" in sql or "ventas_cambios\"" in sql for sql in consultas)
+    assert list(extractor.resultado()) == dataframes
+
+def _resumen_esperado(conn, por):
+    """Agrupa ventas_completas con pandas, para comparar con consultar_resumen"""
+    ventas = convertir_a_dataframes(conn)["ventas_completas"].copy()
+    ventas["mes"] = ventas["fecha"].str[:7]
+    ventas["ingresos"] = ventas["cantidad"] * ventas["precio_unitario"]
+    agrupado = ventas.groupby(por).agg(ingresos=("ingresos", "sum"), unidades=("cantidad", "sum"),
+                                       ventas=("id", "count"))
+    return agrupado.reset_index()
+
+def _comprobar_resumen(conn):
+    for dimensiones, por in ((["region"], ["region_nombre"]), (["vendedor"], ["vendedor_nombre"]),
+                             (["categoria", "mes"], ["categoria", "mes"])):
+        resultado = consultar_resumen(conn, dimensiones).sort_values(por).reset_index(drop=True)
+        esperado = _resumen_esperado(conn, por)
+        assert resultado[por].values.tolist() == esperado[por].values.tolist()
+        assert resultado["unidades"].tolist() == esperado["unidades"].tolist()
+        assert resultado["ventas"].tolist() == esperado["ventas"].tolist()
+        assert resultado["ingresos"].tolist() == pytest.approx(esperado["ingresos"].tolist())
+
+def test_resumenes_ventas(conexion_copia):
+    """
+    Prueba los resúmenes de ventas mantenidos por triggers
+    Verifica que coinciden con agrupar ventas_completas tras altas, bajas y cambios
+    """
+    instalar_resumenes(conexion_copia)
+    _comprobar_resumen(conexion_copia)
+
+    total = consultar_resumen(conexion_copia, [])
+    assert total["ventas"].tolist() == [len(convertir_a_dataframes(conexion_copia)["ventas_completas"])]
+    assert "region_nombre" in consultar_resumen(conexion_copia, ["region"]).columns
+
+    _insertar_venta(conexion_copia)
+    conexion_copia.execute("UPDATE ventas SET cantidad = 10, producto_id = 2, fecha = '2023-06-01' WHERE id = 1")
+    conexion_copia.execute("DELETE FROM ventas WHERE id = 2")
+    conexion_copia.commit()
+    _comprobar_resumen(conexion_copia)
+
+    # Sustituir una venta existente resta la anterior, aunque el INSERT acabe ignorándose
+    conexion_copia.execute("INSERT OR REPLACE INTO ventas (id, fecha, vendedor_id, producto_id, cantidad) "
+                           "VALUES (3, '2022-01-15', 2, 1, 7)")
+    conexion_copia.execute("INSERT OR IGNORE INTO ventas (id, fecha, vendedor_id, producto_id, cantidad) "
+                           "VALUES (4, '2022-01-15', 2, 1, 7)")
+    conexion_copia.execute("INSERT INTO ventas (id, fecha, vendedor_id, producto_id, cantidad) "
+                           "VALUES (5, '2022-01-15', 2, 1, 7) "
+                           "ON CONFLICT (id) DO UPDATE SET cantidad = excluded.cantidad")
+    conexion_copia.commit()
+    _comprobar_resumen(conexion_copia)
+
+    # Los cambios en las dimensiones marcan el resumen; consultarlo no lo recalcula
+    # salvo con actualizar=True, pero el resultado ya es correcto
+    conexion_copia.execute("UPDATE productos SET precio_unitario = precio_unitario * 2")
+    conexion_copia.execute("UPDATE vendedores SET region_id = 2 WHERE id = 1")
+    conexion_copia.commit()
+    assert conexion_copia.execute("SELECT desactualizado FROM resumen_ventas_estado").fetchone() == (1,)
+    _comprobar_resumen(conexion_copia)
+    assert conexion_copia.execute("SELECT desactualizado FROM resumen_ventas_estado").fetchone() == (1,)
+    consultar_resumen(conexion_copia, actualizar=True)
+    assert conexion_copia.execute("SELECT desactualizado FROM resumen_ventas_estado").fetchone() == (0,)
+    _comprobar_resumen(conexion_copia)
+
+    filtrado = consultar_resumen(conexion_copia, ["mes"], desde_mes="2022-03", hasta_mes="2022-04")
+    assert filtrado["mes"].tolist() == ["2022-03", "2022-04"]
+
+    with pytest.raises(ValueError):
+        consultar_resumen(conexion_copia, ["trimestre"])
+
+def test_resumenes_transaccion_llamante(conexion_copia):
+    """
+    Prueba que consultar_resumen no escribe ni confirma la transacción abierta
+    del llamante, y que actualizar_resumenes se une a ella
+    """
+    instalar_resumenes(conexion_copia)
+    conexion_copia.execute("UPDATE vendedores SET region_id = 2 WHERE id = 1")
+    _comprobar_resumen(conexion_copia)
+    assert conexion_copia.in_transaction
+    conexion_copia.rollback()
+    assert conexion_copia.execute("SELECT region_id FROM vendedores WHERE id = 1").fetchone() != (2,)
+
+    conexion_copia.execute("UPDATE vendedores SET region_id = 2 WHERE id = 1")
+    assert actualizar_resumenes(conexion_copia)
+    assert conexion_copia.in_transaction
+    conexion_copia.rollback()
+    assert conexion_copia.execute("SELECT desactualizado FROM resumen_ventas_estado").fetchone() == (0,)
+    _comprobar_resumen(conexion_copia)
+
+def test_resumenes_solo_lectura(conexion_copia, tmp_path):
+    """
+    Prueba que consultar_resumen funciona en una conexión de solo lectura con
+    el resumen desactualizado
+    """
+    instalar_resumenes(conexion_copia)
+    conexion_copia.execute("UPDATE productos SET precio_unitario = precio_unitario * 2")
+    conexion_copia.commit()
+    lectura = sqlite3.connect(f"file:{tmp_path / 'ventas.db'}?mode=ro", uri=True)
+    try:
+        _comprobar_resumen(lectura)
+    finally:
+        lectura.close()
+
+def test_instalar_resumenes_atomico(conexion_copia):
+    """
+    Prueba que si el cálculo del resumen falla no queda instalado nada
+    """
+    conexion_copia.execute("CREATE TABLE resumen_ventas (vendedor_id, categoria, mes, region_id, "
+                           "ingresos, unidades, ventas CHECK (ventas < 0), "
+                           "PRIMARY KEY (vendedor_id, categoria, mes, region_id))")
+    conexion_copia.commit()
+    with pytest.raises(sqlite3.IntegrityError):
+        instalar_resumenes(conexion_copia)
+    assert not conexion_copia.in_transaction
+    objetos = {fila[0] for fila in conexion_copia.execute("SELECT name FROM sqlite_master")}
+    assert "resumen_ventas_estado" not in objetos and "resumen_ventas_insert" not in objetos
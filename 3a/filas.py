@@ -0,0 +1,198 @@
+"""
+Representaciones compactas de filas para los módulos sqlite3 del apartado 3a.
+
+Uso:
+    conexion.row_factory = fabrica_namedtuple
+    libros = ej3a1.paginar_libros(conexion)        # cualquier función de ej3a1 / ej3a2
+
+    libros = leer(conexion.execute(sql), 'columnas')
+    libros.columna('anio')                         # array('q', [...])
+
+Formatos disponibles (FORMATOS):
+- 'tupla': las tuplas de sqlite3, sin cambios
+- 'namedtuple': tuplas con nombre; mismo tamaño que una tupla, acceso por atributo
+- 'columnas': ResultadoColumnar, una columna por lista o, si todos sus valores
+  son enteros o reales, por array tipado (8 bytes por valor, sin objeto Python)
+
+Un registro con __slots__ solo ahorraría unos 8 bytes por fila frente a la tupla,
+así que no hay formato por filas más compacto: para ahorrar memoria, 'columnas'.
+Las filas namedtuple se pueden desempaquetar e indexar como tuplas, así que las
+funciones que ya trabajan con tuplas las aceptan. bytes_por_fila mide la memoria
+que ocupa cada formato.
+"""
+
+import functools
+import sys
+from array import array
+from collections import namedtuple
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple, Union
+
+FORMATOS = ('tupla', 'namedtuple', 'columnas')
+
+# Filas leídas de cada vez al construir un ResultadoColumnar
+TAMANO_LOTE = 1000
+
+# Nombres de columnas distintos para los que se recuerda la clase generada
+MAX_CLASES = 256
+
+
+@functools.lru_cache(maxsize=MAX_CLASES)
+def clase_namedtuple(columnas: Tuple[str, ...]) -> type:
+    """Devuelve (y recuerda) la namedtuple para unos nombres de columna"""
+    # rename=True sustituye los nombres que no son identificadores válidos o se repiten
+    return namedtuple('Fila', columnas, rename=True)
+
+
+def _fabrica(crear_clase: Callable[[Tuple[str, ...]], type]) -> Callable[[Any, Tuple], Any]:
+    """Crea un row_factory que construye cada fila con la clase de sus columnas"""
+    # (description, clase) de la última consulta: description es el mismo objeto
+    # para todas las filas de una sentencia, así que basta compararlo por identidad
+    ultima: List[Tuple[Any, Any]] = [(None, None)]
+
+    def fabrica(cursor, fila):
+        descripcion, clase = ultima[0]
+        if cursor.description is not descripcion:
+            descripcion = cursor.description
+            clase = crear_clase(tuple(columna[0] for columna in descripcion))
+            ultima[0] = (descripcion, clase)
+        return clase(fila)
+
+    return fabrica
+
+
+def _crear_namedtuple(columnas: Tuple[str, ...]) -> Callable[[Tuple], Any]:
+    # Las namedtuple se construyen con _make a partir de un iterable
+    return clase_namedtuple(columnas)._make
+
+
+fabrica_namedtuple = _fabrica(_crear_namedtuple)
+fabrica_namedtuple.__doc__ = "row_factory de sqlite3 que devuelve cada fila como namedtuple"
+
+FABRICAS: Dict[str, Any] = {
+    'tupla': None,
+    'namedtuple': fabrica_namedtuple,
+}
+
+
+class ResultadoColumnar:
+    """
+    Resultado de una consulta guardado por columnas
+
+    Las columnas cuyos valores son todos enteros se guardan en array('q') y las
+    de reales en array('d'); las demás (texto, NULL, mezclas) en listas. Se
+    recorre e indexa como una lista de tuplas. No debe modificarse: las cachés
+    de resultados devuelven el mismo objeto.
+    """
+
+    __slots__ = ('columnas', 'datos')
+
+    def __init__(self, columnas: Sequence[str]):
+        self.columnas: Tuple[str, ...] = tuple(columnas)
+        self.datos: List[Union[array, List[Any]]] = [array('q') for _ in self.columnas]
+
+    def _anadir(self, filas: List[Tuple]) -> None:
+        for indice, valores in enumerate(zip(*filas)):
+            columna = self.datos[indice]
+            if isinstance(columna, list):
+                columna.extend(valores)
+                continue
+
+            if columna.typecode == 'q' and not columna and all(type(v) is float for v in valores):
+                columna = self.datos[indice] = array('d')
+            antes = len(columna)
+            try:
+                # array('d') aceptaría enteros convirtiéndolos: solo se admiten reales
+                if columna.typecode == 'd' and not all(type(v) is float for v in valores):
+                    raise TypeError
+                columna.extend(valores)
+            except (TypeError, OverflowError):
+                del columna[antes:]
+                columna = self.datos[indice] = columna.tolist()
+                columna.extend(valores)
+
+    def columna(self, nombre: str) -> Union[array, List[Any]]:
+        """Devuelve los valores de una columna (array tipado o lista)"""
+        return self.datos[self.columnas.index(nombre)]
+
+    def __len__(self) -> int:
+        return len(self.datos[0]) if self.datos else 0
+
+    def __getitem__(self, indice: int) -> Tuple:
+        return tuple(columna[indice] for columna in self.datos)
+
+    def __iter__(self) -> Iterator[Tuple]:
+        return zip(*self.datos)
+
+    def __eq__(self, otro) -> bool:
+        if isinstance(otro, (list, ResultadoColumnar)):
+            return list(self) == list(otro)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ResultadoColumnar(columnas={self.columnas!r}, filas={len(self)})"
+
+
+def leer(cursor, formato: str = 'tupla', tamano_lote: int = TAMANO_LOTE):
+    """
+    Lee todas las filas pendientes de un cursor ya ejecutado en el formato pedido
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor con la consulta ejecutada
+        formato (str): Uno de FORMATOS
+        tamano_lote (int): Filas por fetchmany al construir el resultado columnar
+
+    Returns:
+        List[Tuple] o ResultadoColumnar: Lista de filas (tuplas o namedtuple)
+        para los formatos por filas; ResultadoColumnar para 'columnas'
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato!r}; debe ser uno de {FORMATOS}")
+
+    if formato != 'columnas':
+        if FABRICAS[formato] is not None:
+            cursor.row_factory = FABRICAS[formato]
+        return cursor.fetchall()
+
+    # Las columnas se forman con tuplas simples, sin pasar por el row_factory
+    cursor.row_factory = None
+    resultado = ResultadoColumnar(columna[0] for columna in cursor.description or ())
+    while True:
+        lote = cursor.fetchmany(tamano_lote)
+        if not lote:
+            return resultado
+        resultado._anadir(lote)
+
+
+def tamano_profundo(objeto: Any) -> int:
+    """
+    Bytes que ocupa un objeto junto con todo lo que contiene
+
+    Cada objeto se cuenta una sola vez, así que los valores compartidos (cadenas
+    internadas, enteros pequeños) no se suman por cada fila que los usa.
+    """
+    vistos = set()
+    total = 0
+    pendientes = [objeto]
+    while pendientes:
+        actual = pendientes.pop()
+        if id(actual) in vistos:
+            continue
+        vistos.add(id(actual))
+        total += sys.getsizeof(actual)
+
+        if isinstance(actual, dict):
+            pendientes.extend(actual.keys())
+            pendientes.extend(actual.values())
+        elif isinstance(actual, (list, tuple, set, frozenset)):
+            pendientes.extend(actual)
+        elif isinstance(actual, ResultadoColumnar):
+            pendientes.extend(getattr(actual, campo) for campo in type(actual).__slots__)
+    return total
+
+
+def bytes_por_fila(resultado: Any) -> float:
+    """
+    Memoria media por fila de un resultado (lista de filas o ResultadoColumnar)
+    """
+    filas = len(resultado)
+    return tamano_profundo(resultado) / filas if filas else 0.0
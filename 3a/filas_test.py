@@ -0,0 +1,67 @@
+"""
+Tests para el módulo filas.py con las representaciones compactas de filas
+de los módulos sqlite3 del apartado 3a.
+"""
+
+import sqlite3
+from array import array
+
+import pytest
+
+import filas
+
+@pytest.fixture
+def conexion():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE productos (id INTEGER, nombre TEXT, precio REAL, stock INTEGER)")
+    conn.executemany("INSERT INTO productos VALUES (?, ?, ?, ?)",
+                     [(i, f"producto {i}", i * 1.5, None if i % 3 else i) for i in range(2500)])
+    yield conn
+    conn.close()
+
+SQL = "SELECT id, nombre, precio, stock FROM productos ORDER BY id"
+
+def test_formatos_equivalentes(conexion):
+    """Todos los formatos devuelven los mismos valores que las tuplas de sqlite3"""
+    tuplas = conexion.execute(SQL).fetchall()
+    for formato in filas.FORMATOS:
+        resultado = filas.leer(conexion.execute(SQL), formato, tamano_lote=300)
+        assert len(resultado) == len(tuplas)
+        assert [tuple(fila) for fila in resultado] == tuplas
+        assert resultado[7] == tuplas[7]
+
+    with pytest.raises(ValueError):
+        filas.leer(conexion.execute(SQL), 'dataframe')
+
+def test_row_factories(conexion):
+    """Las filas namedtuple se desempaquetan y se leen por nombre"""
+    conexion.row_factory = filas.fabrica_namedtuple
+    fila = conexion.execute(SQL + " LIMIT 1 OFFSET 3").fetchone()
+    id_, nombre, precio, stock = fila
+    assert (id_, nombre, precio, stock) == (3, 'producto 3', 4.5, 3)
+    assert fila.nombre == 'producto 3'
+    assert fila._asdict()['precio'] == 4.5
+
+    # Otra consulta con otras columnas cambia la clase de las filas
+    assert conexion.execute("SELECT 1 AS uno").fetchone().uno == 1
+
+def test_resultado_columnar(conexion):
+    """Las columnas numéricas sin NULL se guardan en arrays tipados"""
+    resultado = filas.leer(conexion.execute(SQL), 'columnas', tamano_lote=300)
+    assert resultado.columnas == ('id', 'nombre', 'precio', 'stock')
+    assert isinstance(resultado.columna('id'), array) and resultado.columna('id').typecode == 'q'
+    assert resultado.columna('precio').typecode == 'd'
+    assert isinstance(resultado.columna('nombre'), list)
+    # stock tiene NULL: pasa a lista sin perder ni duplicar valores
+    assert isinstance(resultado.columna('stock'), list)
+    assert len(resultado.columna('stock')) == 2500
+
+    vacio = filas.leer(conexion.execute(SQL + " LIMIT 0"), 'columnas')
+    assert len(vacio) == 0 and list(vacio) == []
+
+def test_bytes_por_fila(conexion):
+    """El formato columnar ocupa menos memoria por fila que las tuplas"""
+    tuplas = filas.leer(conexion.execute(SQL))
+    columnas = filas.leer(conexion.execute(SQL), 'columnas')
+    assert filas.bytes_por_fila(columnas) < filas.bytes_por_fila(tuplas)
+    assert filas.bytes_por_fila([]) == 0.0
@@ -0,0 +1,372 @@
+"""
+Instrumentación opcional de consultas SQL para los módulos sqlite3 del apartado 3a.
+
+Uso:
+    conexion = instrumentar(sqlite3.connect(...), muestreo=0.1)
+    insertar_libros(conexion, libros)      # cualquier función de ej3a1 / ej3a2
+    print(conexion.estadisticas.informe())
+
+instrumentar() devuelve un envoltorio de la conexión que mide cada execute /
+executemany y las lecturas posteriores del cursor. Las estadísticas se agrupan por
+SQL normalizado (literales y listas de parámetros sustituidos por '?') e incluyen
+número de llamadas, filas, tiempo total e histograma de latencias.
+
+Para mantener bajo el coste, solo se mide una fracción de las ejecuciones
+(muestreo); el resto solo incrementa el contador de llamadas. En las ejecuciones
+medidas se instala además un progress handler que cuenta las instrucciones de la
+máquina virtual de SQLite. Las sentencias que no pasan por el envoltorio (las de
+un executescript) se contabilizan con set_trace_callback, que solo se activa
+durante el script.
+"""
+
+import bisect
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Límites superiores (en milisegundos) de los cubos del histograma de latencias
+LIMITES_HISTOGRAMA_MS = [0.01, 0.1, 1, 10, 100, 1000]
+
+# Instrucciones de la máquina virtual entre dos llamadas al progress handler
+PASOS_PROGRESS_HANDLER = 1000
+
+# Textos SQL distintos cuya forma normalizada se recuerda
+MAX_CACHE_NORMALIZACION = 1024
+
+_RE_CADENA = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_ESPACIOS = re.compile(r"\s+")
+_RE_LISTA_IN = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_RE_VALUES = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_RE_COMENTARIO = re.compile(r"/\*.*?\*/|--[^\n]*")
+
+
+def normalizar_sql(sql: str) -> str:
+    """
+    Normaliza una sentencia SQL para agrupar ejecuciones equivalentes
+
+    Args:
+        sql (str): Sentencia SQL original
+
+    Returns:
+        str: Sentencia sin comentarios, con los literales sustituidos por '?',
+        las listas IN (...) reducidas a 'IN (?)', los VALUES de varias filas
+        reducidos a la primera y los espacios colapsados
+    """
+    sql = _RE_COMENTARIO.sub(" ", sql)
+    sql = _RE_CADENA.sub("?", sql)
+    sql = _RE_NUMERO.sub("?", sql)
+    sql = _RE_LISTA_IN.sub("IN (?)", sql)
+    sql = _RE_VALUES.sub(r"\1", sql)
+    return _RE_ESPACIOS.sub(" ", sql).strip().rstrip(";")
+
+
+class EstadisticaSentencia:
+    """Estadísticas acumuladas de una sentencia SQL normalizada"""
+
+    __slots__ = ('llamadas', 'muestras', 'filas', 'tiempo_total', 'tiempo_max',
+                 'pasos_vm', 'histograma')
+
+    def __init__(self):
+        self.llamadas = 0
+        self.muestras = 0
+        self.filas = 0
+        self.tiempo_total = 0.0
+        self.tiempo_max = 0.0
+        self.pasos_vm = 0
+        self.histograma = [0] * (len(LIMITES_HISTOGRAMA_MS) + 1)
+
+    def percentil(self, p: float) -> Optional[float]:
+        """
+        Estima un percentil de latencia a partir del histograma
+
+        Args:
+            p (float): Percentil entre 0 y 100
+
+        Returns:
+            Optional[float]: Límite superior (ms) del cubo que contiene el percentil,
+            o None si no hay muestras
+        """
+        if not self.muestras:
+            return None
+        objetivo = self.muestras * p / 100
+        acumulado = 0
+        for indice, cantidad in enumerate(self.histograma):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                break
+        if indice < len(LIMITES_HISTOGRAMA_MS):
+            return LIMITES_HISTOGRAMA_MS[indice]
+        return self.tiempo_max * 1000
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Convierte la estadística en un diccionario serializable a JSON"""
+        return {
+            'llamadas': self.llamadas,
+            'muestras': self.muestras,
+            'filas': self.filas,
+            'tiempo_total_ms': self.tiempo_total * 1000,
+            'tiempo_medio_ms': self.tiempo_total * 1000 / self.muestras if self.muestras else None,
+            'tiempo_max_ms': self.tiempo_max * 1000,
+            'p50_ms': self.percentil(50),
+            'p95_ms': self.percentil(95),
+            'pasos_vm': self.pasos_vm,
+            'histograma': dict(zip([f"<={limite}ms" for limite in LIMITES_HISTOGRAMA_MS] + ['>'],
+                                   self.histograma)),
+        }
+
+
+class EstadisticasSQL:
+    """Registro de estadísticas por SQL normalizado, seguro entre hilos"""
+
+    def __init__(self, muestreo: float = 1.0):
+        self.muestreo = muestreo
+        self.sentencias: Dict[str, EstadisticaSentencia] = {}
+        self._lock = threading.Lock()
+        self._normalizadas: Dict[str, str] = {}
+
+    def _clave(self, sql: str) -> str:
+        clave = self._normalizadas.get(sql)
+        if clave is None:
+            clave = normalizar_sql(sql)
+            if len(self._normalizadas) >= MAX_CACHE_NORMALIZACION:
+                self._normalizadas.clear()
+            self._normalizadas[sql] = clave
+        return clave
+
+    def _estadistica(self, sql: str) -> EstadisticaSentencia:
+        clave = self._clave(sql)
+        estadistica = self.sentencias.get(clave)
+        if estadistica is None:
+            with self._lock:
+                estadistica = self.sentencias.setdefault(clave, EstadisticaSentencia())
+        return estadistica
+
+    def muestrear(self) -> bool:
+        """Decide si la próxima ejecución se mide"""
+        return self.muestreo >= 1.0 or random.random() < self.muestreo
+
+    def contar_llamada(self, sql: str) -> EstadisticaSentencia:
+        """Cuenta una ejecución (medida o no) y devuelve su estadística"""
+        estadistica = self._estadistica(sql)
+        with self._lock:
+            estadistica.llamadas += 1
+        return estadistica
+
+    def registrar(self, estadistica: EstadisticaSentencia, segundos: float,
+                  filas: int = 0, pasos_vm: int = 0) -> None:
+        """Añade una ejecución medida a la estadística"""
+        cubo = bisect.bisect_left(LIMITES_HISTOGRAMA_MS, segundos * 1000)
+        with self._lock:
+            estadistica.muestras += 1
+            estadistica.tiempo_total += segundos
+            estadistica.tiempo_max = max(estadistica.tiempo_max, segundos)
+            estadistica.filas += filas
+            estadistica.pasos_vm += pasos_vm
+            estadistica.histograma[cubo] += 1
+
+    def sumar_lectura(self, estadistica: EstadisticaSentencia, segundos: float, filas: int) -> None:
+        """Suma al total de una sentencia el tiempo y las filas leídas con fetch*"""
+        with self._lock:
+            estadistica.tiempo_total += segundos
+            estadistica.filas += filas
+
+    def reiniciar(self) -> None:
+        """Borra todas las estadísticas acumuladas"""
+        with self._lock:
+            self.sentencias.clear()
+
+    def a_dict(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns:
+            Dict[str, Dict[str, Any]]: Estadísticas por SQL normalizado
+        """
+        with self._lock:
+            return {sql: estadistica.a_dict() for sql, estadistica in self.sentencias.items()}
+
+    def a_json(self, **kwargs) -> str:
+        """
+        Returns:
+            str: Estadísticas serializadas como JSON
+        """
+        return json.dumps(self.a_dict(), ensure_ascii=False, **kwargs)
+
+    def informe(self, limite: int = 20) -> str:
+        """
+        Genera un informe de texto con las sentencias que más tiempo consumen
+
+        Args:
+            limite (int): Número máximo de sentencias a incluir
+
+        Returns:
+            str: Informe formateado, una línea por sentencia
+        """
+        datos = sorted(self.a_dict().items(), key=lambda item: item[1]['tiempo_total_ms'],
+                       reverse=True)[:limite]
+        lineas = [f"{'llamadas':>9} {'muestras':>9} {'filas':>9} {'total ms':>10} "
+                  f"{'p50 ms':>8} {'p95 ms':>8}  sql"]
+        for sql, e in datos:
+            p50 = f"{e['p50_ms']:.2f}" if e['p50_ms'] is not None else '-'
+            p95 = f"{e['p95_ms']:.2f}" if e['p95_ms'] is not None else '-'
+            lineas.append(f"{e['llamadas']:>9} {e['muestras']:>9} {e['filas']:>9} "
+                          f"{e['tiempo_total_ms']:>10.2f} {p50:>8} {p95:>8}  {sql[:100]}")
+        return "\n".join(lineas)
+
+
+class CursorInstrumentado:
+    """Envoltorio de sqlite3.Cursor que mide execute, executemany y las lecturas"""
+
+    def __init__(self, cursor: sqlite3.Cursor, conexion: 'ConexionInstrumentada'):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_conexion', conexion)
+        object.__setattr__(self, '_actual', None)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __setattr__(self, nombre, valor):
+        setattr(self._cursor, nombre, valor)
+
+    def _ejecutar(self, metodo, sql, parametros):
+        estadisticas = self._conexion.estadisticas
+        estadistica = estadisticas.contar_llamada(sql)
+        if not estadisticas.muestrear():
+            object.__setattr__(self, '_actual', None)
+            metodo(sql, parametros)
+            return self
+
+        pasos = self._conexion._medir_pasos()
+        inicio = time.perf_counter()
+        try:
+            metodo(sql, parametros)
+        finally:
+            segundos = time.perf_counter() - inicio
+            pasos_vm = self._conexion._dejar_de_medir_pasos(pasos)
+        filas = self._cursor.rowcount if self._cursor.rowcount > 0 else 0
+        estadisticas.registrar(estadistica, segundos, filas, pasos_vm)
+        object.__setattr__(self, '_actual', estadistica)
+        return self
+
+    def execute(self, sql: str, parametros=()):
+        return self._ejecutar(self._cursor.execute, sql, parametros)
+
+    def executemany(self, sql: str, parametros):
+        return self._ejecutar(self._cursor.executemany, sql, parametros)
+
+    def executescript(self, script: str):
+        # Las sentencias del script no pasan por execute: se cuentan con el trace callback
+        self._conexion._conexion.set_trace_callback(self._conexion._trace)
+        try:
+            self._cursor.executescript(script)
+        finally:
+            self._conexion._conexion.set_trace_callback(None)
+        return self
+
+    def _leer(self, metodo, *args):
+        if self._actual is None:
+            return metodo(*args)
+        inicio = time.perf_counter()
+        resultado = metodo(*args)
+        filas = len(resultado) if isinstance(resultado, list) else int(resultado is not None)
+        self._conexion.estadisticas.sumar_lectura(self._actual, time.perf_counter() - inicio, filas)
+        return resultado
+
+    def fetchone(self):
+        return self._leer(self._cursor.fetchone)
+
+    def fetchmany(self, size: Optional[int] = None):
+        if size is None:
+            return self._leer(self._cursor.fetchmany)
+        return self._leer(self._cursor.fetchmany, size)
+
+    def fetchall(self) -> List[Any]:
+        return self._leer(self._cursor.fetchall)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        fila = self.fetchone()
+        if fila is None:
+            raise StopIteration
+        return fila
+
+
+class ConexionInstrumentada:
+    """
+    Envoltorio de sqlite3.Connection que instrumenta todos sus cursores
+
+    Delega cualquier otro atributo (commit, rollback, in_transaction...) en la
+    conexión original, así que puede pasarse a las funciones de ej3a1 y ej3a2.
+    """
+
+    def __init__(self, conexion: sqlite3.Connection, estadisticas: EstadisticasSQL):
+        self._conexion = conexion
+        self.estadisticas = estadisticas
+        self._pasos = 0
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def __enter__(self):
+        self._conexion.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conexion.__exit__(*exc)
+
+    def _trace(self, sql: str) -> None:
+        # Las sentencias de los triggers llegan como comentarios '-- TRIGGER ...'
+        if not sql.startswith('-- TRIGGER'):
+            self.estadisticas.contar_llamada(sql)
+
+    def _progreso(self) -> int:
+        self._pasos += 1
+        return 0
+
+    def _medir_pasos(self) -> int:
+        self._conexion.set_progress_handler(self._progreso, PASOS_PROGRESS_HANDLER)
+        return self._pasos
+
+    def _dejar_de_medir_pasos(self, pasos_inicio: int) -> int:
+        self._conexion.set_progress_handler(None, 0)
+        return (self._pasos - pasos_inicio) * PASOS_PROGRESS_HANDLER
+
+    def cursor(self, *args, **kwargs) -> CursorInstrumentado:
+        return CursorInstrumentado(self._conexion.cursor(*args, **kwargs), self)
+
+    def execute(self, sql: str, parametros=()) -> CursorInstrumentado:
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql: str, parametros) -> CursorInstrumentado:
+        return self.cursor().executemany(sql, parametros)
+
+    def executescript(self, script: str) -> CursorInstrumentado:
+        return self.cursor().executescript(script)
+
+    def close(self) -> None:
+        self._conexion.close()
+
+
+def instrumentar(conexion: sqlite3.Connection, muestreo: float = 1.0,
+                 estadisticas: Optional[EstadisticasSQL] = None) -> ConexionInstrumentada:
+    """
+    Activa la instrumentación sobre una conexión SQLite
+
+    Args:
+        conexion (sqlite3.Connection): Conexión a instrumentar
+        muestreo (float): Fracción de ejecuciones que se miden (entre 0 y 1)
+        estadisticas (Optional[EstadisticasSQL]): Registro compartido entre varias
+            conexiones; si es None se crea uno nuevo
+
+    Returns:
+        ConexionInstrumentada: Envoltorio de la conexión con las estadísticas
+        disponibles en su atributo 'estadisticas'
+    """
+    if estadisticas is None:
+        estadisticas = EstadisticasSQL(muestreo)
+    return ConexionInstrumentada(conexion, estadisticas)
@@ -0,0 +1,83 @@
+"""
+Tests para el módulo instrumentacion.py que mide las consultas SQL ejecutadas
+por las funciones de ej3a1.py y ej3a2.py.
+"""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+import ej3a1
+import ej3a2
+from instrumentacion import instrumentar, normalizar_sql
+
+# Path to test SQL script
+SQL_TEST_PATH = os.path.join(os.path.dirname(__file__), 'test.sql')
+
+@pytest.fixture
+def conexion():
+    """Fixture que proporciona una conexión instrumentada con los datos de test.sql"""
+    conn = instrumentar(sqlite3.connect(':memory:'))
+    with open(SQL_TEST_PATH, 'r') as sql_file:
+        conn.executescript(sql_file.read())
+    yield conn
+    conn.close()
+
+def test_normalizar_sql():
+    """Prueba que las sentencias equivalentes comparten clave"""
+    assert normalizar_sql("SELECT * FROM libros WHERE id = 5") == \
+        normalizar_sql("SELECT *\n  FROM libros WHERE id = 12;")
+    assert normalizar_sql("INSERT INTO autores (nombre) VALUES ('Borges')") == \
+        "INSERT INTO autores (nombre) VALUES (?)"
+    assert normalizar_sql("SELECT id FROM autores WHERE nombre IN (?, ?, ?)") == \
+        "SELECT id FROM autores WHERE nombre IN (?)"
+    assert normalizar_sql("INSERT INTO libros (titulo, anio) VALUES (?, ?), (?, ?)") == \
+        "INSERT INTO libros (titulo, anio) VALUES (?, ?)"
+
+def test_instrumentar_ej3a1(conexion):
+    """Prueba que se registran llamadas, filas y tiempos de las funciones de ej3a1"""
+    # executescript se contabiliza sentencia a sentencia
+    estadisticas = conexion.estadisticas.a_dict()
+    assert estadisticas["INSERT INTO libros (titulo, anio, autor_id) VALUES (?, ?, ?)"]['llamadas'] == 6
+
+    conexion.estadisticas.reiniciar()
+    for _ in range(3):
+        ej3a1.buscar_libros_por_autor(conexion, "Isabel Allende")
+    ej3a1.insertar_libros(conexion, [("Eva Luna", 1987, 2), ("Violeta", 2022, 2)])
+
+    estadisticas = conexion.estadisticas.a_dict()
+    busqueda = estadisticas[normalizar_sql(ej3a1.SQL_LIBROS_POR_AUTOR)]
+    assert busqueda['llamadas'] == 3
+    assert busqueda['muestras'] == 3
+    assert busqueda['filas'] == 6
+    assert busqueda['tiempo_total_ms'] > 0
+    assert sum(busqueda['histograma'].values()) == 3
+
+    insercion = estadisticas["INSERT INTO libros (titulo, anio, autor_id) VALUES (?, ?, ?)"]
+    assert insercion['filas'] == 2
+
+    json.loads(conexion.estadisticas.a_json())
+    assert "SELECT libros.titulo" in conexion.estadisticas.informe()
+
+def test_instrumentar_ej3a2(conexion):
+    """Prueba que las funciones de ej3a2 funcionan sobre la conexión instrumentada"""
+    libro_id = ej3a2.agregar_libro(conexion, "Violeta", 2022, 2)
+    assert ej3a2.actualizar_libro(conexion, libro_id, nuevo_anio=2023)
+    assert len(ej3a2.obtener_libros(conexion)) == 7
+
+    estadisticas = conexion.estadisticas.a_dict()
+    assert any(sql.startswith("UPDATE libros SET anio") for sql in estadisticas)
+
+def test_muestreo(conexion):
+    """Prueba que con muestreo 0 solo se cuentan las llamadas"""
+    conexion.estadisticas.muestreo = 0.0
+    conexion.estadisticas.reiniciar()
+    for _ in range(5):
+        ej3a1.buscar_libros_por_autor(conexion, "Isabel Allende")
+
+    busqueda = conexion.estadisticas.a_dict()[normalizar_sql(ej3a1.SQL_LIBROS_POR_AUTOR)]
+    assert busqueda['llamadas'] == 5
+    assert busqueda['muestras'] == 0
+    assert busqueda['p50_ms'] is None
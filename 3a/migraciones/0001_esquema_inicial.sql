@@ -0,0 +1,16 @@
+-- Esquema inicial de la biblioteca (el mismo que crea test.sql; ver
+-- test_migracion_inicial_igual_que_script, que comprueba que no se separan)
+-- IF NOT EXISTS permite adoptar bases de datos creadas antes de las migraciones
+
+CREATE TABLE IF NOT EXISTS autores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS libros (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    titulo TEXT NOT NULL,
+    anio INTEGER,
+    autor_id INTEGER,
+    FOREIGN KEY (autor_id) REFERENCES autores (id)
+);
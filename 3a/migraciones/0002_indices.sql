@@ -0,0 +1,6 @@
+-- Índices para los JOIN y búsquedas por autor
+-- Van en su propia migración para construirse una sola vez sobre los datos ya
+-- cargados, en lugar de mantenerlos fila a fila durante la carga
+
+CREATE INDEX IF NOT EXISTS idx_libros_autor_id ON libros (autor_id);
+CREATE INDEX IF NOT EXISTS idx_autores_nombre ON autores (nombre);